@@ -0,0 +1,306 @@
+# app/bulk.py
+"""
+Classificação em lote offline (backfill de caixas de e-mail), sem passar pela API.
+
+    python -m app.bulk emails.jsonl -o resultados.ndjson
+    python -m app.bulk caixa.mbox -o resultados.ndjson --workers 8
+    python -m app.bulk pasta_com_txt_e_pdf/ -o resultados.ndjson --resume
+
+Entradas suportadas:
+- JSONL/NDJSON: uma linha por e-mail, string ou objeto {"id": ..., "email_text": ...}
+- mbox (extensão .mbox ou --format mbox)
+- diretório com arquivos .txt/.pdf (recursivo, em ordem alfabética)
+
+A entrada é lida em streaming e no máximo `--max-inflight` lotes ficam em memória.
+Cada registro tem um `offset` (posição na entrada); a saída NDJSON sai na mesma
+ordem, então `--resume` continua depois do último offset já gravado.
+"""
+import argparse
+import json
+import mailbox
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from email.message import Message
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from app.services.classifier import (
+    PreparedEmail, classify_email, classify_many, detect_language, prepare_content, read_document,
+)
+from app.services.replier import reply_template
+
+# (offset, id, tipo, conteúdo): tipo "text" -> conteúdo é o texto; "file" -> caminho
+Record = Tuple[int, Optional[str], str, str]
+
+DOC_SUFFIXES = {".txt", ".pdf"}
+
+# ============================================================================
+# Leitura da entrada (streaming)
+# ============================================================================
+
+def _iter_jsonl(path: Path) -> Iterator[Record]:
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        for offset, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield offset, None, "error", "linha JSON inválida"
+                continue
+            if isinstance(item, str):
+                yield offset, None, "text", item
+            elif isinstance(item, dict):
+                item_id = item.get("id")
+                yield offset, None if item_id is None else str(item_id), "text", str(item.get("email_text") or "")
+            else:
+                yield offset, None, "error", "item deve ser string ou objeto com 'email_text'"
+
+def _message_text(msg: Message) -> str:
+    """Corpo text/plain da mensagem (ou text/html se não houver texto puro)."""
+    plain, html = [], []
+    for part in msg.walk():
+        if part.is_multipart() or part.get_content_disposition() == "attachment":
+            continue
+        ctype = part.get_content_type()
+        if ctype not in ("text/plain", "text/html"):
+            continue
+        payload = part.get_payload(decode=True) or b""
+        text = payload.decode(part.get_content_charset() or "utf-8", errors="ignore")
+        (plain if ctype == "text/plain" else html).append(text)
+    body = "\n".join(plain or html)
+    subject = msg.get("subject") or ""
+    return f"{subject}\n\n{body}".strip() if subject else body
+
+def _iter_mbox(path: Path) -> Iterator[Record]:
+    box = mailbox.mbox(str(path), create=False)
+    try:
+        for offset, msg in enumerate(box):
+            yield offset, msg.get("message-id"), "text", _message_text(msg)
+    finally:
+        box.close()
+
+def _iter_dir(path: Path) -> Iterator[Record]:
+    offset = 0
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if Path(name).suffix.lower() in DOC_SUFFIXES:
+                full = Path(root) / name
+                yield offset, str(full.relative_to(path)), "file", str(full)
+                offset += 1
+
+def iter_records(path: Path, fmt: str = "auto") -> Iterator[Record]:
+    if fmt == "auto":
+        if path.is_dir():
+            fmt = "dir"
+        elif path.suffix.lower() == ".mbox":
+            fmt = "mbox"
+        else:
+            fmt = "jsonl"
+    if fmt == "dir":
+        return _iter_dir(path)
+    if fmt == "mbox":
+        return _iter_mbox(path)
+    return _iter_jsonl(path)
+
+# ============================================================================
+# Processamento (roda nos processos do pool)
+# ============================================================================
+
+def _error(e: Exception) -> str:
+    return getattr(e, "detail", None) or str(e) or e.__class__.__name__
+
+def _prepare_one(record: Record, incremental: bool = False) -> Tuple[dict, Optional[PreparedEmail]]:
+    offset, item_id, kind, payload = record
+    out = {"offset": offset, "id": item_id}
+    try:
+        if kind == "error":
+            raise ValueError(payload)
+        if kind == "file":
+            text = read_document(payload, Path(payload).read_bytes())
+        else:
+            text = payload
+        if not text.strip():
+            raise ValueError("entrada vazia")
+        return out, prepare_content(text, incremental=incremental)
+    except Exception as e:
+        out["error"] = _error(e)
+        return out, None
+
+def _finish_one(out: dict, email: PreparedEmail, classified: tuple) -> None:
+    category, confidence, signals, info = classified
+    try:
+        lang = detect_language(email, default="pt")
+        out.update({
+            "category": category,
+            "confidence": confidence,
+            "signals": signals,
+            "language": lang,
+            "reply": reply_template(category, signals, lang=lang),
+            "used_hf": info.get("used_hf", False),
+            "engine": info.get("engine"),
+            "overrides": info.get("overrides"),
+            "scan": email.scan_info,
+        })
+    except Exception as e:
+        out["error"] = _error(e)
+
+def _process_one(record: Record, use_hf: bool, incremental: bool = False) -> dict:
+    out, email = _prepare_one(record, incremental)
+    if email is not None:
+        try:
+            _finish_one(out, email, classify_email(email, use_hf=use_hf))
+        except Exception as e:
+            out["error"] = _error(e)
+    return out
+
+def process_chunk(records: List[Record], use_hf: bool = False, incremental: bool = False) -> List[dict]:
+    """Lê/prepara cada registro e classifica o lote numa chamada só (HF em lote, regras vetorizadas)."""
+    prepared = [_prepare_one(r, incremental) for r in records]
+    ok = [(out, email) for out, email in prepared if email is not None]
+    try:
+        classified = classify_many([email for _, email in ok], use_hf=use_hf)
+    except Exception:
+        # falha no lote: item a item, para o erro ficar só no registro que falhou
+        return [_process_one(r, use_hf, incremental) for r in records]
+    for (out, email), result in zip(ok, classified):
+        _finish_one(out, email, result)
+    return [out for out, _ in prepared]
+
+# ============================================================================
+# Orquestração
+# ============================================================================
+
+def _chunked(records: Iterator[Record], size: int) -> Iterator[List[Record]]:
+    chunk: List[Record] = []
+    for r in records:
+        chunk.append(r)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def last_offset(output: Path) -> int:
+    """Último offset gravado numa saída NDJSON existente (-1 se vazia/inexistente)."""
+    if not output.exists():
+        return -1
+    last = -1
+    with output.open("rb") as f:
+        for line in f:
+            try:
+                last = max(last, int(json.loads(line)["offset"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return last
+
+class Progress:
+    def __init__(self, every_s: float = 5.0, stream=sys.stderr):
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.every_s = every_s
+        self.stream = stream
+        self.done = 0
+        self.errors = 0
+
+    def add(self, results: List[dict]) -> None:
+        self.done += len(results)
+        self.errors += sum(1 for r in results if "error" in r)
+        now = time.perf_counter()
+        if now - self.last_report >= self.every_s:
+            self.last_report = now
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        elapsed = max(1e-9, time.perf_counter() - self.start)
+        label = "fim" if final else "progresso"
+        print(
+            f"[bulk] {label}: {self.done} e-mails, {self.errors} erros, "
+            f"{elapsed:.1f}s, {self.done / elapsed:.1f} e-mails/s",
+            file=self.stream, flush=True,
+        )
+
+def run(
+    source: Path,
+    output: Optional[Path],
+    fmt: str = "auto",
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    max_inflight: Optional[int] = None,
+    start_offset: int = 0,
+    use_hf: bool = False,
+    incremental: bool = False,
+) -> Progress:
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or workers * 2
+    records = (r for r in iter_records(source, fmt) if r[0] >= start_offset)
+
+    out = output.open("a", encoding="utf-8") if output else sys.stdout
+    progress = Progress()
+    pending: deque[Future] = deque()
+
+    def _drain_one() -> None:
+        results = pending.popleft().result()
+        for r in results:
+            out.write(json.dumps(r, ensure_ascii=False) + "\n")
+        out.flush()
+        progress.add(results)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in _chunked(records, chunk_size):
+                # janela limitada: mantém a memória constante e a saída em ordem
+                while len(pending) >= max_inflight:
+                    _drain_one()
+                pending.append(pool.submit(process_chunk, chunk, use_hf, incremental))
+            while pending:
+                _drain_one()
+    finally:
+        if output:
+            out.close()
+    progress.report(final=True)
+    return progress
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.bulk", description="Classificação em lote offline (NDJSON).")
+    parser.add_argument("source", type=Path, help="arquivo JSONL/NDJSON, .mbox ou diretório com .txt/.pdf")
+    parser.add_argument("-o", "--output", type=Path, help="saída NDJSON (padrão: stdout)")
+    parser.add_argument("--format", choices=["auto", "jsonl", "mbox", "dir"], default="auto")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: núcleos da máquina)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="e-mails por tarefa enviada ao pool")
+    parser.add_argument("--max-inflight", type=int, default=None, help="lotes em memória (padrão: 2x workers)")
+    parser.add_argument("--start-offset", type=int, default=0, help="ignora registros com offset menor")
+    parser.add_argument("--resume", action="store_true", help="continua após o último offset da saída")
+    parser.add_argument(
+        "--model", "--hf", dest="hf", action="store_true",
+        help="usa o backend de CLASSIFIER_BACKEND (zero-shot HF ou modelo local; padrão: só regras)",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="descarta histórico citado e para a varredura quando a categoria trava",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.source.exists():
+        parser.error(f"entrada não encontrada: {args.source}")
+    start_offset = args.start_offset
+    if args.resume:
+        if not args.output:
+            parser.error("--resume exige --output")
+        start_offset = max(start_offset, last_offset(args.output) + 1)
+        print(f"[bulk] retomando a partir do offset {start_offset}", file=sys.stderr)
+
+    run(
+        args.source, args.output, fmt=args.format, workers=args.workers, chunk_size=args.chunk_size,
+        max_inflight=args.max_inflight, start_offset=start_offset, use_hf=args.hf,
+        incremental=args.incremental,
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# app/core/admission.py
+"""
+Controle de admissão das rotas de análise (por worker), antes de o corpo da
+requisição ser lido:
+
+- limite por cliente (token bucket, `RATE_LIMIT_RPS`/`RATE_LIMIT_BURST`): acima
+  dele, 429 com `Retry-After`. Com vários workers (`app.serve`) o bucket é
+  comum a todos (`SharedState.take`); senão fica em memória;
+- limite de requisições em andamento por classe (upload/texto) e no total, com
+  uma fila de espera limitada (`ADMISSION_QUEUE_MAX`) e prazo (`ADMISSION_WAIT_S`):
+  fila cheia ou prazo estourado viram 503 com `Retry-After` na hora, em vez de
+  empilhar blobs, texto extraído e threads bloqueadas.
+
+O bucket comum (SQLite) roda no pool de threads com prazo curto
+(`RATE_LIMIT_SHARED_TIMEOUT_S`): com contenção entre workers, a requisição usa o
+bucket local do worker em vez de segurar o event loop.
+
+A classe sai do tamanho declarado: multipart acima de `ADMISSION_UPLOAD_BYTES`
+(ou sem Content-Length) conta como upload; o resto, como texto. O lote
+(/api/analyze/batch) sempre conta como upload.
+"""
+import asyncio
+import math
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.core.concurrency import run_cpu
+from app.core.metrics import Counter, Gauge, REGISTRY
+from app.core.settings import (
+    ADMISSION_MAX_INFLIGHT, ADMISSION_MAX_TEXT, ADMISSION_MAX_UPLOADS, ADMISSION_QUEUE_MAX,
+    ADMISSION_RETRY_AFTER_S, ADMISSION_UPLOAD_BYTES, ADMISSION_WAIT_S,
+    RATE_LIMIT_BURST, RATE_LIMIT_RPS, RATE_LIMIT_SHARED_TIMEOUT_S, RATE_LIMIT_TRUST_PROXY,
+)
+from app.core.shared import get_shared
+
+ADMISSION_INFLIGHT = REGISTRY.register(Gauge(
+    "email_classifier_admission_inflight", "Requisições admitidas em andamento por classe.", ("gate",),
+))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "email_classifier_admission_queued", "Requisições aguardando admissão por classe.", ("gate",),
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "email_classifier_admission_rejected_total", "Requisições recusadas por classe e motivo (queue_full, timeout, rate_limited).",
+    ("gate", "reason"),
+))
+
+ADMISSION_SHARED_FALLBACKS = REGISTRY.register(Counter(
+    "email_classifier_admission_shared_fallback_total",
+    "Consultas ao bucket comum (SQLite) que estouraram o prazo ou falharam e usaram o bucket local.",
+))
+
+class Rejected(Exception):
+    """Requisição recusada: status (429/503), segundos para o Retry-After e motivo."""
+
+    def __init__(self, status: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+class AdmissionGate:
+    """Semáforo com fila de espera limitada; `limit` <= 0 = sem limite."""
+
+    def __init__(self, name: str, limit: int, queue_max: int):
+        self.name = name
+        self.limit = limit
+        self.queue_max = queue_max
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> None:
+        if self.limit <= 0 or (self.active < self.limit and not self._waiters):
+            self._enter()
+            return
+        if len(self._waiters) >= self.queue_max:
+            raise Rejected(503, ADMISSION_RETRY_AFTER_S, "queue_full")
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._gauges()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                self.release()  # a vaga chegou junto com o prazo/cancelamento: devolve
+            else:
+                fut.cancel()
+                self._waiters.remove(fut)
+                self._gauges()
+            if isinstance(e, asyncio.TimeoutError):
+                raise Rejected(503, ADMISSION_RETRY_AFTER_S, "timeout") from None
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # a vaga passa direto para o próximo da fila
+                self._gauges()
+                return
+        self.active -= 1
+        self._gauges()
+
+    def _enter(self) -> None:
+        self.active += 1
+        self._gauges()
+
+    def _gauges(self) -> None:
+        ADMISSION_INFLIGHT.set(self.active, gate=self.name)
+        ADMISSION_QUEUED.set(len(self._waiters), gate=self.name)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"limit": self.limit, "inflight": self.active, "queued": len(self._waiters)}
+
+class LocalBuckets:
+    """Token buckets em memória (um worker só), mesma semântica de `SharedState.take`."""
+
+    def __init__(self, max_clients: int = 10000):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, name: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(name, (burst, now))
+        tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate if rate > 0 else float("inf")
+        self._buckets[name] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)  # o cliente parado há mais tempo volta com o bucket cheio
+        return wait
+
+GATES = {
+    "upload": AdmissionGate("upload", ADMISSION_MAX_UPLOADS, ADMISSION_QUEUE_MAX),
+    "text": AdmissionGate("text", ADMISSION_MAX_TEXT, ADMISSION_QUEUE_MAX),
+}
+TOTAL = AdmissionGate("total", ADMISSION_MAX_INFLIGHT, ADMISSION_QUEUE_MAX)
+_local_buckets = LocalBuckets()
+
+# rota -> classe fixa (None = decide pelo tamanho do corpo)
+ADMITTED_ROUTES: Dict[str, Optional[str]] = {"/api/analyze": None, "/api/analyze/batch": "upload"}
+
+def request_class(path: str, headers: Dict[str, str]) -> Optional[str]:
+    """Classe de admissão da requisição, ou None se a rota não passa pelo controle."""
+    if path not in ADMITTED_ROUTES:
+        return None
+    fixed = ADMITTED_ROUTES[path]
+    if fixed is not None:
+        return fixed
+    try:
+        length = int(headers["content-length"])
+    except (KeyError, ValueError):
+        length = None
+    multipart = headers.get("content-type", "").startswith("multipart/")
+    if multipart and (length is None or length > ADMISSION_UPLOAD_BYTES):
+        return "upload"
+    return "text"
+
+def client_id(headers: Dict[str, str], peer: Optional[str]) -> str:
+    """Chave do limite por cliente: X-API-Key, senão o IP (X-Forwarded-For atrás de proxy)."""
+    api_key = headers.get("x-api-key")
+    if api_key:
+        return f"key:{api_key}"
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = headers.get("x-forwarded-for", "").split(",")[0].strip()
+        if forwarded:
+            return f"ip:{forwarded}"
+    return f"ip:{peer or 'unknown'}"
+
+async def check_rate(client: str, gate: str) -> None:
+    """429 se o cliente estourou o token bucket (RATE_LIMIT_RPS = 0 desliga)."""
+    if RATE_LIMIT_RPS <= 0:
+        return
+    name = f"client:{client}"
+    store = get_shared()
+    wait: Optional[float] = None
+    if store is not None:
+        try:
+            wait = await asyncio.wait_for(
+                run_cpu(store.take, name, RATE_LIMIT_RPS, RATE_LIMIT_BURST), RATE_LIMIT_SHARED_TIMEOUT_S,
+            )
+        except (asyncio.TimeoutError, sqlite3.Error):
+            ADMISSION_SHARED_FALLBACKS.inc()
+    if wait is None:
+        wait = _local_buckets.take(name, RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+    if wait > 0:
+        ADMISSION_REJECTED.inc(gate=gate, reason="rate_limited")
+        raise Rejected(429, wait, "rate_limited")
+
+async def admit(gate_name: str) -> Tuple[AdmissionGate, ...]:
+    """Entra na classe e no total (nessa ordem), dividindo o prazo; devolve as vagas ocupadas."""
+    deadline = time.monotonic() + ADMISSION_WAIT_S
+    held = []
+    try:
+        for gate in (GATES[gate_name], TOTAL):
+            await gate.acquire(max(0.0, deadline - time.monotonic()))
+            held.append(gate)
+    except Rejected as e:
+        for gate in held:
+            gate.release()
+        ADMISSION_REJECTED.inc(gate=gate_name, reason=e.reason)
+        raise
+    except BaseException:
+        for gate in held:
+            gate.release()
+        raise
+    return tuple(held)
+
+def release(held: Tuple[AdmissionGate, ...]) -> None:
+    for gate in reversed(held):
+        gate.release()
+
+def admission_stats() -> Dict[str, Dict[str, int]]:
+    return {name: gate.as_dict() for name, gate in {**GATES, "total": TOTAL}.items()}
@@ -0,0 +1,230 @@
+# app/core/cache.py
+"""
+Cache de resultados em dois níveis:
+- memória: LRU com TTL e limite por número de entradas e por tamanho (bytes)
+- disco (opcional): SQLite, sobrevive a reinícios
+
+Os valores precisam ser serializáveis em JSON. As chaves são hashes de conteúdo
+montados por quem usa o cache (ver `classification_cache_key`/`reply_cache_key`).
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.concurrency import run_cpu
+from app.core.settings import (
+    CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_MAX_MB, CACHE_TTL_S, CACHE_SQLITE_PATH, REPLY_SEMANTIC_TTL_S,
+)
+
+def content_key(*parts: Any) -> str:
+    """sha256 das partes (na ordem), separadas por um byte nulo."""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(str(p).encode("utf-8", errors="ignore"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class MemoryCache:
+    """LRU com TTL; evicta pelo mais antigo ao passar de `max_entries` ou `max_bytes`."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, size, value = item
+            if expires < now:
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl_s
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expires, size, value)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, s, _) = self._data.popitem(last=False)
+                self._bytes -= s
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+class SQLiteCache:
+    """Nível em disco: uma tabela por namespace, expiração por TTL."""
+
+    def __init__(self, path: str, namespace: str, ttl_s: float, max_entries: int):
+        self.path = path
+        self.table = f"cache_{namespace}"
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, raw: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)",
+                (key, raw, time.time() + self.ttl_s),
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        self._conn.execute(f"DELETE FROM {self.table} WHERE expires < ?", (time.time(),))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class ResultCache:
+    """Memória + SQLite opcional, com contadores de acerto/erro."""
+
+    def __init__(self, name: str, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.disk is not None:
+            raw = self.disk.get(key)
+            if raw is not None:
+                value = json.loads(raw)
+                self.memory.set(key, value, len(raw) + len(key))
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        self.memory.set(key, value, len(raw) + len(key))
+        if self.disk is not None:
+            self.disk.set(key, raw)
+
+    async def get_async(self, key: str) -> Any:
+        """Como `get`, mas o nível em disco roda fora do event loop."""
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.disk is None:
+            self.misses += 1
+            return None
+        return await run_cpu(self.get, key)
+
+    async def set_async(self, key: str, value: Any) -> None:
+        if self.disk is None:
+            self.set(key, value)
+        else:
+            await run_cpu(self.set, key, value)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "entries": len(self.memory),
+            "bytes": self.memory.bytes,
+            "evictions": self.memory.evictions,
+        }
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+def build_cache(name: str, *, max_entries: int, max_bytes: int, ttl_s: float, sqlite_path: str = "") -> ResultCache:
+    memory = MemoryCache(max_entries=max_entries, max_bytes=max_bytes, ttl_s=ttl_s)
+    disk = SQLiteCache(sqlite_path, name, ttl_s=ttl_s, max_entries=max_entries * 10) if sqlite_path else None
+    return ResultCache(name, memory, disk)
+
+# ============================================================================
+# Instâncias da aplicação (criadas sob demanda a partir do settings)
+# ============================================================================
+
+_caches: Dict[str, ResultCache] = {}
+_caches_lock = threading.Lock()
+
+# TTL próprio por cache (os demais usam CACHE_TTL_S)
+CACHE_TTLS: Dict[str, float] = {"reply_semantic": REPLY_SEMANTIC_TTL_S}
+
+def get_cache(name: str) -> Optional[ResultCache]:
+    if not CACHE_ENABLED:
+        return None
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = build_cache(
+                    name,
+                    max_entries=CACHE_MAX_ENTRIES,
+                    max_bytes=CACHE_MAX_MB * 1024 * 1024,
+                    ttl_s=CACHE_TTLS.get(name, CACHE_TTL_S),
+                    sqlite_path=CACHE_SQLITE_PATH,
+                )
+    return cache
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+def close_caches() -> None:
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
@@ -0,0 +1,100 @@
+# app/core/clients.py
+"""
+Clientes HTTP/OpenAI com pool de conexões (keep-alive, HTTP/2 quando disponível).
+
+- `Clients`: clientes assíncronos criados no `lifespan` da app e injetados nos
+  serviços (ficam em `app.state.clients`).
+- `get_sync_http()` / `get_sync_openai()`: equivalentes síncronos por processo,
+  usados pelos caminhos síncronos (CLI em lote, `classify_email`).
+"""
+import threading
+from typing import Any, Optional
+
+import httpx
+
+from app.core.settings import (
+    HTTP2, HTTP_KEEPALIVE_S, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, OPENAI_BASE_URL, OPENAI_KEY,
+)
+
+def http2_enabled() -> bool:
+    if HTTP2 in ("0", "false", "no"):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_S,
+    )
+
+def _openai_kwargs() -> dict:
+    kwargs: dict = {"api_key": OPENAI_KEY, "max_retries": 0}  # retries/backoff ficam no replier
+    if OPENAI_BASE_URL:
+        kwargs["base_url"] = OPENAI_BASE_URL
+    return kwargs
+
+class Clients:
+    """Clientes assíncronos de vida longa (um por worker)."""
+
+    def __init__(self) -> None:
+        self.http = httpx.AsyncClient(limits=_limits(), http2=http2_enabled())
+        self._openai: Optional[Any] = None
+        self._openai_http: Optional[httpx.AsyncClient] = None
+        self._openai_lock = threading.Lock()
+
+    @property
+    def openai(self) -> Optional[Any]:
+        """
+        AsyncOpenAI criado no primeiro uso: importar `openai` leva centenas de ms,
+        então o lifespan não espera por ele (o aquecimento em segundo plano o cria).
+        """
+        if self._openai is None and OPENAI_KEY:
+            with self._openai_lock:
+                if self._openai is None:
+                    from openai import AsyncOpenAI
+                    self._openai_http = httpx.AsyncClient(limits=_limits(), http2=http2_enabled())
+                    self._openai = AsyncOpenAI(http_client=self._openai_http, **_openai_kwargs())
+        return self._openai
+
+    async def aclose(self) -> None:
+        if self._openai is not None:
+            await self._openai.close()
+        if self._openai_http is not None:
+            await self._openai_http.aclose()
+        await self.http.aclose()
+
+_sync_lock = threading.Lock()
+_sync_http: Optional[httpx.Client] = None
+_sync_openai: Optional[Any] = None
+
+def get_sync_http() -> httpx.Client:
+    global _sync_http
+    if _sync_http is None:
+        with _sync_lock:
+            if _sync_http is None:
+                _sync_http = httpx.Client(limits=_limits(), http2=http2_enabled())
+    return _sync_http
+
+def get_sync_openai() -> Optional[Any]:
+    global _sync_openai
+    if _sync_openai is None and OPENAI_KEY:
+        http = get_sync_http()  # fora do lock: `get_sync_http` também usa `_sync_lock` (não reentrante)
+        with _sync_lock:
+            if _sync_openai is None:
+                from openai import OpenAI
+                _sync_openai = OpenAI(http_client=http, **_openai_kwargs())
+    return _sync_openai
+
+def close_sync_clients() -> None:
+    global _sync_http, _sync_openai
+    with _sync_lock:
+        if _sync_openai is not None:
+            _sync_openai.close()
+        if _sync_http is not None:
+            _sync_http.close()
+        _sync_http = _sync_openai = None
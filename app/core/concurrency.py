@@ -0,0 +1,102 @@
+# app/core/concurrency.py
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from app.core.settings import CPU_WORKERS, INGEST_WORKERS
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool limitado (CPU_WORKERS) usado para tirar trabalho síncrono do event loop."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+    return _executor
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Executa `fn` no pool limitado sem bloquear o event loop (com o contexto atual: contextvars)."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), partial(ctx.run, fn, *args, **kwargs))
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+# ============================================================================
+# Pool de processos (trabalho que pode travar: extração de PDF)
+# ============================================================================
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_lock = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool de INGEST_WORKERS processos ("spawn": seguro com threads no processo pai)."""
+    global _process_pool
+    if _process_pool is None:
+        with _process_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(
+                    max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+    return _process_pool
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Mata os processos de um pool com tarefa estourada e deixa o próximo uso criar outro."""
+    global _process_pool
+    with _process_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def _submit(fn: Callable[..., T], args: tuple, timeout: float) -> T:
+    pool = get_process_pool()
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(pool, partial(fn, *args)), timeout)
+    except (asyncio.TimeoutError, BrokenProcessPool):
+        _discard_process_pool(pool)
+        raise
+
+async def run_process(fn: Callable[..., T], *args: Any, timeout: float) -> T:
+    """
+    Executa `fn(*args)` no pool de processos com tempo limite rígido. No timeout o
+    pool é descartado (o worker preso é morto) e `asyncio.TimeoutError` sobe;
+    tarefas de outras requisições afetadas pela troca são reenviadas uma vez.
+    """
+    try:
+        return await _submit(fn, args, timeout)
+    except BrokenProcessPool:
+        return await _submit(fn, args, timeout)
+
+async def warm_process_pool(fn: Callable[[], Any], timeout: float) -> int:
+    """
+    Sobe os INGEST_WORKERS processos ("spawn" cria um por tarefa enquanto não há
+    ocioso) e roda `fn` neles. Retorna quantos processos distintos responderam.
+    """
+    pool = get_process_pool()
+    loop = asyncio.get_running_loop()
+    futures = [loop.run_in_executor(pool, fn) for _ in range(INGEST_WORKERS)]
+    done, pending = await asyncio.wait(futures, timeout=timeout)
+    if pending:
+        raise asyncio.TimeoutError
+    return len({f.result() for f in done})
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    with _process_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,205 @@
+# app/core/jobs.py
+"""
+Fila de jobs assíncronos em processo (geração de resposta pelo LLM fora da
+requisição de classificação):
+
+- `max_depth`: jobs aguardando + em execução; acima disso `submit` devolve None
+  (backpressure: quem chamou segue sem o job, ex.: fica com o template);
+- `workers`: tasks consumidoras no event loop (as chamadas são I/O assíncrono);
+- `ttl_s`: o resultado fica disponível por esse tempo desde a criação; um job
+  que ainda estiver na fila ao expirar nem chega a rodar.
+
+Com estado compartilhado (`app.serve`), o status de cada job também vai para o
+SQLite comum, e qualquer worker responde o polling/SSE de um job criado em outro.
+As gravações saem do event loop: uma task escritora grava (no pool de threads)
+o último status de cada job alterado; `submit` espera a primeira gravação, para
+o id devolvido ao cliente já valer em qualquer worker.
+"""
+import asyncio
+import logging
+import secrets
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.concurrency import run_cpu
+from app.core.metrics import Counter, Gauge, REGISTRY
+
+PENDING, RUNNING, DONE, FAILED, EXPIRED = "pending", "running", "done", "failed", "expired"
+FINAL = (DONE, FAILED, EXPIRED)
+
+logger = logging.getLogger(__name__)
+
+JOBS = REGISTRY.register(Counter(
+    "email_classifier_jobs_total", "Jobs assíncronos por fila e resultado (queued, rejected, done, failed, expired).",
+    ("queue", "outcome"),
+))
+JOBS_DEPTH = REGISTRY.register(Gauge(
+    "email_classifier_jobs_depth", "Jobs aguardando ou em execução por fila.", ("queue",),
+))
+
+class Job:
+    def __init__(self, queue: str, fn: Callable[[], Awaitable[Any]], ttl_s: float):
+        self.id = secrets.token_urlsafe(16)  # não adivinhável: o resultado contém trechos do e-mail
+        self.queue = queue
+        self.fn = fn
+        self.status = PENDING
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.expires = self.created + ttl_s
+        self.finished: Optional[float] = None
+        self.changed = asyncio.Event()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "elapsed_ms": int(((self.finished or time.time()) - self.created) * 1000),
+            "expires_in_s": max(0, int(self.expires - time.time())),
+        }
+
+class JobQueue:
+    def __init__(self, name: str, *, workers: int, max_depth: int, ttl_s: float, store=None):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_depth = max(1, max_depth)
+        self.ttl_s = ttl_s
+        self.store = store
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue()
+        self._jobs: Dict[str, Job] = {}
+        self._active = 0  # aguardando + em execução
+        self._tasks: list = []
+        # espelho no estado compartilhado: último status de cada job ainda não gravado
+        self._dirty: Dict[str, Job] = {}
+        self._dirty_event = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._writer: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return self._active
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.store is not None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+            await self._flush()  # status finais (cancelados) ainda pendentes
+
+    async def submit(self, fn: Callable[[], Awaitable[Any]]) -> Optional[Job]:
+        """Enfileira `fn` (corrotina sem argumentos); None se a fila está cheia."""
+        self._prune()
+        if self._active >= self.max_depth:
+            JOBS.inc(queue=self.name, outcome="rejected")
+            return None
+        job = Job(self.name, fn, self.ttl_s)
+        self._jobs[job.id] = job
+        self._active += 1
+        JOBS_DEPTH.set(self._active, queue=self.name)
+        JOBS.inc(queue=self.name, outcome="queued")
+        self._publish(job)
+        self._queue.put_nowait(job)
+        await self._flush()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.expires >= time.time():
+            return job.as_dict()
+        if job is None and self.store is not None:
+            return await run_cpu(self.store.get_job, job_id)
+        return None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Espera a próxima mudança de status (até `timeout`) e devolve o estado atual."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.status not in FINAL:
+                try:
+                    await asyncio.wait_for(job.changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return await self.get(job_id)
+        # job de outro worker: consulta o estado compartilhado
+        await asyncio.sleep(min(timeout, 0.25))
+        return await self.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.expires < time.time():
+                    self._finish(job, EXPIRED)
+                    continue
+                self._set(job, RUNNING)
+                try:
+                    job.result = await job.fn()
+                except asyncio.CancelledError:
+                    self._finish(job, FAILED, "cancelado")
+                    raise
+                except Exception as e:
+                    self._finish(job, FAILED, f"{type(e).__name__}: {e}")
+                else:
+                    self._finish(job, DONE)
+            finally:
+                job.fn = None  # solta o closure (texto do e-mail) assim que roda
+                self._queue.task_done()
+
+    def _set(self, job: Job, status: str) -> None:
+        job.status = status
+        job.changed.set()
+        job.changed = asyncio.Event()
+        self._publish(job)
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.error = error
+        job.finished = time.time()
+        self._active -= 1
+        JOBS_DEPTH.set(self._active, queue=self.name)
+        JOBS.inc(queue=self.name, outcome=status)
+        self._set(job, status)
+
+    def _publish(self, job: Job) -> None:
+        if self.store is not None:
+            self._dirty[job.id] = job
+            self._dirty_event.set()
+
+    async def _write_loop(self) -> None:
+        while True:
+            await self._dirty_event.wait()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        """Grava os jobs alterados; o lock mantém a ordem (um status antigo nunca sobrescreve um novo)."""
+        async with self._write_lock:
+            self._dirty_event.clear()
+            if not self._dirty:
+                return
+            batch = [(job.id, job.as_dict(), job.expires) for job in self._dirty.values()]
+            self._dirty.clear()
+            try:
+                await run_cpu(self._write, batch)
+            except (OSError, sqlite3.Error) as e:
+                # o worker dono do job continua respondendo por ele; só os outros ficam sem
+                logger.warning("job_publish_failed", extra={"queue": self.name, "error": str(e)})
+
+    def _write(self, batch: list) -> None:
+        for job_id, payload, expires in batch:
+            self.store.put_job(job_id, payload, expires)
+
+    def _prune(self) -> None:
+        now = time.time()
+        for job_id in [j.id for j in self._jobs.values() if j.expires < now and j.status in FINAL]:
+            del self._jobs[job_id]
@@ -0,0 +1,387 @@
+# app/core/metrics.py
+"""
+Métricas em memória no formato de texto do Prometheus (sem coletor externo):
+contadores, gauges e histogramas com rótulos, renderizados em `/metrics`.
+
+Tempo por etapa do pipeline: `with stage("rules"): ...` alimenta o histograma
+`email_classifier_stage_seconds{stage=...}` e, se a requisição abriu um
+`track_stages()`, também o detalhamento que vai em `meta.stages` (ms por etapa).
+O registro da requisição segue pelo contextvar (inclusive nas threads do
+`run_cpu`, que copia o contexto).
+
+Com vários workers (`app.serve`), cada um publica um snapshot das suas métricas
+no estado compartilhado (`app.core.shared`) e o `/metrics` de qualquer worker
+devolve a soma: contadores e histogramas de todos (inclusive workers já
+encerrados), gauges só dos vivos.
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from app.core.shared import get_shared
+
+# segundos: de sub-milissegundo (regras, idioma) a dezenas de segundos (HF/OpenAI)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+F = TypeVar("F", bound=Callable[..., Any])
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class _Metric(ABC):
+    """Base dos tipos de métrica: subclasse sem `_samples`/`snapshot`/`merge` não instancia."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    @abstractmethod
+    def _samples(self, values=None) -> List[str]:
+        """Linhas de amostra no formato de texto (dos valores locais ou de `values`)."""
+
+    @abstractmethod
+    def snapshot(self) -> List[Any]:
+        """Valores serializáveis em JSON (publicados para a agregação entre workers)."""
+
+    @abstractmethod
+    def merge(self, snapshots: List[List[Any]]):
+        """Soma snapshots de vários workers no formato interno de valores."""
+
+    def render(self, values=None) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples(values)]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> List[Any]:
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    def merge(self, snapshots: List[List[Any]]) -> Dict[LabelValues, float]:
+        values: Dict[LabelValues, float] = {}
+        for snap in snapshots:
+            for key, v in snap:
+                values[tuple(key)] = values.get(tuple(key), 0.0) + v
+        return values
+
+    def _samples(self, values=None) -> List[str]:
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in sorted(values.items())]
+
+class Gauge(Counter):
+    """
+    Valor que sobe e desce; `collect` (opcional) calcula os valores na hora do scrape.
+    Entre workers, `aggregate` diz como combinar: "sum" (ex.: em andamento) ou
+    "max" (estado já compartilhado, ex.: breaker aberto).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 collect: Optional[Callable[[], Dict[LabelValues, float]]] = None, aggregate: str = "sum"):
+        super().__init__(name, help, labels)
+        self._collect = collect
+        self.aggregate = aggregate
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _refresh(self) -> None:
+        if self._collect is not None:
+            values = self._collect()
+            with self._lock:
+                self._values = dict(values)
+
+    def snapshot(self) -> List[Any]:
+        self._refresh()
+        return super().snapshot()
+
+    def merge(self, snapshots: List[List[Any]]) -> Dict[LabelValues, float]:
+        if self.aggregate != "max":
+            return super().merge(snapshots)
+        values: Dict[LabelValues, float] = {}
+        for snap in snapshots:
+            for key, v in snap:
+                values[tuple(key)] = max(values.get(tuple(key), v), v)
+        return values
+
+    def _samples(self, values=None) -> List[str]:
+        if values is None:
+            self._refresh()
+        return super()._samples(values)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # por rótulo: [contagem por bucket (não cumulativa) + overflow, soma]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][i] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def snapshot(self) -> List[Any]:
+        with self._lock:
+            return [[list(k), list(c), s[0]] for k, (c, s) in self._values.items()]
+
+    def merge(self, snapshots: List[List[Any]]) -> Dict[LabelValues, Tuple[List[int], List[float]]]:
+        values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        for snap in snapshots:
+            for key, counts, total in snap:
+                entry = values.get(tuple(key))
+                if entry is None:
+                    entry = values[tuple(key)] = ([0] * (len(self.buckets) + 1), [0.0])
+                for i, n in enumerate(counts):
+                    entry[0][i] += n
+                entry[1][0] += total
+        return values
+
+    def _samples(self, values=None) -> List[str]:
+        if values is None:
+            with self._lock:
+                values = {k: (list(c), list(s)) for k, (c, s) in self._values.items()}
+        items = sorted((k, (c, s[0])) for k, (c, s) in values.items())
+        out = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                out.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, key)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return out
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> Dict[str, List[Any]]:
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def render(self, snapshots: Optional[List[Tuple[bool, Dict[str, List[Any]]]]] = None) -> str:
+        """Sem `snapshots`, os valores deste processo; com [(vivo, snapshot)], a soma dos workers."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            if snapshots is None:
+                lines.extend(metric.render())
+                continue
+            gauge = isinstance(metric, Gauge)
+            parts = [snap.get(metric.name, []) for alive, snap in snapshots if alive or not gauge]
+            lines.extend(metric.render(metric.merge(parts)))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def publish_metrics() -> None:
+    """Grava o snapshot deste worker no estado compartilhado (no-op sem `app.serve`)."""
+    store = get_shared()
+    if store is not None:
+        store.publish_metrics(os.getpid(), REGISTRY.snapshot())
+
+def render_metrics() -> str:
+    store = get_shared()
+    if store is None:
+        return REGISTRY.render()
+    publish_metrics()
+    return REGISTRY.render([(alive, snap) for _, alive, snap in store.metric_snapshots()])
+
+# ============================================================================
+# Métricas da aplicação
+# ============================================================================
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "email_classifier_http_requests_total", "Requisições HTTP por rota e status.", ("method", "route", "status"),
+))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "email_classifier_http_request_seconds", "Latência das requisições HTTP por rota.", ("route",),
+))
+HTTP_INFLIGHT = REGISTRY.register(Gauge(
+    "email_classifier_http_inflight_requests", "Requisições HTTP em andamento.",
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "email_classifier_stage_seconds", "Tempo por etapa do pipeline.", ("stage",),
+))
+UPSTREAM_CALLS = REGISTRY.register(Counter(
+    "email_classifier_upstream_calls_total", "Tentativas de chamada a upstreams (hf, openai) por resultado.",
+    ("upstream", "outcome"),
+))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "email_classifier_upstream_retries_total", "Novas tentativas depois de uma falha.", ("upstream",),
+))
+FALLBACKS = REGISTRY.register(Counter(
+    "email_classifier_fallbacks_total", "Fallbacks por motivo (hf:circuit_open, openai:error, templates...).",
+    ("reason",),
+))
+CLASSIFICATIONS = REGISTRY.register(Counter(
+    "email_classifier_classifications_total", "E-mails classificados por endpoint, engine e categoria.",
+    ("endpoint", "engine", "category"),
+))
+REPLIES = REGISTRY.register(Counter(
+    "email_classifier_replies_total", "Respostas sugeridas por origem (openai ou template).", ("source",),
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "email_classifier_cache_lookups_total", "Consultas ao cache de resultados.", ("cache", "result"),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "email_classifier_llm_tokens_total", "Tokens cobrados pela LLM (prompt, completion).", ("kind",),
+))
+REPLY_BATCH_SIZE = REGISTRY.register(Histogram(
+    "email_classifier_reply_batch_size", "E-mails por chamada à LLM no gerador de respostas.",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+))
+
+def _breaker_open() -> Dict[LabelValues, float]:
+    from app.core.resilience import OPEN, breaker_states
+    return {(name,): float(state == OPEN) for name, state in breaker_states().items()}
+
+BREAKER_OPEN = REGISTRY.register(Gauge(
+    "email_classifier_breaker_open", "1 se o circuit breaker do upstream está aberto.", ("upstream",),
+    collect=_breaker_open, aggregate="max",
+))
+
+# ============================================================================
+# Tempo por etapa (histograma + detalhamento da requisição)
+# ============================================================================
+
+class StageTimings:
+    """Milissegundos acumulados por etapa de uma requisição (`meta.stages`)."""
+
+    def __init__(self) -> None:
+        self._ms: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._ms[name] = self._ms.get(name, 0.0) + seconds * 1000
+
+    def as_meta(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(ms, 3) for name, ms in self._ms.items()}
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+def track_stages() -> StageTimings:
+    """Abre o detalhamento por etapa da requisição atual (contexto do handler)."""
+    timings = StageTimings()
+    _current.set(timings)
+    return timings
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator: cada chamada (síncrona) da função conta como a etapa `name`."""
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+# ============================================================================
+# Tokens da LLM por requisição (`meta.tokens`)
+# ============================================================================
+
+class TokenUsage:
+    """Tokens de prompt/completion atribuídos à requisição (parte dela, se veio num lote)."""
+
+    def __init__(self) -> None:
+        self.prompt = 0
+        self.completion = 0
+        self.batch_size = 0
+
+    def add(self, prompt: int, completion: int, batch_size: int = 1) -> None:
+        self.prompt += prompt
+        self.completion += completion
+        self.batch_size = max(self.batch_size, batch_size)
+
+    def as_meta(self) -> Optional[Dict[str, int]]:
+        if not self.batch_size:
+            return None
+        return {"prompt": self.prompt, "completion": self.completion, "batch_size": self.batch_size}
+
+_tokens: ContextVar[Optional[TokenUsage]] = ContextVar("token_usage", default=None)
+
+def track_tokens() -> TokenUsage:
+    """Abre a contagem de tokens da requisição atual (contexto do handler)."""
+    usage = TokenUsage()
+    _tokens.set(usage)
+    return usage
+
+def record_tokens(prompt: int, completion: int, batch_size: int = 1) -> None:
+    """Só a atribuição à requisição; o contador global é alimentado uma vez por chamada."""
+    usage = _tokens.get()
+    if usage is not None:
+        usage.add(prompt, completion, batch_size)
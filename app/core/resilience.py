@@ -0,0 +1,293 @@
+# app/core/resilience.py
+"""
+Proteções para as chamadas externas (Hugging Face e OpenAI):
+
+- `CircuitBreaker`: um por upstream, compartilhado pelo processo (e entre os
+  workers do `app.serve`, ver `SharedCircuitBreaker`). Depois de
+  `failure_threshold` falhas seguidas o circuito abre e as chamadas vão direto
+  para o fallback; passado o cooldown, deixa passar uma sonda (half-open) que
+  fecha o circuito se der certo ou o reabre se falhar.
+- `LatencyBudget`: orçamento total de tempo de uma requisição. Limita o timeout
+  de cada tentativa e, quando acaba, o pipeline pula para as regras/templates.
+  Também guarda os motivos de fallback que vão para `meta.fallbacks`.
+- `call_with_retries` / `call_with_retries_async`: laço de tentativas com
+  backoff exponencial que respeita o breaker e o orçamento.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.concurrency import run_cpu
+from app.core.metrics import FALLBACKS, UPSTREAM_CALLS, UPSTREAM_RETRIES
+from app.core.settings import BREAKER_COOLDOWN_S, BREAKER_FAILURES
+from app.core.shared import get_shared
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# motivos de fallback (prefixados pelo nome do upstream: "hf:circuit_open")
+CIRCUIT_OPEN, BUDGET_EXHAUSTED, UPSTREAM_ERROR = "circuit_open", "budget_exhausted", "error"
+
+class CircuitBreaker:
+    """Breaker thread-safe (usado tanto no event loop quanto nos caminhos síncronos)."""
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_s: float, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_at: Optional[float] = None
+
+    def _current(self) -> str:
+        # chamado com o lock
+        if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown_s:
+            self._state = HALF_OPEN
+            self._probe_at = None
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current()
+
+    def allow(self) -> bool:
+        """True se a chamada pode seguir; em half-open, só uma sonda por vez."""
+        with self._lock:
+            state = self._current()
+            if state == CLOSED:
+                return True
+            if state == OPEN:
+                return False
+            now = self._clock()
+            # sonda presa (cancelada sem registrar resultado) não trava o circuito
+            if self._probe_at is None or now - self._probe_at >= self.cooldown_s:
+                self._probe_at = now
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probe_at = None
+
+    # versões para o event loop (em memória: custo de um lock, roda direto)
+    async def allow_async(self) -> bool:
+        return self.allow()
+
+    async def record_success_async(self) -> None:
+        self.record_success()
+
+    async def record_failure_async(self) -> None:
+        self.record_failure()
+
+class SharedCircuitBreaker(CircuitBreaker):
+    """
+    Mesmo autômato, com o estado numa linha de `app.core.shared` comum a todos os
+    workers (relógio de parede): N falhas seguidas em qualquer worker abrem o
+    circuito para todos, e só um worker manda a sonda do half-open.
+
+    Cada `allow`/`record_*` é uma transação SQLite: no event loop, as versões
+    `*_async` rodam no pool de threads. `state` devolve a última cópia local
+    (atualizada a cada transação e por `refresh`, chamado pela sincronização
+    periódica dos workers), sem tocar no SQLite.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown_s: float, store):
+        super().__init__(name, failure_threshold, cooldown_s, clock=time.time)
+        self._store = store
+        self._lock = threading.RLock()  # `_apply` segura o lock em volta dos métodos da base
+
+    def _load(self, row) -> None:
+        if row:
+            self._state, self._failures, self._opened_at, self._probe_at = row
+        else:
+            self._state, self._failures, self._opened_at, self._probe_at = CLOSED, 0, 0.0, None
+
+    def _apply(self, fn: Callable[[], Any]) -> Any:
+        # o lock do store serializa as threads do processo; a transação, os processos
+        with self._store.breaker_tx(self.name) as row, self._lock:
+            self._load(row)
+            result = fn()
+            row[:] = (self._state, self._failures, self._opened_at, self._probe_at)
+        return result
+
+    def refresh(self) -> None:
+        """Relê a linha comum (bloqueante: fora do event loop)."""
+        row = self._store.read_breaker(self.name)
+        with self._lock:
+            self._load(row)
+
+    def allow(self) -> bool:
+        return self._apply(super().allow)
+
+    def record_success(self) -> None:
+        self._apply(super().record_success)
+
+    def record_failure(self) -> None:
+        self._apply(super().record_failure)
+
+    async def allow_async(self) -> bool:
+        return await run_cpu(self.allow)
+
+    async def record_success_async(self) -> None:
+        await run_cpu(self.record_success)
+
+    async def record_failure_async(self) -> None:
+        await run_cpu(self.record_failure)
+
+class LatencyBudget:
+    """Orçamento de tempo de uma requisição (`None` = sem limite)."""
+
+    def __init__(self, total_s: Optional[float], clock=time.monotonic):
+        self.total_s = total_s
+        self._clock = clock
+        self.deadline = None if total_s is None else clock() + total_s
+        self.fallbacks: List[str] = []
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return float("inf")
+        return max(0.0, self.deadline - self._clock())
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        return min(cap, self.remaining())
+
+    def note(self, upstream: str, reason: str) -> None:
+        item = f"{upstream}:{reason}"
+        if item not in self.fallbacks:
+            self.fallbacks.append(item)
+
+# ============================================================================
+# Tentativas com breaker + orçamento
+# ============================================================================
+
+def _finish(budget: Optional[LatencyBudget], upstream: str, reason: str) -> Tuple[None, str]:
+    FALLBACKS.inc(reason=f"{upstream}:{reason}")
+    if budget is not None:
+        budget.note(upstream, reason)
+    return None, reason
+
+def call_with_retries(
+    breaker: CircuitBreaker,
+    fn: Callable[[float], Any],
+    *,
+    retries: int,
+    backoff: float,
+    timeout: float,
+    budget: Optional[LatencyBudget] = None,
+    label: str = "",
+) -> Tuple[Any, Optional[str]]:
+    """
+    Chama `fn(timeout)` até `retries` vezes. Retorna (resultado, None) ou
+    (None, motivo do fallback). Exceções contam como falha do upstream.
+    """
+    budget = budget or LatencyBudget(None)
+    for attempt in range(1, retries + 1):
+        if budget.exhausted:
+            return _finish(budget, breaker.name, BUDGET_EXHAUSTED)
+        if not breaker.allow():
+            return _finish(budget, breaker.name, CIRCUIT_OPEN)
+        if attempt > 1:
+            UPSTREAM_RETRIES.inc(upstream=breaker.name)
+        try:
+            result = fn(budget.timeout(timeout))
+        except Exception as e:
+            breaker.record_failure()
+            UPSTREAM_CALLS.inc(upstream=breaker.name, outcome="error")
+            if attempt == retries:
+                print(f"[{label or breaker.name}] Falha após {retries} tentativas: {e!r}")
+                return _finish(budget, breaker.name, UPSTREAM_ERROR)
+            wait = backoff ** attempt
+            if wait >= budget.remaining():
+                return _finish(budget, breaker.name, BUDGET_EXHAUSTED)
+            time.sleep(wait)
+            continue
+        breaker.record_success()
+        UPSTREAM_CALLS.inc(upstream=breaker.name, outcome="success")
+        return result, None
+    return None, None
+
+async def call_with_retries_async(
+    breaker: CircuitBreaker,
+    fn: Callable[[float], Awaitable[Any]],
+    *,
+    retries: int,
+    backoff: float,
+    timeout: float,
+    budget: Optional[LatencyBudget] = None,
+    label: str = "",
+) -> Tuple[Any, Optional[str]]:
+    """Versão assíncrona de `call_with_retries` (timeout de cada tentativa é rígido)."""
+    budget = budget or LatencyBudget(None)
+    for attempt in range(1, retries + 1):
+        if budget.exhausted:
+            return _finish(budget, breaker.name, BUDGET_EXHAUSTED)
+        if not await breaker.allow_async():
+            return _finish(budget, breaker.name, CIRCUIT_OPEN)
+        attempt_timeout = budget.timeout(timeout)
+        if attempt > 1:
+            UPSTREAM_RETRIES.inc(upstream=breaker.name)
+        try:
+            result = await asyncio.wait_for(fn(attempt_timeout), attempt_timeout)
+        except Exception as e:
+            await breaker.record_failure_async()
+            UPSTREAM_CALLS.inc(upstream=breaker.name, outcome="error")
+            if attempt == retries:
+                print(f"[{label or breaker.name}] Falha após {retries} tentativas: {e!r}")
+                return _finish(budget, breaker.name, UPSTREAM_ERROR)
+            wait = backoff ** attempt
+            if wait >= budget.remaining():
+                return _finish(budget, breaker.name, BUDGET_EXHAUSTED)
+            await asyncio.sleep(wait)
+            continue
+        await breaker.record_success_async()
+        UPSTREAM_CALLS.inc(upstream=breaker.name, outcome="success")
+        return result, None
+    return None, None
+
+# ============================================================================
+# Breakers da aplicação (um por upstream; compartilhados entre workers no modo app.serve)
+# ============================================================================
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                store = get_shared()
+                if store is not None:
+                    breaker = SharedCircuitBreaker(name, BREAKER_FAILURES, BREAKER_COOLDOWN_S, store)
+                else:
+                    breaker = CircuitBreaker(name, failure_threshold=BREAKER_FAILURES, cooldown_s=BREAKER_COOLDOWN_S)
+                _breakers[name] = breaker
+    return breaker
+
+def breaker_states() -> Dict[str, str]:
+    return {name: b.state for name, b in _breakers.items()}
+
+def refresh_breakers() -> None:
+    """Atualiza a cópia local dos breakers compartilhados (bloqueante: rodar no pool)."""
+    for breaker in list(_breakers.values()):
+        if isinstance(breaker, SharedCircuitBreaker):
+            breaker.refresh()
@@ -5,6 +5,9 @@ load_dotenv()
 
 HF_TOKEN = os.getenv("HF_API_TOKEN")
 HF_MODEL = os.getenv("HF_ZEROSHOT_MODEL", "MoritzLaurer/mDeBERTa-v3-base-mnli-xnli")
+# backend do classificador: "hf" (zero-shot remoto), "local" (modelo linear in-process) ou "rules"
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "hf").lower()
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "models/linear.json")
 
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
@@ -12,5 +15,97 @@ TEMP = float(os.getenv("TEMPERATURE", "0.4"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS_REPLY", "220"))
 
 # limites e flags opcionais
-MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "50000"))  # 50k
-MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "5"))        # 5 MB
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "50000"))  # 50k (texto extraído de anexos)
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "2"))        # 2 MB
+
+# ingestão de anexos: PDFs são extraídos página a página num pool de processos
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "50"))
+INGEST_TIMEOUT_S = float(os.getenv("INGEST_TIMEOUT_S", "5"))  # por documento
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# modo incremental: descarta histórico citado e varre o texto em blocos, parando
+# quando a categoria não pode mais mudar
+INCREMENTAL_SCAN = os.getenv("INCREMENTAL_SCAN", "0") not in ("0", "false", "False")
+SCAN_CHUNK_CHARS = int(os.getenv("SCAN_CHUNK_CHARS", "2048"))
+
+# lotes a partir deste tamanho usam o motor de regras vetorizado (NumPy); 0 = desligado
+RULES_VECTOR_MIN_BATCH = int(os.getenv("RULES_VECTOR_MIN_BATCH", "64"))
+
+# regras do classificador: arquivo JSON/YAML recarregável em runtime (SIGHUP ou
+# POST /admin/rules/reload); vazio = app/services/rules.json
+RULES_PATH = os.getenv("RULES_PATH", "")
+RULES_SNAPSHOT_PATH = os.getenv("RULES_SNAPSHOT_PATH", "")  # pickle do matcher compilado (vazio = desligado)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")                  # header X-Admin-Token; vazio = /admin desligado
+
+# cold start: módulos pesados (openai, pdfminer, perfis de idioma, modelo local) são
+# carregados depois do startup numa task em segundo plano; /readyz vira 200 ao terminar
+WARMUP = os.getenv("WARMUP", "1") not in ("0", "false", "False")  # 0 = tudo sob demanda, pronto de imediato
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "60"))      # por etapa
+
+# modo multi-processo (python -m app.serve): workers, estado compartilhado entre eles
+# (breakers, limites de taxa, métricas) num SQLite local; vazio = só este processo
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))                # 0 = um por núcleo
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "")
+METRICS_PUBLISH_S = float(os.getenv("METRICS_PUBLISH_S", "5"))  # snapshot das métricas de cada worker
+
+# quando chamar a LLM para a resposta e quanto reaproveitar dela
+LLM_REPLY_POLICY = os.getenv("LLM_REPLY_POLICY", "all").lower()               # all | produtivo | off
+REPLY_SEMANTIC_CACHE = os.getenv("REPLY_SEMANTIC_CACHE", "off").lower()  # off | improdutivo | all
+REPLY_SEMANTIC_TTL_S = float(os.getenv("REPLY_SEMANTIC_TTL_S", "3600"))        # reuso por (categoria, idioma, sinais)
+
+# lote de respostas (opt-in): pedidos que chegam dentro da janela vão numa só chamada à LLM;
+# e-mails de clientes diferentes dividem o mesmo prompt, então só para remetentes confiáveis
+REPLY_BATCH_MAX = int(os.getenv("REPLY_BATCH_MAX", "1"))                  # e-mails por chamada (1 = sem lote)
+REPLY_BATCH_WINDOW_MS = float(os.getenv("REPLY_BATCH_WINDOW_MS", "20"))   # espera máxima para juntar o lote
+REPLY_BATCH_MAX_TOKENS = int(os.getenv("REPLY_BATCH_MAX_TOKENS", "6000"))  # prompt estimado + completions
+REPLY_BATCH_MIN_BUDGET_S = float(os.getenv("REPLY_BATCH_MIN_BUDGET_S", "5"))  # abaixo disso o pedido vai sozinho
+
+# resposta do LLM fora da requisição: "async" devolve a classificação com o template
+# na hora e a resposta final vem por /api/replies/{id} (polling ou SSE); "sync" = espera
+REPLY_MODE = os.getenv("REPLY_MODE", "sync").lower()             # padrão do campo reply_mode
+REPLY_WORKERS = int(os.getenv("REPLY_WORKERS", "4"))             # chamadas ao LLM simultâneas
+REPLY_QUEUE_MAX = int(os.getenv("REPLY_QUEUE_MAX", "100"))       # jobs aguardando + em execução
+REPLY_JOB_TTL_S = float(os.getenv("REPLY_JOB_TTL_S", "600"))     # resultado disponível por 10 min
+
+# controle de admissão de /api/analyze (por worker): vagas por classe e no total,
+# fila de espera limitada com prazo; acima disso 503 + Retry-After (0 = sem limite)
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "64"))
+ADMISSION_MAX_UPLOADS = int(os.getenv("ADMISSION_MAX_UPLOADS", "8"))       # PDFs/arquivos e lotes
+ADMISSION_MAX_TEXT = int(os.getenv("ADMISSION_MAX_TEXT", "48"))
+ADMISSION_QUEUE_MAX = int(os.getenv("ADMISSION_QUEUE_MAX", "32"))          # esperando vaga, por classe
+ADMISSION_WAIT_S = float(os.getenv("ADMISSION_WAIT_S", "2"))               # prazo para conseguir a vaga
+ADMISSION_UPLOAD_BYTES = int(os.getenv("ADMISSION_UPLOAD_BYTES", "16384"))  # multipart acima disso = upload
+ADMISSION_RETRY_AFTER_S = float(os.getenv("ADMISSION_RETRY_AFTER_S", "2"))
+# limite por cliente (X-API-Key ou IP): token bucket; 0 = desligado
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "0"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") not in ("0", "false", "False")  # usa X-Forwarded-For
+RATE_LIMIT_SHARED_TIMEOUT_S = float(os.getenv("RATE_LIMIT_SHARED_TIMEOUT_S", "0.2"))  # prazo do bucket comum; estourou = bucket local
+
+# concorrência: pool limitado para etapas CPU-bound (pdf, regex, idioma)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+
+# lote (/api/analyze/batch e classify_many)
+HF_BATCH_SIZE = int(os.getenv("HF_BATCH_SIZE", "16"))
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "1000"))
+MAX_BATCH_MB = int(os.getenv("MAX_BATCH_MB", "20"))
+
+# cache de resultados (classificação e respostas)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") not in ("0", "false", "False")
+CACHE_TTL_S = float(os.getenv("CACHE_TTL_S", "86400"))      # 24h
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "64"))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "")      # vazio = só memória
+
+# clientes HTTP (pool de conexões reutilizado durante toda a vida da app)
+HF_API_URL = os.getenv("HF_API_URL", "https://api-inference.huggingface.co/models").rstrip("/")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_S = float(os.getenv("HTTP_KEEPALIVE_S", "30"))
+HTTP2 = os.getenv("HTTP2", "auto").lower()   # auto | 1 | 0 (auto = usa se o pacote h2 existir)
+
+# resiliência das chamadas externas (HF e OpenAI)
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))         # falhas seguidas para abrir o circuito
+BREAKER_COOLDOWN_S = float(os.getenv("BREAKER_COOLDOWN_S", "30"))  # tempo aberto antes da sonda (half-open)
+LATENCY_BUDGET_S = float(os.getenv("LATENCY_BUDGET_S", "20"))      # orçamento total por requisição
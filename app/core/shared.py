@@ -0,0 +1,190 @@
+# app/core/shared.py
+"""
+Estado compartilhado entre os workers de uma mesma máquina (modo `app.serve`),
+num arquivo SQLite em WAL (`SHARED_STATE_PATH`), sem Redis:
+
+- breakers: estado dos circuit breakers por upstream (ver `SharedCircuitBreaker`);
+- buckets: token buckets para limitação de taxa (`take`);
+- metrics: último snapshot das métricas de cada worker, somado no `/metrics`;
+- generations: contadores de versão (ex.: "rules"), para um worker avisar os
+  outros de que devem recarregar algo;
+- jobs: status dos jobs assíncronos (ver `app.core.jobs`), para o polling cair
+  em qualquer worker.
+
+Cada processo abre a sua conexão no primeiro uso. Escritas usam
+`BEGIN IMMEDIATE`: a leitura-e-atualização de uma linha é atômica entre
+processos. Sem `SHARED_STATE_PATH` (um worker só), `get_shared()` é None e tudo
+fica em memória como antes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.settings import SHARED_STATE_PATH
+
+BreakerRow = Tuple[str, int, float, Optional[float]]  # (estado, falhas, aberto_em, sonda_em)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS breakers (name TEXT PRIMARY KEY, state TEXT NOT NULL, failures INTEGER NOT NULL,"
+    " opened_at REAL NOT NULL, probe_at REAL)",
+    "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS metrics (pid INTEGER PRIMARY KEY, updated REAL NOT NULL, payload TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, expires REAL NOT NULL, payload TEXT NOT NULL)",
+)
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class SharedState:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in SCHEMA:
+            self._conn.execute(stmt)
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def reset(self) -> None:
+        """Começo limpo (chamado pelo launcher antes de subir os workers)."""
+        with self._tx() as conn:
+            for table in ("breakers", "buckets", "metrics", "generations", "jobs"):
+                conn.execute(f"DELETE FROM {table}")
+
+    # ------------------------------------------------------------------ breakers
+
+    def read_breaker(self, name: str) -> Optional[BreakerRow]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT state, failures, opened_at, probe_at FROM breakers WHERE name = ?", (name,)
+            ).fetchone()
+
+    @contextmanager
+    def breaker_tx(self, name: str) -> Iterator[List[Any]]:
+        """Linha do breaker para ler e alterar numa transação: `row[:] = (...)` é gravado na saída."""
+        with self._tx() as conn:
+            found = conn.execute(
+                "SELECT state, failures, opened_at, probe_at FROM breakers WHERE name = ?", (name,)
+            ).fetchone()
+            row: List[Any] = list(found) if found else []
+            yield row
+            if row:
+                conn.execute("INSERT OR REPLACE INTO breakers VALUES (?, ?, ?, ?, ?)", (name, *row))
+
+    # ------------------------------------------------------------------ token buckets
+
+    def take(self, name: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """
+        Token bucket comum a todos os workers: 0.0 se `cost` fichas foram
+        consumidas; senão, segundos até haver fichas (nada é consumido).
+        """
+        now = time.time()
+        with self._tx() as conn:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate if rate > 0 else float("inf")
+            conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (name, tokens, now))
+        return wait
+
+    def prune_buckets(self, idle_s: float) -> int:
+        """Apaga buckets parados há mais de `idle_s` (voltariam cheios de qualquer forma)."""
+        with self._tx() as conn:
+            return conn.execute("DELETE FROM buckets WHERE updated < ?", (time.time() - idle_s,)).rowcount
+
+    # ------------------------------------------------------------------ gerações
+
+    def generation(self, name: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, name: str) -> int:
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT INTO generations VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,)
+            )
+            return conn.execute("SELECT value FROM generations WHERE name = ?", (name,)).fetchone()[0]
+
+    # ------------------------------------------------------------------ jobs
+
+    def put_job(self, job_id: str, payload: Dict[str, Any], expires: float) -> None:
+        data = json.dumps(payload, separators=(",", ":"))
+        with self._tx() as conn:
+            conn.execute("DELETE FROM jobs WHERE expires < ?", (time.time(),))
+            conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)", (job_id, expires, data))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Último status publicado do job, ou None se não existe/expirou."""
+        with self._lock:
+            row = self._conn.execute("SELECT expires, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        payload = json.loads(row[1])
+        payload["expires_in_s"] = max(0, int(row[0] - time.time()))
+        return payload
+
+    # ------------------------------------------------------------------ métricas
+
+    def publish_metrics(self, pid: int, snapshot: Dict[str, Any]) -> None:
+        payload = json.dumps(snapshot, separators=(",", ":"))
+        with self._tx() as conn:
+            conn.execute("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?)", (pid, time.time(), payload))
+
+    def metric_snapshots(self) -> List[Tuple[int, bool, Dict[str, Any]]]:
+        """[(pid, vivo, snapshot)]: workers mortos continuam somando contadores, não gauges."""
+        with self._lock:
+            rows = self._conn.execute("SELECT pid, payload FROM metrics").fetchall()
+        return [(pid, pid_alive(pid), json.loads(payload)) for pid, payload in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_shared: Optional[SharedState] = None
+_shared_pid: Optional[int] = None
+_shared_lock = threading.Lock()
+
+def get_shared() -> Optional[SharedState]:
+    """Conexão deste processo (reaberta se o processo mudou) ou None sem SHARED_STATE_PATH."""
+    global _shared, _shared_pid
+    if not SHARED_STATE_PATH:
+        return None
+    pid = os.getpid()
+    if _shared is None or _shared_pid != pid:
+        with _shared_lock:
+            if _shared is None or _shared_pid != pid:
+                _shared, _shared_pid = SharedState(SHARED_STATE_PATH), pid
+    return _shared
+
+def close_shared() -> None:
+    global _shared, _shared_pid
+    with _shared_lock:
+        if _shared is not None and _shared_pid == os.getpid():
+            _shared.close()
+        _shared = _shared_pid = None
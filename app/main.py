@@ -1,12 +1,24 @@
-import time
+import asyncio, signal, sqlite3, sys, time
 from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
+from app.core.admission import Rejected, admission_stats, admit, check_rate, client_id, release, request_class
+from app.core.cache import close_caches
+from app.core.clients import Clients, close_sync_clients
+from app.core.concurrency import run_cpu, shutdown_executor, shutdown_process_pool
+from app.core.jobs import JobQueue
 from app.core.logging import setup_logger
+from app.core.metrics import HTTP_INFLIGHT, HTTP_REQUESTS, HTTP_SECONDS, publish_metrics, render_metrics
+from app.core.resilience import refresh_breakers
+from app.core.settings import METRICS_PUBLISH_S, REPLY_JOB_TTL_S, REPLY_QUEUE_MAX, REPLY_WORKERS, WARMUP
+from app.core.shared import close_shared, get_shared
+from app.routers.admin import follow_rules_generation, reload_rules_async, router as admin_router
 from app.routers.analyze import router as analyze_router
+from app.services.classifier import get_rules
+from app.services.warmup import READINESS, warm_up
 
 ROOT = Path(__file__).resolve().parents[1]
 STATIC = ROOT / "static"
@@ -17,11 +29,68 @@ logger = setup_logger()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("app_startup")
+    # clientes HTTP/OpenAI com pool: reaproveitam conexões entre requisições
+    app.state.clients = Clients()
+    # módulos pesados e modelo local: aquecidos em segundo plano, sem segurar o
+    # startup; /readyz só responde 200 quando terminar
+    warmup = asyncio.create_task(warm_up(app.state.clients)) if WARMUP else None
+    if warmup is None:
+        READINESS.ready = True
+    logger.info("rules_loaded", extra={"version": get_rules().version, "source": get_rules().source})
+    # SIGHUP recarrega o arquivo de regras sem derrubar requisições (não existe no Windows)
+    loop = asyncio.get_running_loop()
+    hup = sys.platform != "win32" and hasattr(signal, "SIGHUP")
+    if hup:
+        try:
+            loop.add_signal_handler(signal.SIGHUP, lambda: loop.create_task(_reload_on_sighup()))
+        except (RuntimeError, ValueError):
+            hup = False  # loop fora da thread principal (ex.: TestClient): só /admin/rules/reload
+    # vários workers (app.serve): publica as métricas e segue recargas de regras dos outros
+    store = get_shared()
+    sync = asyncio.create_task(_shared_sync(store)) if store is not None else None
+    # respostas do LLM fora da requisição (reply_mode=async), com fila limitada
+    app.state.reply_jobs = JobQueue(
+        "reply", workers=REPLY_WORKERS, max_depth=REPLY_QUEUE_MAX, ttl_s=REPLY_JOB_TTL_S, store=store,
+    )
+    app.state.reply_jobs.start()
     try:
         yield
     finally:
+        if hup:
+            loop.remove_signal_handler(signal.SIGHUP)
+        await app.state.reply_jobs.stop()
+        if sync is not None:
+            sync.cancel()
+            await asyncio.gather(sync, return_exceptions=True)
+            publish_metrics()  # contadores finais deste worker continuam somando no /metrics
+            close_shared()
+        if warmup is not None and not warmup.done():
+            warmup.cancel()
+            await asyncio.gather(warmup, return_exceptions=True)
+        await app.state.clients.aclose()
+        close_sync_clients()
+        close_caches()
+        shutdown_executor()
+        shutdown_process_pool()
         logger.info("app_shutdown")
 
+async def _shared_sync(store):
+    while True:
+        await asyncio.sleep(METRICS_PUBLISH_S)
+        try:
+            await run_cpu(publish_metrics)
+            await run_cpu(refresh_breakers)
+            await follow_rules_generation(store)
+            await run_cpu(store.prune_buckets, 3600)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logger.warning("shared_sync_failed", extra={"error": str(e)})
+
+async def _reload_on_sighup():
+    try:
+        await reload_rules_async("sighup")
+    except (OSError, ValueError) as e:
+        logger.warning("rules_reload_failed", extra={"trigger": "sighup", "error": str(e)})
+
 app = FastAPI(title="Email Auto Classifier", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory=str(STATIC)), name="static")
 
@@ -30,6 +99,18 @@ app.mount("/static", StaticFiles(directory=str(STATIC)), name="static")
 async def healthz():
     return {"ok": True}
 
+# Prontidão: 503 até o aquecimento terminar (o /healthz só diz que o processo está de pé)
+@app.get("/readyz")
+async def readyz():
+    body = {**READINESS.as_dict(), "admission": admission_stats()}
+    return JSONResponse(body, status_code=200 if READINESS.ready else 503)
+
+# Métricas (formato de texto do Prometheus)
+@app.get("/metrics")
+async def metrics():
+    # com app.serve, publicar e ler os snapshots dos workers é SQLite: fora do event loop
+    return PlainTextResponse(await run_cpu(render_metrics), media_type="text/plain; version=0.0.4")
+
 # Home (UI)
 @app.get("/")
 async def home():
@@ -38,13 +119,41 @@ async def home():
 
 # API
 app.include_router(analyze_router)
+app.include_router(admin_router)
+
+# Controle de admissão: recusa rápida (429/503 + Retry-After) antes de ler o corpo
+@app.middleware("http")
+async def admission(request: Request, call_next):
+    gate = request_class(request.url.path, request.headers) if request.method == "POST" else None
+    if gate is None:
+        return await call_next(request)
+    try:
+        await check_rate(client_id(request.headers, request.client and request.client.host), gate)
+        held = await admit(gate)
+    except Rejected as e:
+        detail = "Limite de requisições excedido." if e.status == 429 else "Servidor ocupado, tente novamente."
+        logger.warning("admission_rejected", extra={"gate": gate, "reason": e.reason, "status": e.status})
+        return JSONResponse({"detail": detail}, status_code=e.status, headers={"Retry-After": str(e.retry_after)})
+    try:
+        return await call_next(request)
+    finally:
+        release(held)
 
 # (opcional) access log
 @app.middleware("http")
 async def access_log(request: Request, call_next):
     start = time.perf_counter()
-    resp = await call_next(request)
-    dur_ms = int((time.perf_counter() - start) * 1000)
+    HTTP_INFLIGHT.inc()
+    try:
+        resp = await call_next(request)
+    finally:
+        HTTP_INFLIGHT.dec()
+    elapsed = time.perf_counter() - start
+    dur_ms = int(elapsed * 1000)
+    # rótulo pelo template da rota (não pelo path cru) para não explodir a cardinalidade
+    route = getattr(request.scope.get("route"), "path", None) or ("/static" if request.url.path.startswith("/static/") else "other")
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=str(resp.status_code))
+    HTTP_SECONDS.observe(elapsed, route=route)
     logger.info("request",
         extra={"method": request.method, "path": request.url.path,
                "status": resp.status_code, "duration_ms": dur_ms})
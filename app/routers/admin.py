@@ -0,0 +1,71 @@
+# app/routers/admin.py
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.core.concurrency import run_cpu
+from app.core.settings import ADMIN_TOKEN
+from app.core.shared import get_shared
+from app.services.classifier import get_rules, reload_rules
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """Rotas /admin só existem com ADMIN_TOKEN configurado e o header X-Admin-Token correto."""
+    if not ADMIN_TOKEN or not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(403, detail="Acesso negado.")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(_require_admin)])
+
+
+def _rules_info(rules) -> dict:
+    return {
+        "version": rules.version,
+        "source": rules.source,
+        "categories": {name: len(terms) for name, terms in rules.vocabularies.items()},
+    }
+
+
+# geração de regras já aplicada por este worker (modo app.serve, ver `follow_rules_generation`)
+_rules_generation = 0
+
+
+async def reload_rules_async(trigger: str, propagate: bool = True) -> dict:
+    """
+    Compila as regras no pool de CPU e troca o snapshot ativo. Requisições em
+    andamento terminam com o snapshot antigo; as novas já pegam o novo. Com
+    vários workers, avisa os outros pelo estado compartilhado.
+    """
+    global _rules_generation
+    previous = get_rules().version
+    rules = await run_cpu(reload_rules)
+    store = get_shared()
+    if store is not None and propagate:
+        _rules_generation = await run_cpu(store.bump, "rules")
+    logger.info("rules_reloaded", extra={"trigger": trigger, "version": rules.version, "previous": previous})
+    return {**_rules_info(rules), "previous": previous, "changed": rules.version != previous}
+
+
+async def follow_rules_generation(store) -> None:
+    """Recarrega as regras se outro worker as recarregou desde a última checagem."""
+    global _rules_generation
+    generation = await run_cpu(store.generation, "rules")
+    if generation != _rules_generation:
+        _rules_generation = generation
+        await reload_rules_async("shared", propagate=False)
+
+
+@router.get("/rules")
+async def rules_status():
+    return _rules_info(get_rules())
+
+
+@router.post("/rules/reload")
+async def rules_reload():
+    try:
+        return await reload_rules_async("admin")
+    except (OSError, ValueError) as e:
+        # arquivo ausente/inválido: o snapshot atual continua valendo
+        logger.warning("rules_reload_failed", extra={"trigger": "admin", "error": str(e)})
+        raise HTTPException(422, detail=f"Regras inválidas: {e}")
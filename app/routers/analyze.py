@@ -1,12 +1,25 @@
 # app/routers/analyze.py
-import time, math
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
+import asyncio, json, time, math
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pathlib import Path
 
-from app.services.classifier import read_txt_pdf, classify_email, clean_text, detect_language
-from app.services.replier import ai_reply, reply_template
-from app.schemas import AnalyzeResponse
+from app.core.cache import get_cache, cache_stats
+from app.core.concurrency import run_cpu
+from app.core.jobs import FINAL
+from app.core.metrics import CACHE_LOOKUPS, CLASSIFICATIONS, FALLBACKS, REPLIES, track_stages, track_tokens
+from app.core.resilience import LatencyBudget, breaker_states
+from app.core.settings import MAX_BATCH_ITEMS, MAX_BATCH_MB, OPENAI_KEY, LATENCY_BUDGET_S, REPLY_MODE
+from app.services.classifier import (
+    classify_email_async, classify_many_compact_async, detect_language, detect_language_many, PreparedEmail, prepare_content,
+    classification_cache_key, is_cacheable, get_rules,
+)
+from app.services.ingest import ingest_upload
+from app.services.quoting import ATTACHMENT_SEPARATOR
+from app.services.replier import (
+    ai_reply_async, llm_reply_allowed, reply_template, reply_cache_key, semantic_reply_key,
+)
+from app.schemas import AnalyzeResponse, BatchAnalyzeResponse
 import logging
 logger = logging.getLogger(__name__)
 
@@ -15,14 +28,130 @@ router = APIRouter(prefix="/api")
 
 ROOT = Path(__file__).resolve().parents[2]
 TEMPLATES = ROOT / "templates"
-MAX_SIZE = 2 * 1024 * 1024  # 2 MB
+
+
+def _clients(request: Request):
+    """Clientes com pool criados no lifespan (None se a app subiu sem lifespan)."""
+    return getattr(request.app.state, "clients", None)
+
+
+async def _classify_cached(
+    email: PreparedEmail, http=None, budget: LatencyBudget | None = None
+) -> tuple[tuple[str, float, list, dict], str]:
+    """classify_email_async com cache por conteúdo. Retorna (resultado, "hit"|"miss"|"off")."""
+    cache = get_cache("classification")
+    if cache is None:
+        return await classify_email_async(email, client=http, budget=budget), "off"
+    key = classification_cache_key(email)
+    cached = await cache.get_async(key)
+    CACHE_LOOKUPS.inc(cache="classification", result="miss" if cached is None else "hit")
+    if cached is not None:
+        engine = cached.get("engine") or ("hf" if cached["used_hf"] else "rules")
+        info = {"used_hf": cached["used_hf"], "engine": engine, "overrides": cached["overrides"]}
+        return (cached["category"], cached["confidence"], cached["signals"], info), "hit"
+
+    category, confidence, signals, info = await classify_email_async(email, client=http, budget=budget)
+    if is_cacheable(info):
+        await cache.set_async(key, {
+            "category": category, "confidence": confidence, "signals": signals,
+            "overrides": info.get("overrides"), "used_hf": info.get("used_hf", False),
+            "engine": info.get("engine"),
+        })
+    return (category, confidence, signals, info), "miss"
+
+
+def _reply_slot(category: str, snippet: str, signals: list[str], lang: str) -> tuple[str, str]:
+    """(cache, chave): semântica (sem o texto do e-mail) quando a categoria usa, senão exata."""
+    key = semantic_reply_key(category, lang, signals)
+    if key is not None:
+        return "reply_semantic", key
+    return "reply", reply_cache_key(category, lang, signals, snippet)
+
+
+async def _cached_reply(category: str, snippet: str, signals: list[str], lang: str) -> tuple[str | None, str]:
+    """Só a consulta ao cache de respostas: (texto|None, "hit"|"miss"|"off")."""
+    name, key = _reply_slot(category, snippet, signals, lang)
+    cache = get_cache(name)
+    if cache is None or not OPENAI_KEY:
+        return None, "off"
+    cached = await cache.get_async(key)
+    CACHE_LOOKUPS.inc(cache=name, result="miss" if cached is None else "hit")
+    return cached, "miss" if cached is None else "hit"
+
+
+async def _ai_reply_cached(
+    category: str, snippet: str, signals: list[str], lang: str,
+    openai_client=None, budget: LatencyBudget | None = None, lookup: bool = True,
+) -> tuple[str | None, str]:
+    """ai_reply_async com cache (semântico ou por hash do snippet, ver `_reply_slot`)."""
+    name, key = _reply_slot(category, snippet, signals, lang)
+    cache = get_cache(name)
+    if cache is None or not OPENAI_KEY:
+        text = await ai_reply_async(category, snippet, signals, lang=lang, client=openai_client, budget=budget)
+        return text, "off"
+    if lookup:
+        cached, _ = await _cached_reply(category, snippet, signals, lang)
+        if cached is not None:
+            return cached, "hit"
+    text = await ai_reply_async(category, snippet, signals, lang=lang, client=openai_client, budget=budget)
+    if text:
+        await cache.set_async(key, text)
+    return text, "miss"
+
+
+# ============================================================
+# Resposta assíncrona (reply_mode=async): fila de jobs + /api/replies/{id}
+# ============================================================
+
+SSE_KEEPALIVE_S = 15.0
+
+
+def _reply_queue(request: Request):
+    """Fila criada no lifespan (None se a app subiu sem lifespan: cai no modo sync)."""
+    return getattr(request.app.state, "reply_jobs", None)
+
+
+def _job_links(job: dict) -> dict:
+    return {
+        **job,
+        "poll": f"/api/replies/{job['id']}",
+        "events": f"/api/replies/{job['id']}/events",
+    }
+
+
+async def _reply_job(category: str, snippet: str, signals: list[str], lang: str, clients) -> dict:
+    """Roda na fila: orçamento próprio (a requisição original já respondeu)."""
+    budget = LatencyBudget(LATENCY_BUDGET_S)
+    tokens = track_tokens()
+    text, _ = await _ai_reply_cached(
+        category, snippet, signals, lang, openai_client=clients and clients.openai, budget=budget, lookup=False,
+    )
+    fallbacks = list(budget.fallbacks)
+    used_openai = bool(text)
+    if not used_openai:
+        text = reply_template(category, signals, lang=lang)
+        fallbacks.append("templates")
+        FALLBACKS.inc(reason="templates")
+    REPLIES.inc(source="openai" if used_openai else "template")
+    return {"reply": text, "used_openai": used_openai, "fallbacks": fallbacks, "tokens": tokens.as_meta()}
 
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze(
+    request: Request,
     email_file: UploadFile | None = File(None),
     email_text: str | None = Form(None),
+    reply_mode: str | None = Form(None),
 ):
     start = time.perf_counter()
+    reply_mode = (reply_mode or REPLY_MODE).lower()
+    if reply_mode not in ("sync", "async"):
+        raise HTTPException(422, detail="reply_mode deve ser 'sync' ou 'async'.")
+    # orçamento total para as chamadas externas (HF + OpenAI) desta requisição
+    budget = LatencyBudget(LATENCY_BUDGET_S)
+    # tempo por etapa (ingestão, preparo, idioma, regras, HF, OpenAI) -> meta.stages
+    stages = track_stages()
+    # tokens da LLM atribuídos a esta requisição (a sua parte, se a resposta veio num lote)
+    tokens = track_tokens()
 
     # --- normaliza texto colado ---
     raw_text = (email_text or "").strip()
@@ -37,21 +166,15 @@ async def analyze(
 
     file_text = ""
     if has_real_file:
-        # mede tamanho
-        email_file.file.seek(0, 2)  # fim
-        size = email_file.file.tell()
-        email_file.file.seek(0)     # volta pro início
-        if size > MAX_SIZE:
-            raise HTTPException(413, detail="Arquivo muito grande. Limite: 2MB.")
-
-        # lê conteúdo (422 se vazio/ilegível)
-        file_text = read_txt_pdf(email_file)
+        # tamanho (413), formato (415) e conteúdo (422 se vazio/ilegível); PDF num
+        # pool de processos com limite de páginas/caracteres/tempo
+        file_text = await ingest_upload(email_file)
 
 
 
     # --- decide conteúdo final (combina texto+arquivo se ambos vierem) ---
     if raw_text and file_text:
-        content = f"{raw_text}\n\n---\n[CONTEÚDO DO ANEXO]\n{file_text}"
+        content = f"{raw_text}{ATTACHMENT_SEPARATOR}{file_text}"
     elif raw_text:
         content = raw_text
     elif file_text:
@@ -66,25 +189,55 @@ async def analyze(
 
 
     # --- pipeline de classificação ---
-    text_clean = clean_text(content)
-    snippet = text_clean[:1000]
+    # limpeza/normalização uma única vez, compartilhada por todo o pipeline
+    # (modo incremental: só a mensagem mais recente, varrida até a categoria travar)
+    email = await run_cpu(prepare_content, content)
+    snippet = email.snippet
+    clients = _clients(request)
 
-    # 🔹 detectar idioma do e-mail
-    lang = detect_language(snippet, default="pt")
-
-    #classificar
-    category, confidence, signals, info = classify_email(content)
+    # 🔹 detectar idioma e classificar em paralelo (HF não segura o pool de CPU)
+    lang, ((category, confidence, signals, info), cls_cache) = await asyncio.gather(
+        run_cpu(detect_language, email, default="pt"),
+        _classify_cached(email, http=clients and clients.http, budget=budget),
+    )
 
     # --- resposta ---
-    fallbacks = []
     used_openai = False
-    ai_text = ai_reply(category, snippet, signals, lang=lang)
+    reply_job = None
+    queue = _reply_queue(request)
+    if OPENAI_KEY and not llm_reply_allowed(category):
+        # LLM_REPLY_POLICY: esta categoria fica no template, sem chamada nem job
+        ai_text, reply_cache = None, "off"
+        budget.fallbacks.append("reply_policy")
+        FALLBACKS.inc(reason="reply_policy")
+    elif reply_mode == "async" and OPENAI_KEY and queue is not None:
+        # classificação volta já; o LLM roda na fila e o cliente busca o resultado pelo job
+        ai_text, reply_cache = await _cached_reply(category, snippet, signals, lang)
+        if ai_text is None:
+            job = await queue.submit(lambda: _reply_job(category, snippet, signals, lang, clients))
+            if job is None:
+                budget.fallbacks.append("reply_queue_full")
+                FALLBACKS.inc(reason="reply_queue_full")
+            else:
+                reply_job = _job_links(job.as_dict())
+    else:
+        ai_text, reply_cache = await _ai_reply_cached(
+            category, snippet, signals, lang, openai_client=clients and clients.openai, budget=budget
+        )
+    # motivos de fallback das chamadas externas ("hf:circuit_open", "openai:budget_exhausted", ...)
+    fallbacks = list(budget.fallbacks)
     if ai_text:
         reply_text = ai_text
         used_openai = True
     else:
+        # no modo async, o template é provisório: a resposta do LLM vem pelo job
         reply_text = reply_template(category, signals, lang=lang)
-        fallbacks.append("templates")
+        if reply_job is None:
+            fallbacks.append("templates")
+            FALLBACKS.inc(reason="templates")
+    CLASSIFICATIONS.inc(endpoint="analyze", engine=info.get("engine") or "rules", category=category)
+    if reply_job is None:
+        REPLIES.inc(source="openai" if used_openai else "template")
 
     logger.info(
     "analyze_result",
@@ -104,16 +257,164 @@ async def analyze(
         "language": lang,
         "signals": signals,
         "used_hf": info.get("used_hf", False),
+        "engine": info.get("engine"),
         "used_openai": used_openai,
         "fallbacks": fallbacks,
         "overrides": info.get("overrides"),
+        "scan": email.scan_info,
+        "rules_version": email.rules.version,
+        "stages": stages.as_meta(),
         "elapsed_ms": elapsed_ms,
         "output_size": len(reply_text or ""),
+        "cache": {"classification": cls_cache, "reply": reply_cache, "stats": cache_stats()},
+        "breakers": breaker_states(),
+        "reply_job": reply_job,
+        "tokens": tokens.as_meta(),
+    }
+
+    # dict puro: o response_model valida/serializa uma vez só (sem modelo intermediário)
+    return {"category": category, "confidence": confidence, "reply": reply_text, "meta": meta}
+
+
+def _parse_batch(body: bytes, content_type: str) -> list[tuple[str | None, str]]:
+    """
+    Aceita um array JSON ou NDJSON (um item por linha). Cada item é uma string
+    ou um objeto {"id": ..., "email_text": ...}. Retorna [(id, texto)].
+    """
+    raw = body.decode("utf-8", errors="ignore").strip()
+    if not raw:
+        raise HTTPException(400, detail="Envie um array JSON ou NDJSON com os e-mails.")
+
+    is_ndjson = "ndjson" in content_type or "jsonl" in content_type or not raw.startswith("[")
+    try:
+        if is_ndjson:
+            items = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        else:
+            items = json.loads(raw)
+    except ValueError:
+        raise HTTPException(422, detail="JSON/NDJSON inválido.")
+    if not isinstance(items, list):
+        raise HTTPException(422, detail="Esperado um array JSON ou NDJSON.")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(413, detail=f"Lote muito grande. Limite: {MAX_BATCH_ITEMS} e-mails.")
+
+    out, empty = [], []
+    for i, item in enumerate(items):
+        if isinstance(item, str):
+            item_id, text = None, item
+        elif isinstance(item, dict):
+            item_id = item.get("id")
+            text = item.get("email_text") or ""
+        else:
+            raise HTTPException(422, detail=f"Item {i} inválido: use string ou objeto com 'email_text'.")
+        if not isinstance(text, str) or not text.strip():
+            empty.append(i)
+        out.append((None if item_id is None else str(item_id), text if isinstance(text, str) else ""))
+    if empty:
+        raise HTTPException(422, detail=f"Itens vazios no lote: {empty[:20]}")
+    return out
+
+
+@router.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_batch(request: Request):
+    """
+    Classificação em lote (array JSON ou NDJSON). Reaproveita o pipeline de
+    `/analyze`, com zero-shot HF agrupado; as respostas vêm dos templates.
+    """
+    start = time.perf_counter()
+    budget = LatencyBudget(LATENCY_BUDGET_S)
+    stages = track_stages()
+
+    body = await request.body()
+    if len(body) > MAX_BATCH_MB * 1024 * 1024:
+        raise HTTPException(413, detail=f"Lote muito grande. Limite: {MAX_BATCH_MB}MB.")
+    items = await run_cpu(_parse_batch, body, request.headers.get("content-type", ""))
+
+    # um único snapshot de regras para o lote inteiro, mesmo com recarga no meio
+    rules = get_rules()
+    emails = await run_cpu(lambda: [prepare_content(text, rules=rules) for _, text in items])
+    clients = _clients(request)
+    langs, classified = await asyncio.gather(
+        run_cpu(detect_language_many, emails, default="pt"),
+        classify_many_compact_async(emails, client=clients and clients.http, budget=budget),
+    )
+
+    breakers = breaker_states()
+    results = []
+    for (item_id, _), email, lang, result in zip(items, emails, langs, classified):
+        # JSON montado só aqui, a partir do resultado compacto (IDs + bitset)
+        signals = result.signals()
+        reply_text = reply_template(result.category, signals, lang=lang)
+        CLASSIFICATIONS.inc(endpoint="batch", engine=result.engine, category=result.category)
+        results.append({
+            "id": item_id,
+            "category": result.category,
+            "confidence": result.confidence,
+            "reply": reply_text,
+            "meta": {
+                "language": lang,
+                "signals": signals,
+                "used_hf": result.engine == "hf",
+                "engine": result.engine,
+                "used_openai": False,
+                "fallbacks": (budget.fallbacks if result.engine == "rules" else []) + ["templates"],
+                "overrides": result.overrides(),
+                "scan": email.scan_info,
+                "rules_version": rules.version,
+                "output_size": len(reply_text or ""),
+                "breakers": breakers,
+            },
+        })
+
+    REPLIES.inc(len(results), source="template")
+    FALLBACKS.inc(len(results), reason="templates")
+    elapsed_ms = max(1, math.ceil((time.perf_counter() - start) * 1000))
+    logger.info("analyze_batch", extra={"count": len(results), "elapsed_ms": elapsed_ms})
+    return {
+        "count": len(results), "elapsed_ms": elapsed_ms, "rules_version": rules.version,
+        "stages": stages.as_meta(), "results": results,
     }
 
-    return AnalyzeResponse(
-        category=category,
-        confidence=confidence,
-        reply=reply_text,
-        meta=meta,
+
+@router.get("/replies/{job_id}")
+async def reply_status(job_id: str, request: Request):
+    """Status do job de resposta; `result` ({reply, used_openai, fallbacks}) quando `done`."""
+    queue = _reply_queue(request)
+    job = await queue.get(job_id) if queue is not None else None
+    if job is None:
+        raise HTTPException(404, detail="Job não encontrado ou expirado.")
+    return _job_links(job)
+
+
+@router.get("/replies/{job_id}/events")
+async def reply_events(job_id: str, request: Request):
+    """
+    Server-Sent Events: um evento `status` a cada mudança (pending -> running ->
+    done|failed|expired) e comentários de keep-alive enquanto espera.
+    """
+    queue = _reply_queue(request)
+    job = await queue.get(job_id) if queue is not None else None
+    if job is None:
+        raise HTTPException(404, detail="Job não encontrado ou expirado.")
+
+    async def stream():
+        current, last = job, None
+        while True:
+            if current is None:
+                yield "event: status\ndata: " + json.dumps({"id": job_id, "status": "expired"}) + "\n\n"
+                return
+            if current["status"] != last:
+                last = current["status"]
+                yield "event: status\ndata: " + json.dumps(_job_links(current), ensure_ascii=False) + "\n\n"
+                if last in FINAL:
+                    return
+            else:
+                yield ": keep-alive\n\n"
+            if await request.is_disconnected():
+                return
+            current = await queue.wait(job_id, SSE_KEEPALIVE_S)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
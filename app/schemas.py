@@ -2,18 +2,46 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
+class ReplyJob(BaseModel):
+    id: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    elapsed_ms: Optional[int] = None
+    expires_in_s: Optional[int] = None
+    poll: Optional[str] = None
+    events: Optional[str] = None
+
 class AnalyzeMeta(BaseModel):
     language: str = "pt"
     signals: List[str] = []
     used_hf: bool = False
+    engine: Optional[str] = None
     used_openai: bool = False
     fallbacks: List[str] = []
     overrides: Optional[Dict[str, Any]] = None
+    scan: Optional[Dict[str, Any]] = None
+    rules_version: Optional[str] = None
+    stages: Optional[Dict[str, float]] = None
     elapsed_ms: Optional[int] = None
     output_size: Optional[int] = None
+    cache: Optional[Dict[str, Any]] = None
+    breakers: Optional[Dict[str, str]] = None
+    reply_job: Optional[ReplyJob] = None
+    tokens: Optional[Dict[str, int]] = None
 
 class AnalyzeResponse(BaseModel):
     category: str = Field(pattern="^(Produtivo|Improdutivo)$")
     confidence: float
     reply: str
     meta: AnalyzeMeta
+
+class BatchItemResponse(AnalyzeResponse):
+    id: Optional[str] = None
+
+class BatchAnalyzeResponse(BaseModel):
+    count: int
+    elapsed_ms: Optional[int] = None
+    rules_version: Optional[str] = None
+    stages: Optional[Dict[str, float]] = None
+    results: List[BatchItemResponse]
@@ -0,0 +1,81 @@
+# app/serve.py
+"""
+Modo multi-processo: sobe N workers do uvicorn (padrão: um por núcleo
+disponível) com estado compartilhado num diretório local, sem Redis:
+
+    python -m app.serve                       # WEB_WORKERS ou um por núcleo, porta 8000
+    python -m app.serve --workers 4 --port 8080 --state-dir /var/run/email-classifier
+
+- `SHARED_STATE_PATH` (<state-dir>/state.db): circuit breakers, limites de taxa,
+  snapshots das métricas (somadas no `/metrics` de qualquer worker) e a geração
+  das regras (um POST /admin/rules/reload num worker recarrega todos);
+- `CACHE_SQLITE_PATH` (<state-dir>/cache.db, se não configurado): nível em disco
+  do cache de resultados, comum a todos; cada worker mantém o seu nível em memória.
+
+Os pools por worker (`CPU_WORKERS`, `INGEST_WORKERS`) são divididos pelos
+núcleos quando não configurados, para N workers não criarem N vezes o pool
+inteiro. `kill -HUP <pid do launcher>` reinicia os workers um a um (o uvicorn
+trata o sinal), relendo regras e configuração.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS/Windows
+        return os.cpu_count() or 1
+
+def worker_env(workers: int, cores: int, state_dir: Path) -> dict:
+    """Variáveis herdadas pelos workers (só preenche o que não foi configurado)."""
+    env = {"SHARED_STATE_PATH": str(state_dir / "state.db")}
+    if not os.getenv("CACHE_SQLITE_PATH"):
+        env["CACHE_SQLITE_PATH"] = str(state_dir / "cache.db")
+    per_worker = max(1, cores // workers)
+    if not os.getenv("CPU_WORKERS"):
+        env["CPU_WORKERS"] = str(per_worker + 2)
+    if not os.getenv("INGEST_WORKERS"):
+        env["INGEST_WORKERS"] = str(min(4, per_worker))
+    return env
+
+def main() -> int:
+    load_dotenv()
+    cores = available_cores()
+    ap = argparse.ArgumentParser(description="Sobe a API com vários workers e estado compartilhado.")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", "0")) or cores)
+    ap.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--state-dir", default=os.getenv("STATE_DIR", ""),
+                    help="diretório do estado compartilhado (padrão: temporário, apagado ao sair)")
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args()
+
+    workers = max(1, args.workers)
+    temporary = not args.state_dir
+    state_dir = Path(args.state_dir or tempfile.mkdtemp(prefix="email-classifier-"))
+    state_dir.mkdir(parents=True, exist_ok=True)
+    os.environ.update(worker_env(workers, cores, state_dir))
+
+    # importados depois do ambiente pronto: o settings lê as variáveis no import
+    import uvicorn
+    from app.core.shared import SharedState
+
+    state = SharedState(os.environ["SHARED_STATE_PATH"])
+    state.reset()
+    state.close()
+    print(f"[serve] {workers} workers ({cores} núcleos), estado em {state_dir}", file=sys.stderr)
+    try:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers, log_level=args.log_level)
+    finally:
+        if temporary:
+            shutil.rmtree(state_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
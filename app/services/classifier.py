@@ -1,51 +1,52 @@
 # app/services/classifier.py
-from typing import List, Tuple, Dict, Iterable, Pattern
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Tuple, Dict, Iterable, Mapping
 from fastapi import UploadFile, HTTPException
-import io, re, requests, time
-from pdfminer.high_level import extract_text as pdf_extract_text
-from langdetect import detect_langs, DetectorFactory
-from app.core.settings import HF_TOKEN, HF_MODEL
-
-DetectorFactory.seed = 0
+import asyncio, hashlib, io, json, logging, math, os, pickle, re, sys, threading
+from array import array
+from pathlib import Path
+import httpx
+from app.core.settings import (
+    HF_TOKEN, HF_MODEL, HF_BATCH_SIZE, HF_API_URL, CLASSIFIER_BACKEND, LOCAL_MODEL_PATH,
+    INCREMENTAL_SCAN, SCAN_CHUNK_CHARS, RULES_PATH, RULES_SNAPSHOT_PATH, RULES_VECTOR_MIN_BATCH,
+)
+from app.core.clients import get_sync_http
+from app.core.cache import content_key
+from app.core.concurrency import run_cpu
+from app.core.metrics import stage, timed
+from app.core.resilience import LatencyBudget, call_with_retries, call_with_retries_async, get_breaker
+from app.services.ingest import read_pdf, read_txt_stream
+from app.services.linear_model import LinearModel
+from app.services.matcher import MatchResult, TermMatcher
+from app.services.quoting import strip_history
+
+logger = logging.getLogger(__name__)
 
 SUPPORTED = {"pt", "en", "es"}
 
 # ============================================================================
-# Helpers de regex padronizados
+# Normalização
 # ============================================================================
 
-FLAGS = re.IGNORECASE
+try:
+    from unidecode import unidecode as _unidecode
+except Exception:  # pragma: no cover - unidecode está no requirements
+    _unidecode = None
+
+# regex usados no caminho da requisição: todos compilados no import
+WS_RE = re.compile(r"\s+")
+OLA_RE = re.compile(r"\bola\b")
 
 def normalize(text: str) -> str:
+    if _unidecode is None:
+        return text.lower()
     try:
-        from unidecode import unidecode
-        return unidecode(text.lower().strip())
+        return _unidecode(text.lower().strip())
     except Exception:
         return text.lower()
 
-def _literal_to_regex(term: str) -> Pattern:
-    """
-    Converte um termo literal para regex robusto:
-    - Escapa metacaracteres do termo
-    - Substitui espaços por \\s+ para tolerar múltiplos espaços/pontuações
-    - Adiciona bordas de palavra \\b...\\b
-    """
-    t = normalize(term)
-    escaped = re.escape(t)
-    escaped = re.sub(r"\s+", r"\\s+", escaped)
-    pat = rf"\b{escaped}\b"
-    return re.compile(pat, FLAGS)
-
-def _compile_patterns(terms: Iterable[str]) -> List[Pattern]:
-    return [_literal_to_regex(t) for t in terms]
-
-def _compile_map_weights(weight_map: Dict[str, float]) -> Dict[str, Pattern]:
-    """Mantém as chaves originais (para exibir nos chips), valor vira regex compilada."""
-    return {k: _literal_to_regex(k) for k in weight_map.keys()}
-
-def any_match(patterns: Iterable[Pattern], text: str) -> bool:
-    return any(rx.search(text) for rx in patterns)
-
 # ============================================================================
 # Detecção de idioma (PT / EN / ES) com heurísticas
 # ============================================================================
@@ -54,22 +55,86 @@ _EN_WHITELIST = {"hi", "hello", "hey", "good morning", "good afternoon", "good e
 _ES_WHITELIST = {"hola", "buenas", "buenos dias", "buenas tardes", "gracias"}
 _PT_WHITELIST = {"oi", "ola", "bom dia", "boa tarde", "boa noite", "obrigado", "obrigada"}
 
-def detect_language(text: str, default: str = "pt") -> str:
+# Perfis de n-gramas de caracteres (1 a 3) por idioma, gerados por
+# benchmarks/build_lang_profiles.py. No primeiro uso viram um índice n-grama -> posição
+# e um array com o log P(n-grama | idioma) de cada idioma (suavizado), lidos sem
+# trava por todas as threads.
+LANG_PROFILES_PATH = Path(__file__).with_name("lang_profiles.json")
+NONLETTER_RE = re.compile(r"[\W\d_]+")
+NGRAM_PRUNE_RATIO = 100_000  # corte de frequência usado na geração dos perfis originais
+MIN_NGRAM_COVERAGE = 0.5  # abaixo disso o texto não é PT/EN/ES (outro alfabeto/idioma)
+
+def _load_ngram_model(path: Path) -> tuple[tuple[str, ...], dict[str, int], tuple[array, ...]]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    langs = tuple(data["langs"])
+    grams = sorted(set().union(*(data["profiles"][lang]["freq"] for lang in langs)))
+    index = {g: i for i, g in enumerate(grams)}
+    tables = []
+    for lang in langs:
+        freq, n_words = data["profiles"][lang]["freq"], data["profiles"][lang]["n_words"]
+        # n-grama ausente do perfil foi podado (contagem < n_words[0] / NGRAM_PRUNE_RATIO):
+        # estima metade desse corte em vez de zero
+        missing = n_words[0] / NGRAM_PRUNE_RATIO / 2
+        tables.append(array("d", (math.log(freq.get(g, missing) / n_words[len(g) - 1]) for g in grams)))
+    return langs, index, tuple(tables)
+
+_ngram: tuple[tuple[str, ...], dict[str, int], tuple[array, ...]] | None = None
+_ngram_lock = threading.Lock()
+
+def ngram_model() -> tuple[tuple[str, ...], dict[str, int], tuple[array, ...]]:
+    """Perfis carregados no primeiro uso (aquecidos no lifespan, ver `app.services.warmup`)."""
+    global _ngram
+    if _ngram is None:
+        with _ngram_lock:
+            if _ngram is None:
+                _ngram = _load_ngram_model(LANG_PROFILES_PATH)
+    return _ngram
+
+def ngram_language(text: str) -> tuple[str, float] | None:
+    """
+    Naive Bayes sobre n-gramas de caracteres (1-3) das palavras do texto.
+    Retorna (idioma, probabilidade a posteriori) ou None se não houver letras;
+    texto com poucos n-gramas conhecidos (outro alfabeto/idioma) vem como "und".
+    Determinístico: todos os n-gramas entram, sem amostragem.
     """
-    Heurísticas diretas + langdetect como fallback.
+    words = NONLETTER_RE.sub(" ", text.lower()).split()
+    if not words:
+        return None
+    # palavras separadas por um espaço: todo bigrama é válido (" a", "ab", "b ");
+    # trigramas com espaço no meio atravessariam duas palavras e ficam de fora
+    padded = " " + " ".join(words) + " "
+    grams = list("".join(words))
+    grams += [padded[k:k + 2] for k in range(len(padded) - 1)]
+    grams += [padded[k:k + 3] for k in range(len(padded) - 2) if padded[k + 1] != " "]
+    langs, index, logp = ngram_model()
+    idx = [i for i in map(index.get, grams) if i is not None]
+    if len(idx) < len(grams) * MIN_NGRAM_COVERAGE:
+        return "und", 1.0
+    scores = [sum(map(table.__getitem__, idx)) for table in logp]
+    best = max(scores)
+    top = scores.index(best)
+    return langs[top], 1.0 / sum(math.exp(sc - best) for sc in scores)
+
+@timed("language")
+def detect_language(text: "str | PreparedEmail", default: str = "pt") -> str:
+    """
+    Heurísticas diretas + perfis de n-gramas (`ngram_language`) como fallback.
     - Viés para PT quando há 'ola' (sem 'h') ou pistas típicas ('está', 'não', 'funcionando', etc.).
     - Suporta textos curtos e médios.
+    - Aceita um `PreparedEmail` (usa o snippet já limpo, normalizado uma única vez).
     """
-    t = (text or "").strip()
+    if isinstance(text, PreparedEmail):
+        t, norm = text.snippet.strip(), text.snippet_norm
+    else:
+        t = (text or "").strip()
+        norm = normalize(t) if t else ""
     if not t:
         return default
 
-    norm = normalize(t)
-
     # Heurísticas diretas PT/ES
     if "hola" in norm:
         return "es"
-    if re.search(r"\bola\b", norm) and "hola" not in norm:
+    if OLA_RE.search(norm) and "hola" not in norm:
         return "pt"
 
     # Pistas explícitas de PT (sem acento por causa de normalize)
@@ -82,15 +147,14 @@ def detect_language(text: str, default: str = "pt") -> str:
     if any(kw in norm for kw in _ES_WHITELIST): return "es"
     if any(kw in norm for kw in _EN_WHITELIST): return "en"
 
-    # Fallback: langdetect
-    try:
-        langs = detect_langs(t)
-        top = max(langs, key=lambda x: x.prob)
-        lang, prob = top.lang, float(top.prob)
+    # Fallback: n-gramas de caracteres
+    detected = ngram_language(t)
+    if detected is not None:
+        lang, prob = detected
 
-        # Se langdetect apontar ES mas houver indícios fortes de PT, favorece PT
+        # Se o fallback apontar ES mas houver indícios fortes de PT, favorece PT
         if lang == "es":
-            if re.search(r"\bola\b", norm) and "hola" not in norm:
+            if OLA_RE.search(norm) and "hola" not in norm:
                 return "pt"
             if any(kw in norm for kw in _PT_WHITELIST):
                 return "pt"
@@ -102,12 +166,13 @@ def detect_language(text: str, default: str = "pt") -> str:
             return "en"
 
         return lang if lang in SUPPORTED else default
-    except Exception:
-        if "hola" in norm: return "es"
-        if re.search(r"\bola\b", norm): return "pt"
-        if t.isascii() and any(c.isalpha() for c in t):
-            if any(kw in norm for kw in _EN_WHITELIST): return "en"
-        return default
+
+    # Sem letras para analisar
+    if "hola" in norm: return "es"
+    if OLA_RE.search(norm): return "pt"
+    if t.isascii() and any(c.isalpha() for c in t):
+        if any(kw in norm for kw in _EN_WHITELIST): return "en"
+    return default
 
 # ============================================================================
 # Limpeza e leitura de arquivos
@@ -120,159 +185,354 @@ def clean_text(text: str) -> str:
     text = text or ""
     text = HTML_TAG_RE.sub(" ", text)
     text = SIGN_RE.sub(" ", text)
-    return re.sub(r"\s+", " ", text).strip()
+    return WS_RE.sub(" ", text).strip()
 
 def read_txt_pdf(file: UploadFile) -> str:
+    """Versão síncrona de `app.services.ingest.ingest_upload` (sem checagem de tamanho)."""
     name = (file.filename or "").lower()
-    blob = file.file.read()
+    if name.endswith(".txt"):
+        return read_txt_stream(file.file)
+    return read_document(name, file.file.read())
+
+def read_document(filename: str, blob: bytes) -> str:
+    """Extrai o texto de um .txt/.pdf já lido em memória (CLI em lote), com os limites da ingestão."""
+    name = (filename or "").lower()
 
     if name.endswith(".txt"):
-        text = blob.decode(errors="ignore")
-        if not text.strip():
-            raise HTTPException(422, detail="TXT vazio ou ilegível.")
-        return text
+        with io.BytesIO(blob) as f:
+            return read_txt_stream(f)
 
     if name.endswith(".pdf"):
-        try:
-            with io.BytesIO(blob) as f:
-                text = pdf_extract_text(f)
-            if not text.strip():
-                raise HTTPException(422, detail="PDF sem texto (escaneado/sem OCR) ou vazio.")
-            return text
-        except Exception:
-            raise HTTPException(415, detail="PDF não suportado (envie PDF pesquisável).")
+        return read_pdf(blob)
 
     raise HTTPException(415, detail="Formato não suportado. Use .txt ou .pdf.")
 
 # ============================================================================
-# Vocabulários → regex
+# Texto preparado (uma vez por requisição)
 # ============================================================================
 
-POS_SIGNALS = {
-    "anexo": 1.4, "arquivo": 1.2, "solicitacao": 1.3, "pedido": 1.0, "status": 1.4,
-    "andamento": 1.1, "atualizacao": 1.1, "erro": 1.5, "sistema": 1.0,
-    "prazo": 1.2, "urgente": 1.4, "nota fiscal": 1.2, "nf": 1.1, "contrato": 1.2,
-    "chamado": 1.3, "protocolo": 1.0, "boleto": 1.0, "fatura": 1.0,
-}
-NEG_SIGNALS = {
-    "obrigado": 2.2, "muito obrigado": 2.5, "agradeco": 2.2, "agradecimento": 2.5,
-    "feliz natal": 2.5, "feliz ano": 2.2, "ano novo": 2.0, "parabens": 2.0,
-    "newsletter": 1.6, "divulgacao": 1.5, "marketing": 1.5, "convite": 1.4,
-    "bom dia": 0.6, "boa tarde": 0.6, "boa noite": 0.6,
-}
-
-RX_POS = _compile_map_weights(POS_SIGNALS)
-RX_NEG = _compile_map_weights(NEG_SIGNALS)
-
-REQUEST_TERMS_RX = _compile_patterns([
-    # pt
-    "verificar","poderiam verificar","podem verificar","informar","enviar","mandar",
-    "emitir","atualizar","abrir","analisar","corrigir","resolver","processar","gerar",
-    # en
-    "check","could you","can you","please send","share","provide","issue","update","open","fix","resolve","process","generate",
-    # es
-    "verificar","podrian","pueden","enviar","mandar","emitir","actualizar","abrir","analizar","corregir","resolver","procesar","generar",
-])
-INFO_TERMS_RX = _compile_patterns(["status","prazo","andamento","atualizacao","update","eta","estado","plazo"])
-
-ACTION_HINTS_RX = _compile_patterns([
-    "status","andamento","prazo","erro","atualizacao","protocolo","chamado","contrato",
-    "boleto","fatura","nota fiscal","nf","anexo","arquivo",
-    "verificar","verifiquem","poderiam verificar","podem verificar","processado",
-    "emitir","emissao","resolucao","correcao","resolver","eta",
-])
-GRATITUDE_HINTS_RX = _compile_patterns([
-    "obrigado","muito obrigado","agradeco","agradecimento","feliz natal","feliz ano","ano novo","parabens",
-])
-FUNCTIONING_PHRASES_RX = _compile_patterns([
-    "tudo funcionando","funcionando perfeitamente","problema resolvido","issue resolvida","resolvido",
-])
-WELL_WISHES_TERMS_RX = _compile_patterns([
-    "espero que estejam bem","espero que esteja bem","otima semana","boa semana",
-    "boa jornada","bom trabalho","tenha um bom dia","tenha uma boa semana",
-    "desejo uma otima semana",
-])
-GREETING_TERMS_RX = _compile_patterns([
-    "ola","oi","bom dia","boa tarde","boa noite","tudo bem","como vai","como esta",
-])
-
-MARKETING_TERMS_RX = _compile_patterns([
-    "newsletter","divulgacao","marketing","convite","evento","webinar","lancamento","release","oferta","promocao",
-])
-GRATITUDE_TERMS_RX = _compile_patterns([
-    "obrigado","muito obrigado","agradeco","agradecimento","feliz natal","feliz ano","ano novo","parabens",
-    "gracias","thank you","thanks",
-])
-RESOLVED_TERMS_RX = _compile_patterns([
-    "tudo funcionando","funcionando perfeitamente","problema resolvido","issue resolvida","resolvido",
-    "nao preciso","pode desconsiderar","pode cancelar","cancelar solicitacao","cancelada","cancelado",
-])
-URGENCY_TERMS_RX = _compile_patterns([
-    "urgente","urgencia","asap","o mais rapido possivel","priority","prioridade",
-])
-
-FOLLOWUP_TERMS_RX = [
-    re.compile(r"\bnao\s+responderam\b", FLAGS),
-    re.compile(r"\bnao\s+recebi\s+retorno\b", FLAGS),
-    re.compile(r"\bnao\s+tive\s+retorno\b", FLAGS),
-    re.compile(r"\bsem\s+(resposta|retorno)\b", FLAGS),
-    re.compile(r"\b(ultimo|meu\s+ultimo)\s+e[-\s]*mail\b", FLAGS),  # <- casa "email" e "e-mail"
-    re.compile(r"\baguardo\s+retorno\b", FLAGS),
-    re.compile(r"\bainda\s+nao\s+responderam\b", FLAGS),
-    re.compile(r"\b(podem\s+responder|podem\s+me\s+retornar)\b", FLAGS),
-    re.compile(r"\bfollow[-\s]*up\b", FLAGS),
-]
-
-
-# Padrões de erro/issue/acesso (já como regex "livre")
-ERROR_PATTERNS_RX = [
-    re.compile(p, FLAGS) for p in [
-        r"\b(erro|error|bug|falha|falhou|trava|travou|crash)\b",
-        r"\b(problema|issue|incidente)\b",
-        r"\b(acessar|acesso|login|logar|autenticacao|senha|usuario)\b",
-        r"\bnao\s+funciona\b",
-        r"\bnao\s+esta\s+funcionando\b",
-        r"\bno\s+funciona\b",
-        r"\bnot\s+working\b",
-        r"\bfora\s+do\s+ar\b",
-    ]
-]
-
-def _has_issue(text_norm: str) -> bool:
-    return any(rx.search(text_norm) for rx in ERROR_PATTERNS_RX)
+SNIPPET_CHARS = 1000
+
+class PreparedEmail:
+    """
+    Texto do e-mail preparado uma única vez por requisição e compartilhado por
+    todo o pipeline (idioma, regras, overrides): texto limpo, normalizado,
+    contagem de tokens e resultados de busca memoizados sob demanda.
+    """
+
+    def __init__(
+        self,
+        content: str,
+        *,
+        clean: str | None = None,
+        norm: str | None = None,
+        rules: "RuleSet | None" = None,
+    ):
+        self.content = content or ""
+        self.rules = rules or get_rules()
+        self.clean = clean_text(self.content) if clean is None else clean
+        self.norm = normalize(self.clean) if norm is None else norm
+        self.token_count = len(self.norm.split())
+        # modo de varredura ("full" ou "incremental") e bytes efetivamente varridos
+        self.mode = "full"
+        self.input_bytes: int | None = None
+        self.scanned_bytes: int | None = None
+        self._snippet_norm: str | None = None
+        self._hits: MatchResult | None = None
+        self._signals: Tuple[List[str], List[str], float] | None = None
+
+    @classmethod
+    def from_norm(cls, norm: str) -> "PreparedEmail":
+        """Para chamadas que já têm o texto normalizado (ex.: `apply_overrides(str, ...)`)."""
+        return cls(norm, clean=norm, norm=norm)
+
+    @property
+    def snippet(self) -> str:
+        return self.clean[:SNIPPET_CHARS]
+
+    @property
+    def snippet_norm(self) -> str:
+        if self._snippet_norm is None:
+            self._snippet_norm = normalize(self.snippet.strip())
+        return self._snippet_norm
+
+    @property
+    def hits(self) -> MatchResult:
+        """Varredura única de todos os vocabulários sobre `norm` (memoizada)."""
+        if self._hits is None:
+            self._hits = self.rules.matcher.scan(self.norm)
+        return self._hits
+
+    @property
+    def signals(self) -> Tuple[List[str], List[str], float]:
+        """Equivalente a `detect_signals(norm)` (pos_hits, neg_hits, score)."""
+        if self._signals is None:
+            self._signals = _signals_from(self.hits, self.rules)
+        return self._signals
+
+    def matches(self, category: str) -> bool:
+        """Algum termo do vocabulário `category` aparece no texto?"""
+        return self.hits.any(category)
+
+    @property
+    def scan_info(self) -> dict:
+        """Para `meta.scan`: bytes da entrada x bytes do texto normalizado varridos pelas regras."""
+        total = len(self.content.encode("utf-8")) if self.input_bytes is None else self.input_bytes
+        scanned = len(self.norm) if self.scanned_bytes is None else self.scanned_bytes
+        return {
+            "mode": self.mode,
+            "bytes_total": total,
+            "bytes_scanned": scanned,
+            "early_exit": scanned < len(self.norm),
+        }
+
+def prepare_email(content: "str | PreparedEmail") -> PreparedEmail:
+    return content if isinstance(content, PreparedEmail) else PreparedEmail(content)
+
+def prepare_incremental(
+    content: str, chunk_chars: int = SCAN_CHUNK_CHARS, rules: "RuleSet | None" = None
+) -> PreparedEmail:
+    """
+    Modo incremental: só a mensagem mais recente (sem histórico citado/encaminhado),
+    varrida em blocos até a categoria ficar travada (ver `category_locked`).
+    """
+    email = PreparedEmail(strip_history(content), rules=rules)
+    email.mode = "incremental"
+    email.input_bytes = len((content or "").encode("utf-8"))
+    email._hits, email.scanned_bytes = email.rules.matcher.scan_until(
+        email.norm, lambda hits: category_locked(email, hits), chunk_chars
+    )
+    return email
+
+@timed("prepare")
+def prepare_content(
+    content: str, incremental: bool = INCREMENTAL_SCAN, rules: "RuleSet | None" = None
+) -> PreparedEmail:
+    """
+    Ponto de entrada do pipeline: texto completo ou modo incremental (`INCREMENTAL_SCAN`).
+    O e-mail fixa o snapshot de regras vigente (ou `rules`) até o fim da requisição.
+    """
+    if incremental:
+        return prepare_incremental(content, rules=rules)
+    return PreparedEmail(content, rules=rules)
 
 # ============================================================================
-# Sinais (agora com regex)
+# Vocabulários → matcher (arquivo de regras)
 # ============================================================================
 
-def detect_signals(text_norm: str) -> Tuple[List[str], List[str], float]:
-    pos_hits, neg_hits = [], []
+# Regras em app/services/rules.json (ou RULES_PATH, JSON ou YAML):
+#   weights.pos / weights.neg -> {termo: peso} (as chaves também são vocabulários)
+#   literal.<categoria>       -> termos literais de uma palavra (ver `_single_word`;
+#                                com mais de uma palavra são ignorados, com aviso)
+#   phrases.<categoria>       -> frases com várias palavras e curinga "*" no fim
+BUNDLED_RULES_PATH = Path(__file__).with_name("rules.json")
+WEIGHT_CATEGORIES = ("pos", "neg")
+LITERAL_CATEGORIES = (
+    "request", "info", "action_hints", "gratitude_hints", "functioning", "well_wishes",
+    "greeting", "marketing", "gratitude", "resolved", "urgency",
+)
+PHRASE_CATEGORIES = ("followup", "issue", "status", "status_please", "question", "nf")
+SNAPSHOT_FORMAT = 1
+
+def _single_word(terms: Iterable[str], where: str) -> List[str]:
+    """
+    Compatibilidade: o antigo `_literal_to_regex` escapava o espaço (`re.escape` -> "\\ ") antes de
+    trocá-lo por `\\s+`, então termos literais com mais de uma palavra ("nota fiscal",
+    "bom dia", "muito obrigado"...) nunca casavam. O matcher preserva esse
+    comportamento para manter as decisões idênticas; os termos ignorados vão para
+    o log (frases com várias palavras devem ir em `phrases.*`).
+    """
+    kept, dropped = [], []
+    for t in terms:
+        (kept if len(normalize(t).split()) == 1 else dropped).append(t)
+    if dropped:
+        logger.warning("rules_multiword_ignored", extra={"section": where, "terms": dropped})
+    return kept
+
+# ============================================================================
+# Rule set congelado (compilado uma vez por versão das regras)
+# ============================================================================
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    Vocabulários, pesos e matcher compilados uma única vez. Imutável: nada no
+    caminho da requisição compila regex. `version` é um hash do conteúdo.
+    """
+    version: str
+    vocabularies: Mapping[str, Tuple[str, ...]]
+    pos_weights: Mapping[str, float]
+    neg_weights: Mapping[str, float]
+    matcher: TermMatcher
+    source: str = ""
+
+    def __reduce__(self):
+        # MappingProxyType não é serializável: o snapshot guarda dicts e reembrulha ao carregar
+        return (_restore_ruleset, (
+            self.version, dict(self.vocabularies), dict(self.pos_weights),
+            dict(self.neg_weights), self.matcher, self.source,
+        ))
+
+def _restore_ruleset(version, vocabularies, pos_weights, neg_weights, matcher, source) -> RuleSet:
+    return RuleSet(
+        version, MappingProxyType(vocabularies), MappingProxyType(pos_weights),
+        MappingProxyType(neg_weights), matcher, source,
+    )
+
+def build_ruleset(
+    vocabularies: Mapping[str, Iterable[str]],
+    pos_weights: Mapping[str, float],
+    neg_weights: Mapping[str, float],
+    source: str = "",
+) -> RuleSet:
+    vocab = {name: tuple(terms) for name, terms in vocabularies.items()}
+    pos, neg = dict(pos_weights), dict(neg_weights)
+    payload = json.dumps({"vocabularies": vocab, "pos": pos, "neg": neg}, sort_keys=True, ensure_ascii=False)
+    return RuleSet(
+        version=hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12],
+        vocabularies=MappingProxyType(vocab),
+        pos_weights=MappingProxyType(pos),
+        neg_weights=MappingProxyType(neg),
+        # todos os vocabulários num único índice: o texto é varrido uma vez por requisição
+        matcher=TermMatcher(vocab, weights={"pos": pos, "neg": neg}, normalizer=normalize),
+        source=source,
+    )
+
+def _parse_rules(raw: bytes, path: Path) -> dict:
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml  # opcional: só para arquivos de regras em YAML
+        except ImportError as e:
+            raise ValueError(f"{path}: regras em YAML exigem o pacote PyYAML") from e
+        try:
+            return yaml.safe_load(raw)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: YAML inválido ({e})") from e
+    return json.loads(raw)
+
+def ruleset_from_dict(data: dict, source: str = "") -> RuleSet:
+    """Valida o conteúdo do arquivo de regras e compila o `RuleSet` (ValueError se inválido)."""
+    if not isinstance(data, dict):
+        raise ValueError("arquivo de regras deve ser um objeto")
+    sections = {name: data.get(name) or {} for name in ("weights", "literal", "phrases")}
+    expected = {"weights": WEIGHT_CATEGORIES, "literal": LITERAL_CATEGORIES, "phrases": PHRASE_CATEGORIES}
+    for name, categories in expected.items():
+        missing = [c for c in categories if c not in sections[name]]
+        if missing:
+            raise ValueError(f"{name}: categorias ausentes {missing}")
+
+    weights = {}
+    for cat in WEIGHT_CATEGORIES:
+        table = sections["weights"][cat]
+        if not isinstance(table, dict) or not all(isinstance(w, (int, float)) for w in table.values()):
+            raise ValueError(f"weights.{cat}: esperado {{termo: peso}}")
+        weights[cat] = {str(k): float(w) for k, w in table.items()}
+
+    vocab: Dict[str, List[str]] = {cat: _single_word(weights[cat], f"weights.{cat}") for cat in WEIGHT_CATEGORIES}
+    for name, categories in (("literal", LITERAL_CATEGORIES), ("phrases", PHRASE_CATEGORIES)):
+        for cat in categories:
+            terms = sections[name][cat]
+            if not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+                raise ValueError(f"{name}.{cat}: esperado lista de termos")
+            # literais: só termos de uma palavra (ver `_single_word`); frases valem inteiras
+            vocab[cat] = _single_word(terms, f"literal.{cat}") if name == "literal" else list(terms)
+    return build_ruleset(vocab, weights["pos"], weights["neg"], source=source)
+
+def _write_snapshot(path: Path, digest: str, rules: RuleSet) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as fp:
+            pickle.dump({"format": SNAPSHOT_FORMAT, "sha256": digest, "rules": rules}, fp, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)  # atômico: outro worker nunca lê um snapshot pela metade
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+def _read_snapshot(path: Path, digest: str) -> "RuleSet | None":
+    try:
+        with open(path, "rb") as fp:
+            snap = pickle.load(fp)
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(snap, dict) or snap.get("format") != SNAPSHOT_FORMAT or snap.get("sha256") != digest:
+        return None
+    rules = snap.get("rules")
+    return rules if isinstance(rules, RuleSet) else None
+
+def _repo_path(path: "str | Path") -> Path:
+    path = Path(path)
+    return path if path.is_absolute() else Path(__file__).resolve().parents[2] / path
+
+def load_rules_file(path: "str | Path | None" = None, snapshot: "str | Path | None" = None) -> RuleSet:
+    """
+    Lê e compila o arquivo de regras. Com `snapshot` (RULES_SNAPSHOT_PATH), o
+    `RuleSet` compilado é gravado em pickle e reaproveitado enquanto o hash do
+    arquivo-fonte não mudar: workers novos sobem sem recompilar o matcher.
+    """
+    path = _repo_path(path) if path else BUNDLED_RULES_PATH
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    snap_path = _repo_path(snapshot) if snapshot else None
+    if snap_path is not None:
+        cached = _read_snapshot(snap_path, digest)
+        if cached is not None:
+            return cached
+    rules = ruleset_from_dict(_parse_rules(raw, path), source=str(path))
+    if snap_path is not None:
+        _write_snapshot(snap_path, digest, rules)
+    return rules
+
+# Snapshot ativo. Leitura sem trava (uma referência lida por requisição, ver
+# `PreparedEmail`); o recarregamento compila fora e só então troca a referência,
+# então requisições em andamento terminam com as regras com que começaram.
+_rules: RuleSet = load_rules_file(RULES_PATH or None, RULES_SNAPSHOT_PATH or None)
+_reload_lock = threading.Lock()
+
+def get_rules() -> RuleSet:
+    return _rules
+
+def reload_rules(path: "str | Path | None" = None) -> RuleSet:
+    """
+    Recarrega as regras (SIGHUP ou POST /admin/rules/reload). Se o arquivo for
+    inválido, levanta ValueError/OSError e o snapshot atual continua valendo.
+    """
+    global _rules
+    with _reload_lock:
+        rules = load_rules_file(path or RULES_PATH or None, RULES_SNAPSHOT_PATH or None)
+        _rules = rules
+    return rules
+
+# ============================================================================
+# Sinais
+# ============================================================================
+
+def _signals_from(hits: MatchResult, rules: RuleSet) -> Tuple[List[str], List[str], float]:
+    pos_hits, neg_hits = hits.keys("pos"), hits.keys("neg")
     score = 0.0
-    for key, rx in RX_POS.items():
-        if rx.search(text_norm):
-            pos_hits.append(key); score += POS_SIGNALS[key]
-    for key, rx in RX_NEG.items():
-        if rx.search(text_norm):
-            neg_hits.append(key); score -= NEG_SIGNALS[key]
+    for key in pos_hits:
+        score += rules.pos_weights[key]
+    for key in neg_hits:
+        score -= rules.neg_weights[key]
     return pos_hits, neg_hits, score
 
+def detect_signals(text_norm: str) -> Tuple[List[str], List[str], float]:
+    rules = get_rules()
+    return _signals_from(rules.matcher.scan(text_norm), rules)
+
 # ============================================================================
 # Classificador por regras
 # ============================================================================
 
-def _has_any_rx(text_norm: str, patterns: Iterable[Pattern]) -> bool:
-    return any(rx.search(text_norm) for rx in patterns)
+def rule_classifier(text: "str | PreparedEmail") -> Tuple[str, float, List[str]]:
+    email = prepare_email(text)
 
-def rule_classifier(text: str) -> Tuple[str, float, List[str]]:
-    text_clean = clean_text(text)
-    text_norm = normalize(text_clean)
-
-    pos_hits, neg_hits, base_score = detect_signals(text_norm)
+    pos_hits, neg_hits, base_score = email.signals
 
     pos_bonus = 0.0
     neg_bonus = 0.0
-    if _has_any_rx(text_norm, ACTION_HINTS_RX): pos_bonus += 0.6
-    if _has_any_rx(text_norm, FUNCTIONING_PHRASES_RX): neg_bonus += 0.8
+    has_action_hint = email.matches("action_hints")
+    if has_action_hint: pos_bonus += 0.6
+    if email.matches("functioning"): neg_bonus += 0.8
 
     score = base_score + pos_bonus - neg_bonus
 
@@ -280,7 +540,7 @@ def rule_classifier(text: str) -> Tuple[str, float, List[str]]:
     elif score < -0.6: category = "Improdutivo"
     else: category = "Produtivo"
 
-    if _has_any_rx(text_norm, GRATITUDE_HINTS_RX) and not _has_any_rx(text_norm, ACTION_HINTS_RX):
+    if email.matches("gratitude_hints") and not has_action_hint:
         category = "Improdutivo"; conf_val = 0.80
     else:
         raw = abs(score)
@@ -290,155 +550,257 @@ def rule_classifier(text: str) -> Tuple[str, float, List[str]]:
     return category, round(conf_val, 2), signals
 
 # ============================================================================
-# Overrides finais (regex everywhere)
+# Overrides finais
 # ============================================================================
+# O motor trabalha com IDs inteiros de sinais (internados em `SIGNALS`) e um
+# bitset das regras disparadas; as listas de strings e o dict `overrides` só
+# são montados na borda (`RuleResult.signals()/overrides()`, resposta da API).
+
+_SHORT_STATUS_QUESTIONS = frozenset({
+    "status","qual o status","e o status","como esta o status","status do chamado","status do ticket","e o prazo","qual o prazo",
+})
+_THANKS_VARIANTS = frozenset({"muito obrigado", "obrigado!", "obrigado.", "obrigado,"})
 
-def apply_overrides(norm: str, category: str, confidence: float, signals: list[str]) -> tuple[str, float, list[str], dict]:
+def _normalize_signal(s: str) -> str:
+    s2 = WS_RE.sub(" ", (s or "").strip().lower())
+    return "obrigado" if s2 in _THANKS_VARIANTS else s2
+
+class SignalTable:
+    """
+    Tabela de sinais internados: nome <-> ID inteiro, com a forma normalizada
+    (`_normalize_signal`) e o teste "começa com obrigado" memoizados por ID.
+    Cresce só com nomes novos (vocabulário das regras + chamadas diretas de
+    `apply_overrides`); a leitura não usa lock.
+    """
+
+    __slots__ = ("names", "_ids", "_norm", "_thanks", "_lock")
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._norm: List[int] = []
+        self._thanks: List[bool] = []
+        self._lock = threading.RLock()
+
+    def id(self, name: str) -> int:
+        sid = self._ids.get(name)
+        return sid if sid is not None else self._add(name)
+
+    def normalized(self, sid: int) -> int:
+        return self._norm[sid]
+
+    def thanks(self, sid: int) -> bool:
+        return self._thanks[sid]
+
+    def _add(self, name: str) -> int:
+        with self._lock:
+            sid = self._ids.get(name)
+            if sid is not None:
+                return sid
+            text = sys.intern(name or "")
+            sid = len(self.names)
+            self.names.append(text)
+            self._norm.append(sid)
+            self._thanks.append(text.strip().lower().startswith("obrigado"))
+            norm = _normalize_signal(text)
+            if norm != text:
+                self._norm[sid] = self._add(norm)
+            self._ids[name] = sid  # publica por último: leitores sem lock veem a entrada completa
+            return sid
+
+SIGNALS = SignalTable()
+SIG_OBRIGADO, SIG_SAUDACAO, SIG_URGENTE, SIG_NF = (SIGNALS.id(s) for s in ("obrigado", "saudacao", "urgente", "nf"))
+
+# regras disparadas (bitset)
+GRATITUDE_NO_ACTION   = 1 << 0
+MARKETING_NEWSLETTER  = 1 << 1
+RESOLVED_OR_CANCELLED = 1 << 2
+URGENCY_BOOST         = 1 << 3
+SHORT_QUESTION_HINT   = 1 << 4
+NOISE_NF              = 1 << 5
+ISSUE_DETECTED        = 1 << 6
+FOLLOWUP_DETECTED     = 1 << 7
+GREETING_ONLY         = 1 << 8
+ACTION_OVER_LOW_CONF  = 1 << 9
+NEUTRAL_SHORT         = 1 << 10
+
+# chaves que só aparecem quando a regra dispara, na ordem em que as regras rodam
+_EXTRA_FLAGS = (
+    ("issue_detected", ISSUE_DETECTED),
+    ("followup_detectado", FOLLOWUP_DETECTED),
+    ("greeting_only", GREETING_ONLY),
+    ("action_over_low_conf", ACTION_OVER_LOW_CONF),
+    ("neutral_short", NEUTRAL_SHORT),
+)
+
+def overrides_meta(flags: int) -> dict:
+    """Bitset -> dict `overrides` da resposta (mesmas chaves e ordem de sempre)."""
     meta = {
-        "gratitude_no_action": False,
+        "gratitude_no_action": bool(flags & GRATITUDE_NO_ACTION),
         "acao_baixa_conf": False,
-        "marketing_newsletter": False,
-        "resolved_or_cancelled": False,
-        "urgency_boost": False,
-        "short_question_hint": False,
+        "marketing_newsletter": bool(flags & MARKETING_NEWSLETTER),
+        "resolved_or_cancelled": bool(flags & RESOLVED_OR_CANCELLED),
+        "urgency_boost": bool(flags & URGENCY_BOOST),
+        "short_question_hint": bool(flags & SHORT_QUESTION_HINT),
         "neutral-short": False,
-        "noise_filter": [],
+        "noise_filter": ["nf"] if flags & NOISE_NF else [],
     }
+    for name, bit in _EXTRA_FLAGS:
+        if flags & bit:
+            meta[name] = True
+    return meta
+
+def _normalize_ids(ids: List[int], drop_after_thanks: bool = False) -> List[int]:
+    """Normaliza + dedup preservando a ordem, com "obrigado" na frente."""
+    norm = SIGNALS.normalized
+    out: List[int] = []
+    for sid in ids:
+        sid = norm(sid)
+        if sid not in out:
+            out.append(sid)
+    if SIG_OBRIGADO in out:
+        out.remove(SIG_OBRIGADO)
+        if drop_after_thanks:
+            # mantém o comportamento original: o item logo após "obrigado" é descartado
+            del out[:1]
+        out.insert(0, SIG_OBRIGADO)
+    return out
+
+def _override_ids(ids: List[int], flags: int, norm: str) -> List[int]:
+    """Sinais acrescentados/removidos pelas regras disparadas (1), (1.1), (5) e o filtro 'nf', já normalizados."""
+    if flags & NOISE_NF:
+        ids = [s for s in ids if s != SIG_NF]
+    if flags & GRATITUDE_NO_ACTION and not any(SIGNALS.thanks(s) for s in ids):
+        ids = [SIG_OBRIGADO, *ids]
+    if flags & GREETING_ONLY and SIG_SAUDACAO not in ids:
+        ids = [SIG_SAUDACAO, *ids]
+    if flags & URGENCY_BOOST and "urgente" in norm and SIG_URGENTE not in ids:
+        ids = [SIG_URGENTE, *ids]
+    return _normalize_ids(ids)
+
+def category_locked(email: PreparedEmail, hits: MatchResult) -> bool:
+    """
+    True quando mais texto não muda a categoria final de `apply_overrides`:
+    resolvido/cancelado (3) força Improdutivo com confiança >= 0.85 e, num texto
+    longo, nenhuma regra posterior ((4) exige confiança <= 0.80; (6)/(7) exigem
+    texto curto) consegue desfazer. É o único estado terminal das regras atuais.
+    """
+    long_text = len(email.norm) > 40 and email.token_count > 6
+    return long_text and hits.any("resolved")
+
+def _overrides(email: PreparedEmail, category: str, confidence: float, ids: List[int]) -> Tuple[str, float, List[int], int]:
+    """Núcleo de `apply_overrides` sobre IDs de sinais; devolve (categoria, confiança, IDs, bitset)."""
+    norm = email.norm
+    flags = 0
 
     # 'nf' só vale se "nota fiscal" ou token isolado 'nf'
-    def _looks_like_nf(txt: str) -> bool:
-        return bool(_literal_to_regex("nota fiscal").search(txt) or re.search(r"\bnf\b", txt))
-    if "nf" in signals and not _looks_like_nf(norm):
-        signals = [s for s in signals if s != "nf"]
-        meta["noise_filter"].append("nf")
+    if SIG_NF in ids and not email.matches("nf"):
+        flags |= NOISE_NF
 
     # intenção de ação
-    has_request_verb = any_match(REQUEST_TERMS_RX, norm)
-    has_info_term    = any_match(INFO_TERMS_RX, norm)
+    has_request_verb = email.matches("request")
+    has_info_term    = email.matches("info")
     has_question     = "?" in norm
-    has_issue        = _has_issue(norm)
-    has_followup     = any(rx.search(norm) for rx in FOLLOWUP_TERMS_RX)
-
-
+    has_issue        = email.matches("issue")
+    has_followup     = email.matches("followup")
 
     has_action = has_issue or has_request_verb or (has_info_term and has_question) or has_followup
     if has_issue:
-        meta["issue_detected"] = True
-    
+        flags |= ISSUE_DETECTED
     if has_followup:
-        meta["followup_detectado"] = True
- 
+        flags |= FOLLOWUP_DETECTED
+
     # (1) Gratidão/felicitações sem pedido -> Improdutivo
-    has_gratitude = any_match(GRATITUDE_TERMS_RX, norm)
+    has_gratitude = email.matches("gratitude")
     if has_gratitude and not has_action:
         category = "Improdutivo"
         confidence = max(float(confidence or 0.0), 0.80)
-        meta["gratitude_no_action"] = True
-        if not any((s or "").strip().lower().startswith("obrigado") for s in signals):
-            signals = ["obrigado"] + signals
+        flags |= GRATITUDE_NO_ACTION
 
     # (1.1) Saudação/well-wishes puro (curto) -> Improdutivo
-    has_greeting = any_match(GREETING_TERMS_RX, norm)
-    has_well_wishes = any_match(WELL_WISHES_TERMS_RX, norm)
-    token_count = len(norm.split())
+    has_greeting = email.matches("greeting")
+    has_well_wishes = email.matches("well_wishes")
+    token_count = email.token_count
 
     if (has_greeting or has_well_wishes) and not has_action and not has_question and not has_issue:
         if token_count <= 6 and len(norm) <= 40:
             category = "Improdutivo"
             confidence = max(float(confidence or 0.0), 0.80)
-            meta["greeting_only"] = True
-            if "saudacao" not in signals:
-                signals = ["saudacao"] + signals
-    
-    if meta.get("followup_detectado"):
-        if category != "Produtivo":
-            category = "Produtivo"
-        confidence = max(float(confidence or 0.0), 0.80)
+            flags |= GREETING_ONLY
 
+    if has_followup:
+        category = "Produtivo"
+        confidence = max(float(confidence or 0.0), 0.80)
 
     # (2) Marketing/newsletter/convite sem pedido -> Improdutivo
-    if any_match(MARKETING_TERMS_RX, norm) and not has_action:
+    has_marketing = email.matches("marketing")
+    if has_marketing and not has_action:
         if category != "Improdutivo":
             category = "Improdutivo"
             confidence = max(float(confidence or 0.0), 0.75)
-        meta["marketing_newsletter"] = True
+        flags |= MARKETING_NEWSLETTER
 
     # (3) Resolvido/cancelado -> sempre Improdutivo
-    if any_match(RESOLVED_TERMS_RX, norm):
+    has_resolved = email.matches("resolved")
+    if has_resolved:
         category = "Improdutivo"
         confidence = max(float(confidence or 0.0), 0.85)
-        meta["resolved_or_cancelled"] = True
+        flags |= RESOLVED_OR_CANCELLED
 
     # (4) Ação detectada mas modelo veio Improdutivo com baixa confiança → força Produtivo
     if has_action and category == "Improdutivo" and float(confidence or 0.0) <= 0.80:
         category = "Produtivo"
         confidence = max(float(confidence or 0.0), 0.75)
-        meta["action_over_low_conf"] = True
+        flags |= ACTION_OVER_LOW_CONF
 
     # (5) Urgência -> boost em Produtivo
-    if any_match(URGENCY_TERMS_RX, norm) and category == "Produtivo":
+    if email.matches("urgency") and category == "Produtivo":
         confidence = max(float(confidence or 0.0), 0.78)
-        meta["urgency_boost"] = True
-        if "urgente" in norm and "urgente" not in signals:
-            signals = ["urgente"] + signals
+        flags |= URGENCY_BOOST
 
     # (6) Pergunta/solicitação curta sobre status/prazo
-    status_terms_rx = _compile_patterns(["status","prazo","andamento","update","eta","ticket"])
     short_len = len(norm) <= 40
-    short_tokens = len(norm.split()) <= 6
+    short_tokens = token_count <= 6
+    has_status_term = email.matches("status")
     looks_like_question = (
         "?" in norm
-        or norm.strip() in {"status","qual o status","e o status","como esta o status","status do chamado","status do ticket","e o prazo","qual o prazo"}
-        or any(rx.search(norm.strip()) for rx in status_terms_rx)
-        or any(re.search(rf"{rx.pattern}\s+por\s+favor", norm) for rx in status_terms_rx)
-        or bool(re.search(r"\b(qual|sobre|e\s*o|e\s*quanto)\b", norm))
+        or norm.strip() in _SHORT_STATUS_QUESTIONS
+        or has_status_term
+        or email.matches("status_please")
+        or email.matches("question")
     )
-    has_status_term = any_match(status_terms_rx, norm)
 
     if (short_len or short_tokens) and has_status_term and looks_like_question:
         category = "Produtivo"
         confidence = max(float(confidence or 0.0), 0.70)
-        meta["short_question_hint"] = True
-
-    # normalização de sinais
-    def _normalize_signals(items: list[str]) -> list[str]:
-        out = []
-        for s in items:
-            s2 = re.sub(r"\s+", " ", (s or "").strip().lower())
-            if s2 in {"muito obrigado", "obrigado!", "obrigado.", "obrigado,"}:
-                s2 = "obrigado"
-            out.append(s2)
-        dedup = list(dict.fromkeys(out))
-        if "obrigado" in dedup:
-            dedup = ["obrigado"] + [x for x in dedup if x != "obrigado"]
-        return dedup
-
-    signals = _normalize_signals(signals)
+        flags |= SHORT_QUESTION_HINT
 
     # (7) Muito curta & neutra -> Improdutivo
-    neutral_short = (len(norm.split()) <= 2 and len(norm) <= 12)
-    has_marketing = any_match(MARKETING_TERMS_RX, norm)
-    has_resolved  = any_match(RESOLVED_TERMS_RX, norm)
+    neutral_short = (token_count <= 2 and len(norm) <= 12)
 
     if neutral_short and not (has_action or has_status_term or has_gratitude or has_marketing or has_resolved):
         category = "Improdutivo"
         confidence = max(float(confidence or 0.0), 0.65)
-        meta["neutral_short"] = True
+        flags |= NEUTRAL_SHORT
 
-    # Piso de confiança para issue produtiva
-    if meta.get("problema_detectado") and category == "Produtivo":
-        confidence = max(float(confidence or 0.0), 0.80)
+    return category, round(float(confidence), 2), _override_ids(ids, flags, norm), flags
 
-    return category, round(float(confidence), 2), signals, meta
+def apply_overrides(email: "str | PreparedEmail", category: str, confidence: float, signals: list[str]) -> tuple[str, float, list[str], dict]:
+    """`email` é um `PreparedEmail` (ou o texto já normalizado, por compatibilidade)."""
+    if not isinstance(email, PreparedEmail):
+        email = PreparedEmail.from_norm(email)
+    category, confidence, ids, flags = _overrides(email, category, confidence, [SIGNALS.id(s) for s in signals])
+    names = SIGNALS.names
+    return category, confidence, [names[s] for s in ids], overrides_meta(flags)
 
 # ============================================================================
 # HF zero-shot
 # ============================================================================
 
-def hf_zero_shot(text: str) -> tuple[str, float] | None:
-    if not HF_TOKEN:
-        return None
-    url = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
+HF_RETRIES, HF_BACKOFF, HF_TIMEOUT = 3, 2, 10
+
+def _hf_request(text: str | list[str]) -> tuple[str, dict, dict]:
+    url = f"{HF_API_URL}/{HF_MODEL}"
     headers = {"Authorization": f"Bearer {HF_TOKEN}"}
     payload = {
         "inputs": text,
@@ -447,66 +809,407 @@ def hf_zero_shot(text: str) -> tuple[str, float] | None:
             "hypothesis_template": "Este email requer uma ação imediata da equipe: {}."
         }
     }
-    retries, backoff = 3, 2
-    for attempt in range(1, retries + 1):
-        try:
-            r = requests.post(url, headers=headers, json=payload, timeout=10)
+    return url, headers, payload
+
+def _hf_parse(data: dict) -> tuple[str, float] | None:
+    labels = data.get("labels") or []
+    scores = data.get("scores") or []
+    if not labels or not scores:
+        return None
+    return labels[0], float(scores[0])
+
+def _hf_parse_many(data, n: int) -> list[tuple[str, float] | None]:
+    """Resposta de uma chamada com `inputs` em lista: um resultado por entrada."""
+    if n == 1 and isinstance(data, dict):
+        return [_hf_parse(data)]
+    if not isinstance(data, list) or len(data) != n:
+        return [None] * n
+    return [_hf_parse(d) if isinstance(d, dict) else None for d in data]
+
+def _chunks(items: list, size: int) -> list[list]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def hf_zero_shot(text: str, budget: LatencyBudget | None = None) -> tuple[str, float] | None:
+    if not HF_TOKEN:
+        return None
+    url, headers, payload = _hf_request(text)
+
+    def _call(timeout: float):
+        r = get_sync_http().post(url, headers=headers, json=payload, timeout=timeout)
+        r.raise_for_status()
+        return _hf_parse(r.json())
+
+    with stage("hf"):
+        result, _ = call_with_retries(
+            get_breaker("hf"), _call,
+            retries=HF_RETRIES, backoff=HF_BACKOFF, timeout=HF_TIMEOUT, budget=budget, label="HF",
+        )
+    return result
+
+@asynccontextmanager
+async def _async_http(client: httpx.AsyncClient | None):
+    """Usa o cliente com pool injetado pela app; sem ele, um cliente temporário."""
+    if client is not None:
+        yield client
+    else:
+        async with httpx.AsyncClient() as tmp:
+            yield tmp
+
+async def _hf_post_async(
+    http: httpx.AsyncClient, text: str | list[str], parse, budget: LatencyBudget | None
+):
+    url, headers, payload = _hf_request(text)
+
+    async def _call(timeout: float):
+        r = await http.post(url, headers=headers, json=payload, timeout=timeout)
+        r.raise_for_status()
+        return parse(r.json())
+
+    with stage("hf"):
+        result, _ = await call_with_retries_async(
+            get_breaker("hf"), _call,
+            retries=HF_RETRIES, backoff=HF_BACKOFF, timeout=HF_TIMEOUT, budget=budget, label="HF",
+        )
+    return result
+
+async def hf_zero_shot_async(
+    text: str, client: httpx.AsyncClient | None = None, budget: LatencyBudget | None = None
+) -> tuple[str, float] | None:
+    """
+    Mesma chamada de `hf_zero_shot`, mas com httpx + asyncio.sleep (não bloqueia o loop).
+    Com o circuito aberto ou o orçamento esgotado devolve None na hora (cai nas regras).
+    """
+    if not HF_TOKEN:
+        return None
+    async with _async_http(client) as http:
+        return await _hf_post_async(http, text, _hf_parse, budget)
+
+def hf_zero_shot_many(texts: list[str], budget: LatencyBudget | None = None) -> list[tuple[str, float] | None]:
+    """Zero-shot em lote: uma chamada HF por grupo de até HF_BATCH_SIZE textos."""
+    if not HF_TOKEN or not texts:
+        return [None] * len(texts)
+    breaker = get_breaker("hf")
+    out: list[tuple[str, float] | None] = []
+    for chunk in _chunks(texts, HF_BATCH_SIZE):
+        url, headers, payload = _hf_request(chunk)
+
+        def _call(timeout: float, url=url, headers=headers, payload=payload, n=len(chunk)):
+            r = get_sync_http().post(url, headers=headers, json=payload, timeout=timeout)
             r.raise_for_status()
-            data = r.json()
-            labels = data.get("labels") or []
-            scores = data.get("scores") or []
-            if not labels or not scores:
-                return None
-            return labels[0], float(scores[0])
-        except Exception as e:
-            if attempt == retries:
-                print(f"[HF] Falha após {retries} tentativas: {e}")
-                return None
-            time.sleep(backoff ** attempt)
+            return _hf_parse_many(r.json(), n)
+
+        with stage("hf"):
+            result, _ = call_with_retries(
+                breaker, _call,
+                retries=HF_RETRIES, backoff=HF_BACKOFF, timeout=HF_TIMEOUT, budget=budget,
+                label=f"HF lote de {len(chunk)}",
+            )
+        out.extend(result or [None] * len(chunk))
+    return out
+
+async def hf_zero_shot_many_async(
+    texts: list[str], client: httpx.AsyncClient | None = None, budget: LatencyBudget | None = None
+) -> list[tuple[str, float] | None]:
+    """Versão assíncrona de `hf_zero_shot_many` (grupos enviados em paralelo)."""
+    if not HF_TOKEN or not texts:
+        return [None] * len(texts)
+
+    async def _one(http: httpx.AsyncClient, chunk: list[str]) -> list[tuple[str, float] | None]:
+        parse = lambda data: _hf_parse_many(data, len(chunk))
+        return await _hf_post_async(http, chunk, parse, budget) or [None] * len(chunk)
+
+    async with _async_http(client) as http:
+        parts = await asyncio.gather(*(_one(http, c) for c in _chunks(texts, HF_BATCH_SIZE)))
+    return [r for part in parts for r in part]
+
+# ============================================================================
+# Backends do classificador (zero-shot remoto, modelo local ou só regras)
+# ============================================================================
+
+ModelResult = tuple[str, float] | None
+
+class ClassifierBackend:
+    """
+    Interface dos backends: recebem e-mails preparados e devolvem (rótulo, score)
+    por e-mail, ou None quando não há resposta (o pipeline cai nas regras).
+    A base é o backend "rules": nunca responde.
+    """
+    name = "rules"
+
+    @property
+    def available(self) -> bool:
+        return False
+
+    @property
+    def model_id(self) -> str:
+        return "rules"
+
+    def predict_many(self, emails: list[PreparedEmail]) -> list[ModelResult]:
+        return [None] * len(emails)
+
+    async def predict_many_async(
+        self, emails: list[PreparedEmail], client: httpx.AsyncClient | None = None,
+        budget: LatencyBudget | None = None,
+    ) -> list[ModelResult]:
+        return self.predict_many(emails)
+
+    def predict(self, email: PreparedEmail) -> ModelResult:
+        return self.predict_many([email])[0]
+
+    async def predict_async(
+        self, email: PreparedEmail, client: httpx.AsyncClient | None = None,
+        budget: LatencyBudget | None = None,
+    ) -> ModelResult:
+        return (await self.predict_many_async([email], client=client, budget=budget))[0]
+
+class HFBackend(ClassifierBackend):
+    """Zero-shot na Inference API do Hugging Face (HTTP, com breaker e orçamento)."""
+    name = "hf"
+
+    @property
+    def available(self) -> bool:
+        return bool(HF_TOKEN)
+
+    @property
+    def model_id(self) -> str:
+        return HF_MODEL
+
+    def predict(self, email: PreparedEmail) -> ModelResult:
+        return hf_zero_shot(email.clean)
+
+    def predict_many(self, emails: list[PreparedEmail]) -> list[ModelResult]:
+        return hf_zero_shot_many([e.clean for e in emails])
+
+    async def predict_async(self, email, client=None, budget=None) -> ModelResult:
+        return await hf_zero_shot_async(email.clean, client=client, budget=budget)
+
+    async def predict_many_async(self, emails, client=None, budget=None) -> list[ModelResult]:
+        return await hf_zero_shot_many_async([e.clean for e in emails], client=client, budget=budget)
+
+class LocalBackend(ClassifierBackend):
+    """Modelo linear in-process (CPU, sem rede): ver `app.services.linear_model`."""
+    name = "local"
+
+    def __init__(self, model: LinearModel | None):
+        self.model = model
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    @property
+    def model_id(self) -> str:
+        return f"local:{self.model.version}" if self.model is not None else "rules"
+
+    def predict_many(self, emails: list[PreparedEmail]) -> list[ModelResult]:
+        if self.model is None:
+            return [None] * len(emails)
+        with stage("local_model"):
+            return self.model.predict_many([e.norm for e in emails])
+
+    async def predict_async(self, email, client=None, budget=None) -> ModelResult:
+        # inferência de um e-mail custa microssegundos: não compensa ir para o pool
+        return self.predict(email)
+
+    async def predict_many_async(self, emails, client=None, budget=None) -> list[ModelResult]:
+        return await run_cpu(self.predict_many, emails)
+
+def _load_local_model(path: str) -> LinearModel | None:
+    model_path = Path(path)
+    if not model_path.is_absolute():
+        model_path = Path(__file__).resolve().parents[2] / model_path
+    try:
+        return LinearModel.load(model_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[local] Modelo indisponível em {model_path} ({e}); usando só regras.")
+        return None
+
+def build_backend(name: str = CLASSIFIER_BACKEND) -> ClassifierBackend:
+    if name == "hf":
+        return HFBackend()
+    if name == "local":
+        return LocalBackend(_load_local_model(LOCAL_MODEL_PATH))
+    if name == "rules":
+        return ClassifierBackend()
+    raise ValueError(f"CLASSIFIER_BACKEND desconhecido: {name!r} (use hf, local ou rules)")
+
+_backend: ClassifierBackend | None = None
+_backend_lock = threading.Lock()
+
+def get_backend() -> ClassifierBackend:
+    """Backend configurado em `CLASSIFIER_BACKEND`, criado (e o modelo carregado) uma vez por processo."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_backend()
+    return _backend
 
 # ============================================================================
 # Pipeline principal
 # ============================================================================
 
-def classify_email(content: str) -> tuple[str, float, list, dict]:
+class RuleResult:
     """
-    Retorna: category, confidence, signals, meta_info
-    meta_info: {"used_hf": bool, "overrides": {...}}
+    Resultado compacto do motor de regras: IDs de sinais (`SIGNALS`) e bitset
+    das regras disparadas. Strings e dicts só saem na borda (`signals()`,
+    `overrides()`, `as_tuple()`), então lotes e filas seguram um objeto por e-mail.
     """
-    text_clean = clean_text(content)
-    norm = normalize(text_clean)
 
-    hf_result = hf_zero_shot(text_clean)
-    if hf_result:
-        category, confidence = hf_result
-        used_hf = True
-    else:
-        category, confidence, _ = rule_classifier(content)
-        used_hf = False
+    __slots__ = ("category", "confidence", "signal_ids", "flags", "engine")
 
-    pos_hits, neg_hits, _ = detect_signals(norm)
-    signals = list(dict.fromkeys(pos_hits + neg_hits))[:8]
+    def __init__(self, category: str, confidence: float, signal_ids: Tuple[int, ...], flags: int, engine: str):
+        self.category = category
+        self.confidence = confidence
+        self.signal_ids = signal_ids
+        self.flags = flags
+        self.engine = engine
+
+    def signals(self) -> list[str]:
+        names = SIGNALS.names
+        return [names[s] for s in self.signal_ids]
+
+    def overrides(self) -> dict:
+        return overrides_meta(self.flags)
+
+    def info(self) -> dict:
+        return {"used_hf": self.engine == "hf", "engine": self.engine, "overrides": overrides_meta(self.flags)}
+
+    def as_tuple(self) -> tuple[str, float, list, dict]:
+        """Formato de `classify_email`: (category, confidence, signals, meta_info)."""
+        return self.category, self.confidence, self.signals(), self.info()
+
+@timed("rules")
+def classify_prepared(email: PreparedEmail, model_result: ModelResult, engine: str = "hf") -> RuleResult:
+    if model_result:
+        category, confidence = model_result
+    else:
+        category, confidence, _ = rule_classifier(email)
+        engine = "rules"
+
+    pos_hits, neg_hits, _ = email.signals
+    sid = SIGNALS.id
+    ids: List[int] = []
+    for name in (*pos_hits, *neg_hits):
+        s = sid(name)
+        if s not in ids:
+            ids.append(s)
+            if len(ids) == 8:
+                break
 
     # filtro 'nf' ruído (pré)
-    if "nf" in signals and not (_literal_to_regex("nota fiscal").search(norm) or re.search(r"\bnf\b", norm)):
-        signals = [s for s in signals if s != "nf"]
+    if SIG_NF in ids and not email.matches("nf"):
+        ids.remove(SIG_NF)
 
     # overrides finais
-    category, confidence, signals, over_meta = apply_overrides(norm, category, confidence, signals)
+    category, confidence, ids, flags = _overrides(email, category, confidence, ids)
 
     # normaliza sinais final
-    def _normalize_signals_final(items: list[str]) -> list[str]:
-        normed = []
-        for s in items:
-            s2 = re.sub(r"\s+", " ", (s or "").strip().lower())
-            if s2 in {"muito obrigado","obrigado!","obrigado.","obrigado,"}:
-                s2 = "obrigado"
-            normed.append(s2)
-        dedup = list(dict.fromkeys(normed))
-        if "obrigado" in dedup:
-            dedup = ["obrigado"] + [x for x in dedup if x != "obrigado"][1:]
-        return dedup
-
-    signals = _normalize_signals_final(signals)
-
-    return category, round(float(confidence), 2), signals, {"used_hf": used_hf, "overrides": over_meta}
+    ids = _normalize_ids(ids, drop_after_thanks=True)
+    return RuleResult(category, confidence, tuple(ids), flags, engine)
+
+def _classify_prepared(
+    email: PreparedEmail, model_result: ModelResult, engine: str = "hf"
+) -> tuple[str, float, list, dict]:
+    return classify_prepared(email, model_result, engine).as_tuple()
+
+def classification_cache_key(email: PreparedEmail, use_hf: bool = True) -> str:
+    """Texto normalizado + versão do rule set + modelo (HF, local ou só regras) + modo."""
+    backend = get_backend()
+    model = backend.model_id if (use_hf and backend.available) else "rules"
+    if email.mode != "full":
+        model = f"{model}+{email.mode}"
+    return content_key("classification", email.rules.version, model, email.norm)
+
+def is_cacheable(info: dict, use_hf: bool = True) -> bool:
+    """Não guarda o fallback por regras quando o modelo deveria ter respondido (falha transitória)."""
+    return info.get("engine", "rules") != "rules" or not (use_hf and get_backend().available)
+
+def classify_email(content: "str | PreparedEmail", use_hf: bool = True) -> tuple[str, float, list, dict]:
+    """
+    Retorna: category, confidence, signals, meta_info
+    meta_info: {"used_hf": bool, "engine": "hf"|"local"|"rules", "overrides": {...}}
+    `use_hf=False` pula o backend de modelo (só regras), útil em processamento offline.
+    """
+    email = prepare_email(content)
+    backend = get_backend()
+    return _classify_prepared(email, backend.predict(email) if use_hf else None, backend.name)
+
+async def classify_email_async(
+    content: "str | PreparedEmail",
+    client: httpx.AsyncClient | None = None,
+    budget: LatencyBudget | None = None,
+) -> tuple[str, float, list, dict]:
+    """
+    Versão assíncrona de `classify_email`: a chamada HF é I/O não bloqueante e as
+    etapas CPU-bound (limpeza, regex, overrides) rodam no pool limitado.
+    """
+    email = content if isinstance(content, PreparedEmail) else await run_cpu(PreparedEmail, content)
+    backend = get_backend()
+    result = await backend.predict_async(email, client=client, budget=budget)
+    return await run_cpu(_classify_prepared, email, result, backend.name)
+
+# ============================================================================
+# Lote
+# ============================================================================
+
+_vectorized = None
+
+def _vector_engine():
+    """Módulo `vectorized` (importa numpy na primeira vez); None se numpy não estiver instalado."""
+    global _vectorized
+    if _vectorized is None:
+        try:
+            from app.services import vectorized
+        except ImportError:
+            vectorized = False
+        _vectorized = vectorized
+    return _vectorized or None
+
+@timed("rules")
+def _classify_vectorized(vectorized, emails: list[PreparedEmail], results: list[ModelResult], engine: str) -> list[RuleResult]:
+    return vectorized.classify_batch(emails, results, engine)
+
+def _classify_prepared_many(
+    emails: list[PreparedEmail], results: list[ModelResult], engine: str = "hf"
+) -> list[RuleResult]:
+    # lote grande: score/overrides como operações NumPy sobre o lote (agrupado por versão das regras)
+    if 0 < RULES_VECTOR_MIN_BATCH <= len(emails):
+        vectorized = _vector_engine()
+        if vectorized is not None:
+            return _classify_vectorized(vectorized, emails, results, engine)
+    return [classify_prepared(e, r, engine) for e, r in zip(emails, results)]
+
+def classify_many(contents: Iterable["str | PreparedEmail"], use_hf: bool = True) -> list[tuple[str, float, list, dict]]:
+    """
+    Classifica vários e-mails de uma vez: mesmo resultado de `classify_email`
+    por item, mas com o backend em lote (HF: chamadas multi-input) e, a partir de
+    `RULES_VECTOR_MIN_BATCH` e-mails, o motor de regras vetorizado.
+    """
+    emails = [prepare_email(c) for c in contents]
+    backend = get_backend()
+    results = backend.predict_many(emails) if use_hf else [None] * len(emails)
+    return [r.as_tuple() for r in _classify_prepared_many(emails, results, backend.name)]
+
+async def classify_many_compact_async(
+    contents: Iterable["str | PreparedEmail"],
+    client: httpx.AsyncClient | None = None,
+    budget: LatencyBudget | None = None,
+) -> list[RuleResult]:
+    """Como `classify_many_async`, mas devolve `RuleResult` (a borda monta o JSON item a item)."""
+    items = list(contents)
+    emails = await run_cpu(lambda: [prepare_email(c) for c in items])
+    backend = get_backend()
+    results = await backend.predict_many_async(emails, client=client, budget=budget)
+    return await run_cpu(_classify_prepared_many, emails, results, backend.name)
+
+async def classify_many_async(
+    contents: Iterable["str | PreparedEmail"],
+    client: httpx.AsyncClient | None = None,
+    budget: LatencyBudget | None = None,
+) -> list[tuple[str, float, list, dict]]:
+    return [r.as_tuple() for r in await classify_many_compact_async(contents, client=client, budget=budget)]
+
+def detect_language_many(texts: Iterable["str | PreparedEmail"], default: str = "pt") -> list[str]:
+    return [detect_language(t, default=default) for t in texts]
@@ -0,0 +1,149 @@
+# app/services/ingest.py
+"""
+Ingestão de anexos (.txt/.pdf) com limites:
+- tamanho do upload (`MAX_UPLOAD_MB`), medido no arquivo temporário do upload;
+- TXT lido em blocos do arquivo temporário e decodificado incrementalmente até
+  `MAX_TEXT_CHARS` (não carrega o arquivo inteiro como string);
+- PDF copiado em blocos para um arquivo temporário e extraído página a página
+  até `MAX_PDF_PAGES` / `MAX_TEXT_CHARS`, num pool de processos com tempo limite
+  por documento (`INGEST_TIMEOUT_S`): o processo do pool recebe só o caminho e
+  lê do disco (o upload não é carregado inteiro nem serializado), e um PDF
+  patológico não segura um worker nem o event loop.
+"""
+import asyncio
+import codecs
+import io
+import os
+import shutil
+import tempfile
+import time
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+
+from app.core.concurrency import run_cpu, run_process
+from app.core.metrics import stage
+from app.core.settings import INGEST_TIMEOUT_S, MAX_PDF_PAGES, MAX_TEXT_CHARS, MAX_UPLOAD_MB
+
+CHUNK_BYTES = 64 * 1024
+
+PDF_UNSUPPORTED = "PDF não suportado (envie PDF pesquisável)."
+
+def upload_size(fp: BinaryIO) -> int:
+    fp.seek(0, 2)
+    size = fp.tell()
+    fp.seek(0)
+    return size
+
+def read_txt_stream(fp: BinaryIO, max_chars: int = MAX_TEXT_CHARS) -> str:
+    """Decodifica (utf-8, ignorando bytes inválidos) em blocos até `max_chars` caracteres."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts, total = [], 0
+    while total < max_chars:
+        chunk = fp.read(CHUNK_BYTES)
+        if not chunk:
+            parts.append(decoder.decode(b"", final=True))
+            break
+        text = decoder.decode(chunk)
+        parts.append(text)
+        total += len(text)
+    text = "".join(parts)[:max_chars]
+    if not text.strip():
+        raise HTTPException(422, detail="TXT vazio ou ilegível.")
+    return text
+
+def extract_pdf_text(
+    source: bytes | str,
+    max_pages: int = MAX_PDF_PAGES,
+    max_chars: int = MAX_TEXT_CHARS,
+    time_limit_s: float | None = None,
+) -> str:
+    """
+    Mesmo texto de `pdfminer.high_level.extract_text`, mas página a página: para
+    ao atingir `max_pages`, `max_chars` ou `time_limit_s` (checado entre páginas).
+    Roda no processo que chamar (pool de ingestão ou workers do `app.bulk`).
+    `source` são os bytes do PDF ou o caminho do arquivo (lido sob demanda).
+    """
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    deadline = None if time_limit_s is None else time.monotonic() + time_limit_s
+    with (open(source, "rb") if isinstance(source, str) else io.BytesIO(source)) as fp, io.StringIO() as out:
+        rsrcmgr = PDFResourceManager(caching=True)
+        device = TextConverter(rsrcmgr, out, codec="utf-8", laparams=LAParams())
+        interpreter = PDFPageInterpreter(rsrcmgr, device)
+        for page in PDFPage.get_pages(fp, maxpages=max_pages, caching=True):
+            interpreter.process_page(page)
+            if out.tell() >= max_chars or (deadline is not None and time.monotonic() >= deadline):
+                break
+        return out.getvalue()[:max_chars]
+
+def warm_pdf_worker() -> int:
+    """Aquecimento (roda em cada processo do pool): importa o pdfminer antes do 1º PDF."""
+    from pdfminer.converter import TextConverter  # noqa: F401
+    from pdfminer.pdfinterp import PDFPageInterpreter  # noqa: F401
+    from pdfminer.pdfpage import PDFPage  # noqa: F401
+    return os.getpid()
+
+def _pdf_or_error(text: str) -> str:
+    # PDF sem texto cai no mesmo 415 de PDF ilegível (comportamento original)
+    if not text.strip():
+        raise HTTPException(415, detail=PDF_UNSUPPORTED)
+    return text
+
+def read_pdf(blob: bytes) -> str:
+    """Versão síncrona (CLI em lote): mesmos limites, sem pool de processos."""
+    try:
+        text = extract_pdf_text(blob, time_limit_s=INGEST_TIMEOUT_S)
+    except Exception:
+        raise HTTPException(415, detail=PDF_UNSUPPORTED)
+    return _pdf_or_error(text)
+
+async def read_pdf_async(path: str) -> str:
+    # o worker para sozinho no limite de tempo (entre páginas); o timeout rígido
+    # do pool cobre uma página que sozinha passe do limite
+    try:
+        text = await run_process(
+            extract_pdf_text, path, MAX_PDF_PAGES, MAX_TEXT_CHARS, INGEST_TIMEOUT_S,
+            timeout=INGEST_TIMEOUT_S + 1.0,
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(422, detail=f"PDF demorou demais para processar (limite: {INGEST_TIMEOUT_S:g}s).")
+    except Exception:
+        raise HTTPException(415, detail=PDF_UNSUPPORTED)
+    return _pdf_or_error(text)
+
+def _spool_to_disk(fp: BinaryIO) -> str:
+    # o SpooledTemporaryFile do upload fica em memória (ou num temporário sem nome):
+    # copia em blocos para um arquivo com caminho que o processo do pool consiga abrir
+    with tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", delete=False) as tmp:
+        shutil.copyfileobj(fp, tmp, CHUNK_BYTES)
+    return tmp.name
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+async def ingest_upload(file: UploadFile) -> str:
+    """Valida tamanho/formato do upload e extrai o texto sem bloquear o event loop."""
+    fp = file.file
+    size = await run_cpu(upload_size, fp)
+    if size > MAX_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(413, detail=f"Arquivo muito grande. Limite: {MAX_UPLOAD_MB}MB.")
+
+    name = (file.filename or "").lower()
+    if name.endswith(".txt"):
+        with stage("ingest_txt"):
+            return await run_cpu(read_txt_stream, fp)
+    if name.endswith(".pdf"):
+        with stage("ingest_pdf"):
+            path = await run_cpu(_spool_to_disk, fp)
+            try:
+                return await read_pdf_async(path)
+            finally:
+                await run_cpu(_remove, path)
+    raise HTTPException(415, detail="Formato não suportado. Use .txt ou .pdf.")
@@ -0,0 +1,200 @@
+# app/services/linear_model.py
+"""
+Classificador linear local (CPU, sem dependências extras): hashing vectorizer
+sobre palavras e bigramas do texto normalizado + regressão logística binária.
+Substitui o zero-shot remoto quando `CLASSIFIER_BACKEND=local`.
+
+    python -m app.services.linear_model train rotulados.jsonl -o models/linear.json
+    python -m app.services.linear_model eval rotulados.jsonl -m models/linear.json
+
+JSONL de treino/avaliação: uma linha por e-mail,
+{"email_text": "...", "category": "Produtivo" | "Improdutivo"}.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.matcher import WORD_RE
+
+LABELS = ("Improdutivo", "Produtivo")  # índice 1 = classe positiva
+
+Features = Dict[int, float]
+
+class HashingVectorizer:
+    """Palavras + bigramas -> índices por crc32 (estável entre processos), norma L2."""
+
+    def __init__(self, n_features: int = 2 ** 18, bigrams: bool = True):
+        self.n_features = n_features
+        self.bigrams = bigrams
+
+    def transform(self, text_norm: str) -> Features:
+        words = WORD_RE.findall(text_norm or "")
+        n = self.n_features
+        crc = zlib.crc32
+        counts: Features = {}
+        for w in words:
+            i = crc(w.encode()) % n
+            counts[i] = counts.get(i, 0.0) + 1.0
+        if self.bigrams:
+            for a, b in zip(words, words[1:]):
+                i = crc(f"{a} {b}".encode()) % n
+                counts[i] = counts.get(i, 0.0) + 1.0
+        if not counts:
+            return counts
+        norm = math.sqrt(sum(v * v for v in counts.values()))
+        return {i: v / norm for i, v in counts.items()}
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+class LinearModel:
+    """Regressão logística esparsa; `predict` devolve (rótulo, score) como o zero-shot."""
+
+    def __init__(self, weights: Dict[int, float], bias: float, vectorizer: HashingVectorizer):
+        self.weights = weights
+        self.bias = bias
+        self.vectorizer = vectorizer
+        payload = json.dumps(
+            [vectorizer.n_features, vectorizer.bigrams, bias, sorted(weights.items())], separators=(",", ":")
+        )
+        self.version = hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+    def proba(self, text_norm: str) -> float:
+        """P(Produtivo)."""
+        w = self.weights
+        z = self.bias
+        for i, v in self.vectorizer.transform(text_norm).items():
+            z += w.get(i, 0.0) * v
+        return _sigmoid(z)
+
+    def predict(self, text_norm: str) -> Tuple[str, float]:
+        p = self.proba(text_norm)
+        return (LABELS[1], p) if p >= 0.5 else (LABELS[0], 1.0 - p)
+
+    def predict_many(self, texts_norm: Iterable[str]) -> List[Tuple[str, float]]:
+        return [self.predict(t) for t in texts_norm]
+
+    # --- persistência ---
+
+    def to_dict(self) -> dict:
+        return {
+            "format": "hashing-logreg/1",
+            "labels": list(LABELS),
+            "n_features": self.vectorizer.n_features,
+            "bigrams": self.vectorizer.bigrams,
+            "bias": self.bias,
+            "weights": {str(i): w for i, w in self.weights.items()},
+        }
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), separators=(",", ":")), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "LinearModel":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("format") != "hashing-logreg/1":
+            raise ValueError(f"formato de modelo não suportado: {data.get('format')!r}")
+        vectorizer = HashingVectorizer(int(data["n_features"]), bool(data["bigrams"]))
+        weights = {int(i): float(w) for i, w in data["weights"].items()}
+        return cls(weights, float(data["bias"]), vectorizer)
+
+def train(
+    texts_norm: Sequence[str],
+    labels: Sequence[str],
+    *,
+    n_features: int = 2 ** 18,
+    epochs: int = 8,
+    lr: float = 0.5,
+    l2: float = 1e-5,
+    seed: int = 0,
+) -> LinearModel:
+    """SGD com L2 sobre features esparsas (regularização aplicada só nas features ativas)."""
+    vectorizer = HashingVectorizer(n_features)
+    data = [(vectorizer.transform(t), 1.0 if y == LABELS[1] else 0.0) for t, y in zip(texts_norm, labels)]
+    weights: Dict[int, float] = {}
+    bias = 0.0
+    rng = random.Random(seed)
+    order = list(range(len(data)))
+    step = 0
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for k in order:
+            x, y = data[k]
+            step += 1
+            eta = lr / math.sqrt(step / max(1, len(data)) + 1.0)
+            z = bias + sum(weights.get(i, 0.0) * v for i, v in x.items())
+            g = _sigmoid(z) - y
+            bias -= eta * g
+            for i, v in x.items():
+                w = weights.get(i, 0.0)
+                weights[i] = w - eta * (g * v + l2 * w)
+    weights = {i: w for i, w in weights.items() if abs(w) > 1e-6}
+    return LinearModel(weights, bias, vectorizer)
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def _read_labeled(path: Path) -> Tuple[List[str], List[str]]:
+    from app.services.classifier import normalize, clean_text
+
+    texts, labels = [], []
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            label = item.get("category")
+            if label not in LABELS:
+                continue
+            texts.append(normalize(clean_text(str(item.get("email_text") or ""))))
+            labels.append(label)
+    return texts, labels
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.services.linear_model", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_train = sub.add_parser("train", help="treina e grava o modelo")
+    p_train.add_argument("data", type=Path)
+    p_train.add_argument("-o", "--output", type=Path, default=Path("models/linear.json"))
+    p_train.add_argument("--epochs", type=int, default=8)
+    p_train.add_argument("--features", type=int, default=2 ** 18)
+    p_eval = sub.add_parser("eval", help="acurácia e throughput de um modelo")
+    p_eval.add_argument("data", type=Path)
+    p_eval.add_argument("-m", "--model", type=Path, default=Path("models/linear.json"))
+    args = parser.parse_args(argv)
+
+    texts, labels = _read_labeled(args.data)
+    if not texts:
+        parser.error("nenhum exemplo rotulado (category = Produtivo/Improdutivo)")
+
+    if args.cmd == "train":
+        model = train(texts, labels, n_features=args.features, epochs=args.epochs)
+        model.save(args.output)
+        print(f"[linear] {len(texts)} exemplos, {len(model.weights)} pesos, versão {model.version} -> {args.output}")
+        return 0
+
+    model = LinearModel.load(args.model)
+    start = time.perf_counter()
+    preds = model.predict_many(texts)
+    elapsed = time.perf_counter() - start
+    acc = sum(1 for (p, _), y in zip(preds, labels) if p == y) / len(labels)
+    print(
+        f"[linear] {len(texts)} exemplos, acurácia {acc:.3f}, "
+        f"{elapsed / len(texts) * 1e6:.0f} µs/e-mail"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
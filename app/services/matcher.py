@@ -0,0 +1,250 @@
+# app/services/matcher.py
+"""
+Matcher multi-vocabulário: todos os termos (de todas as categorias) são
+compilados uma única vez e o texto normalizado é varrido uma única vez por
+`scan`, devolvendo todos os acertos marcados por categoria e peso.
+
+Sintaxe dos termos (equivalente aos regex `\\b...\\b` que substitui):
+- palavras separadas por espaço  -> `\\s+` entre as palavras
+- palavras separadas por hífen   -> `[-\\s]+` entre as palavras ("e-mail")
+- `*` no fim do termo            -> a última palavra casa por prefixo
+"""
+from typing import Callable, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Sequence, Set, Tuple
+import re
+
+WORD_RE = re.compile(r"\w+")
+
+_WS, _DASH = 0, 1
+
+# (palavras, separadores entre palavras, última palavra por prefixo)
+Spec = Tuple[Tuple[str, ...], Tuple[int, ...], bool]
+
+class Hit(NamedTuple):
+    category: str
+    key: str
+    weight: float
+
+def parse_term(term: str) -> Spec:
+    t = term.strip()
+    prefix = t.endswith("*")
+    if prefix:
+        t = t[:-1]
+    words, gaps = [], []
+    last_end = None
+    for m in WORD_RE.finditer(t):
+        if last_end is not None:
+            gap = t[last_end:m.start()]
+            if gap.isspace():
+                gaps.append(_WS)
+            elif gap and all(c == "-" or c.isspace() for c in gap):
+                gaps.append(_DASH)
+            else:
+                raise ValueError(f"termo não suportado pelo matcher: {term!r}")
+        elif m.start() != 0:
+            raise ValueError(f"termo não suportado pelo matcher: {term!r}")
+        words.append(m.group())
+        last_end = m.end()
+    if not words or last_end != len(t):
+        raise ValueError(f"termo não suportado pelo matcher: {term!r}")
+    return tuple(words), tuple(gaps), prefix
+
+def _gap_ok(gap: str, kind: int) -> bool:
+    if kind == _WS:
+        return gap.isspace()
+    return all(c == "-" or c.isspace() for c in gap)
+
+class MatchResult:
+    """Resultado de um `scan`: conjunto de termos acertados + consultas por categoria."""
+
+    __slots__ = ("_matcher", "_matched", "_any")
+
+    def __init__(self, matcher: "TermMatcher", matched: FrozenSet[Spec]):
+        self._matcher = matcher
+        self._matched = matched
+        self._any: Dict[str, bool] = {}
+
+    def any(self, category: str) -> bool:
+        hit = self._any.get(category)
+        if hit is None:
+            matched = self._matched
+            hit = self._any[category] = any(
+                not matched.isdisjoint(specs) for _, _, specs in self._matcher.entries[category]
+            )
+        return hit
+
+    def keys(self, category: str) -> List[str]:
+        """Chaves acertadas da categoria, na ordem do vocabulário."""
+        matched = self._matched
+        return [key for key, _, specs in self._matcher.entries[category] if not matched.isdisjoint(specs)]
+
+    @property
+    def hits(self) -> List[Hit]:
+        matched = self._matched
+        return [
+            Hit(category, key, weight)
+            for category, entries in self._matcher.entries.items()
+            for key, weight, specs in entries
+            if not matched.isdisjoint(specs)
+        ]
+
+class TermMatcher:
+    """
+    Compila vocabulários `{categoria: termos}` (com pesos opcionais por termo)
+    num índice por palavra. Termos de uma palavra viram interseção de conjuntos;
+    termos de várias palavras só são verificados por posição quando todas as
+    suas palavras aparecem no texto.
+    """
+
+    def __init__(
+        self,
+        vocabularies: Mapping[str, Iterable[str]],
+        weights: Mapping[str, Mapping[str, float]] | None = None,
+        normalizer=None,
+    ):
+        weights = weights or {}
+        norm = normalizer or (lambda s: s.lower().strip())
+        self.entries: Dict[str, List[Tuple[str, float, FrozenSet[Spec]]]] = {}
+        single: Dict[str, Spec] = {}
+        prefix_single: List[Spec] = []
+        multi: Dict[str, List[Spec]] = {}
+        seen = set()
+        max_span = 0
+
+        for category, terms in vocabularies.items():
+            cat_weights = weights.get(category, {})
+            entries = []
+            for key in dict.fromkeys(terms):
+                spec = parse_term(norm(key))
+                entries.append((key, float(cat_weights.get(key, 1.0)), frozenset([spec])))
+                if spec in seen:
+                    continue
+                seen.add(spec)
+                max_span = max(max_span, len(norm(key)))
+                words, _, prefix = spec
+                if len(words) > 1:
+                    multi.setdefault(words[0], []).append(spec)
+                elif prefix:
+                    prefix_single.append(spec)
+                else:
+                    single[words[0]] = spec
+            self.entries[category] = entries
+
+        self._single = single
+        self._single_words = frozenset(single)
+        self._prefix_single = tuple(prefix_single)
+        self._multi = multi
+        # maior termo (em caracteres): sobreposição necessária entre blocos em `scan_until`
+        self.max_span = max_span
+
+    def columns(self) -> Tuple[List[Tuple[str, str]], Dict[Spec, Tuple[int, ...]]]:
+        """
+        Colunas da matriz de acertos: (categoria, chave) na ordem de `entries`
+        (cada categoria ocupa um intervalo contíguo) e termo -> colunas que ele acerta.
+        Montado sob demanda (matchers de snapshots antigos não têm o índice).
+        """
+        index = self.__dict__.get("_columns")
+        if index is None:
+            cols: List[Tuple[str, str]] = []
+            by_spec: Dict[Spec, List[int]] = {}
+            for category, entries in self.entries.items():
+                for key, _, specs in entries:
+                    for spec in specs:
+                        by_spec.setdefault(spec, []).append(len(cols))
+                    cols.append((category, key))
+            index = self._columns = (cols, {spec: tuple(c) for spec, c in by_spec.items()})
+        return index
+
+    def hit_coords(self, results: Sequence[MatchResult]) -> Tuple[List[int], List[int]]:
+        """Matriz esparsa de acertos (e-mails x colunas de `columns`) em coordenadas (linhas, colunas)."""
+        by_spec = self.columns()[1]
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, result in enumerate(results):
+            for spec in result._matched:
+                hit = by_spec.get(spec)
+                if hit:
+                    rows.extend([row] * len(hit))
+                    cols.extend(hit)
+        return rows, cols
+
+    def scan(self, text: str) -> MatchResult:
+        return MatchResult(self, frozenset(self._scan_specs((text or "").lower())))
+
+    def scan_until(
+        self,
+        text: str,
+        should_stop: Callable[[MatchResult], bool],
+        chunk_chars: int = 2048,
+    ) -> Tuple[MatchResult, int]:
+        """
+        Varre `text` em blocos (cortados em espaços, com sobreposição suficiente
+        para termos de várias palavras) e para assim que `should_stop(resultado
+        parcial)` for verdadeiro. Retorna (resultado, caracteres varridos).
+        Sem parada antecipada, o resultado é o mesmo de `scan(text)`.
+        """
+        text = (text or "").lower()
+        n = len(text)
+        overlap = 2 * self.max_span + 16
+        matched: Set[Spec] = set()
+        pos = 0
+        result = MatchResult(self, frozenset())
+        while pos < n:
+            end = min(n, pos + max(1, chunk_chars))
+            if end < n:
+                space = text.find(" ", end)
+                end = n if space == -1 else space
+            start = 0 if pos <= overlap else text.rfind(" ", 0, pos - overlap) + 1
+            matched |= self._scan_specs(text[start:end])
+            pos = end
+            result = MatchResult(self, frozenset(matched))
+            if pos < n and should_stop(result):
+                break
+        return result, pos
+
+    def _scan_specs(self, text: str) -> Set[Spec]:
+        words = WORD_RE.findall(text)
+        present = set(words)
+
+        single = self._single
+        matched = {single[w] for w in present.intersection(self._single_words)}
+        for spec in self._prefix_single:
+            stem = spec[0][0]
+            if any(w.startswith(stem) for w in present):
+                matched.add(spec)
+
+        # multi-palavra: só candidatos cujas palavras (exceto prefixo final) estão no texto
+        candidates: Dict[str, List[Spec]] = {}
+        for first in present.intersection(self._multi):
+            for spec in self._multi[first]:
+                ws, _, prefix = spec
+                needed = ws[:-1] if prefix else ws
+                if present.issuperset(needed):
+                    candidates.setdefault(first, []).append(spec)
+
+        if candidates:
+            toks = [(m.group(), m.start(), m.end()) for m in WORD_RE.finditer(text)]
+            n = len(toks)
+            for i, (tok, _, _) in enumerate(toks):
+                specs = candidates.get(tok)
+                if not specs:
+                    continue
+                for spec in specs:
+                    if spec in matched:
+                        continue
+                    ws, gaps, prefix = spec
+                    k = len(ws)
+                    if i + k > n:
+                        continue
+                    ok = True
+                    for j in range(1, k):
+                        prev_end = toks[i + j - 1][2]
+                        cur, start, _ = toks[i + j]
+                        word = ws[j]
+                        if not (cur.startswith(word) if prefix and j == k - 1 else cur == word):
+                            ok = False; break
+                        if not _gap_ok(text[prev_end:start], gaps[j - 1]):
+                            ok = False; break
+                    if ok:
+                        matched.add(spec)
+
+        return matched
@@ -0,0 +1,66 @@
+# app/services/quoting.py
+"""
+Remoção de histórico citado em e-mails (modo incremental): fica só a mensagem
+mais recente, sem respostas citadas ("> ..."), cabeçalhos de resposta
+("Em ... escreveu:", "On ... wrote:"), blocos "-----Original Message-----" /
+mensagens encaminhadas e cabeçalhos no estilo Outlook ("De: / Enviado: / Para:").
+"""
+import re
+
+# separador usado pela rota quando chegam texto colado + anexo
+ATTACHMENT_SEPARATOR = "\n\n---\n[CONTEÚDO DO ANEXO]\n"
+
+QUOTE_LINE_RE = re.compile(r"^\s*>")
+# linha que inicia o histórico: tudo dali para baixo é descartado
+HISTORY_START_RE = re.compile(
+    r"""^\s*(?:
+        -{2,}\s*(?:original\s+message|mensagem\s+original|mensaje\s+original)\s*-{2,}
+      | -{2,}\s*(?:forwarded\s+message|mensagem\s+encaminhada|mensaje\s+reenviado)\s*-{2,}
+      | (?:begin\s+forwarded\s+message|in[ií]cio\s+da\s+mensagem\s+encaminhada)\s*:
+    )""",
+    re.IGNORECASE | re.VERBOSE,
+)
+# "Em qua., 2 de out. de 2024 às 10:00, Fulano <f@x.com> escreveu:" (pode quebrar em 2 linhas)
+REPLY_HEADER_RE = re.compile(
+    r"^\s*(?:on|em|el)\b.{0,300}?\b(?:wrote|escreveu|escribi[oó])\s*:\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+REPLY_OPEN_RE = re.compile(r"^\s*(?:on|em|el)\b", re.IGNORECASE)
+HEADER_FROM_RE = re.compile(r"^\s*\**(?:from|de)\s*:\**", re.IGNORECASE)
+HEADER_NEXT_RE = re.compile(
+    r"^\s*\**(?:sent|date|enviado|enviada\s+em|data|fecha|enviado\s+el|to|para|subject|assunto|asunto)\s*:",
+    re.IGNORECASE,
+)
+
+def _history_start(lines: list[str], i: int) -> bool:
+    line = lines[i]
+    if HISTORY_START_RE.match(line):
+        return True
+    if REPLY_HEADER_RE.match(line):
+        return True
+    if REPLY_OPEN_RE.match(line) and i + 1 < len(lines) and REPLY_HEADER_RE.match(line + " " + lines[i + 1]):
+        return True
+    # bloco de cabeçalho (De:/From: seguido de Enviado:/Para:/Assunto: nas próximas linhas)
+    if HEADER_FROM_RE.match(line):
+        return any(HEADER_NEXT_RE.match(nxt) for nxt in lines[i + 1:i + 4])
+    return False
+
+def newest_message(text: str) -> str:
+    """Corta o histórico citado/encaminhado; se não sobrar nada, devolve o texto original."""
+    lines = (text or "").splitlines()
+    kept = []
+    for i, line in enumerate(lines):
+        if _history_start(lines, i):
+            break
+        if QUOTE_LINE_RE.match(line):
+            continue
+        kept.append(line)
+    body = "\n".join(kept).strip()
+    return body if body else (text or "")
+
+def strip_history(content: str) -> str:
+    """`newest_message` no corpo e no anexo (quando a rota juntou os dois)."""
+    body, sep, attachment = (content or "").partition(ATTACHMENT_SEPARATOR)
+    if not sep:
+        return newest_message(body)
+    return newest_message(body) + sep + newest_message(attachment)
@@ -1,7 +1,17 @@
 # app/services/replier.py
-from typing import List
-from app.core.settings import OPENAI_KEY, OPENAI_MODEL, TEMP, MAX_TOKENS
-import time
+import asyncio
+import contextvars
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.settings import (
+    OPENAI_KEY, OPENAI_MODEL, TEMP, MAX_TOKENS, LLM_REPLY_POLICY, REPLY_SEMANTIC_CACHE,
+    REPLY_BATCH_MAX, REPLY_BATCH_MAX_TOKENS, REPLY_BATCH_MIN_BUDGET_S, REPLY_BATCH_WINDOW_MS,
+)
+from app.core.cache import content_key
+from app.core.clients import get_sync_openai
+from app.core.metrics import FALLBACKS, LLM_TOKENS, REPLY_BATCH_SIZE, record_tokens, stage
+from app.core.resilience import LatencyBudget, call_with_retries, call_with_retries_async, get_breaker
+import hashlib
 
 # --- Prompts do sistema por idioma ---
 SYS_PROMPTS = {
@@ -35,110 +45,380 @@ def _sys_prompt(lang: str) -> str:
     return SYS_PROMPTS.get(lang, SYS_PROMPTS["pt"])
 
 # --- Templates localizados (fallback quando a LLM não responde) ---
-def reply_template(category: str, signals: List[str], lang: str = "pt") -> str:
-    # considera variações de “anexo”
-    has_attach = any(s in signals for s in (
-        "anexo", "arquivo", "attachment", "attached", "adjunto"
-    ))
-
-    if lang == "en":
-        if category == "Produtivo":
-            extra = "" if has_attach else " If possible, please attach screenshots/files."
-            return (
-                "Hi! We’ve received your message and will proceed. "
-                "To speed things up, could you confirm the **ticket ID** (or client data) and the **date/time** of the issue?"
-                f"{extra} Our first update is due **within 1 business day**."
-            )
-        else:
-            return (
-                "Hi! Thanks for your message. At the moment **no action is required** from our team. "
-                "If you need anything else, just let us know."
-            )
-
-    if lang == "es":
-        if category == "Produtivo":
-            extra = "" if has_attach else " Si es posible, adjunta capturas/archivos."
-            return (
-                "¡Hola! Recibimos tu mensaje y daremos seguimiento. "
-                "Para agilizar, ¿podrías confirmar el **ID del ticket** (o datos del cliente) y la **fecha/hora** del incidente?"
-                f"{extra} Nuestra primera actualización será **dentro de 1 día hábil**."
-            )
-        else:
-            return (
-                "¡Hola! Gracias por tu mensaje. Por el momento **no se requiere ninguna acción** de nuestro equipo. "
-                "Si necesitas algo más, avísanos."
-            )
-
-    # default: pt-BR
-    if category == "Produtivo":
-        extra = " Se possível, anexe prints/arquivos." if not has_attach else ""
-        return (
+# Produtivo: (texto com {extra}, pedido de anexo usado quando o e-mail não menciona um)
+TEMPLATE_TEXTS: Dict[str, Dict[str, Any]] = {
+    "pt": {
+        "Produtivo": (
             "Olá, tudo bem? Recebemos sua mensagem e vamos dar andamento. "
             "Para agilizar, poderia confirmar o **ID do chamado** (ou dados do cliente) e a **data/horário** do ocorrido?"
-            f"{extra} Nossa previsão para a primeira atualização é de **até 1 dia útil**."
-        )
-    else:
-        return (
+            "{extra} Nossa previsão para a primeira atualização é de **até 1 dia útil**.",
+            " Se possível, anexe prints/arquivos.",
+        ),
+        "Improdutivo": (
             "Olá! Obrigado pela mensagem. No momento **não é necessária nenhuma ação** da nossa equipe. "
             "Se precisar de algo, é só nos chamar."
-        )
+        ),
+    },
+    "en": {
+        "Produtivo": (
+            "Hi! We’ve received your message and will proceed. "
+            "To speed things up, could you confirm the **ticket ID** (or client data) and the **date/time** of the issue?"
+            "{extra} Our first update is due **within 1 business day**.",
+            " If possible, please attach screenshots/files.",
+        ),
+        "Improdutivo": (
+            "Hi! Thanks for your message. At the moment **no action is required** from our team. "
+            "If you need anything else, just let us know."
+        ),
+    },
+    "es": {
+        "Produtivo": (
+            "¡Hola! Recibimos tu mensaje y daremos seguimiento. "
+            "Para agilizar, ¿podrías confirmar el **ID del ticket** (o datos del cliente) y la **fecha/hora** del incidente?"
+            "{extra} Nuestra primera actualización será **dentro de 1 día hábil**.",
+            " Si es posible, adjunta capturas/archivos.",
+        ),
+        "Improdutivo": (
+            "¡Hola! Gracias por tu mensaje. Por el momento **no se requiere ninguna acción** de nuestro equipo. "
+            "Si necesitas algo más, avísanos."
+        ),
+    },
+}
+
+# considera variações de “anexo”
+ATTACH_SIGNALS = frozenset(("anexo", "arquivo", "attachment", "attached", "adjunto"))
+
+def _compile_templates() -> Dict[Tuple[str, str, bool], str]:
+    """Todas as variantes (idioma × categoria × tem anexo), montadas uma vez no import."""
+    out = {}
+    for lang, texts in TEMPLATE_TEXTS.items():
+        text, ask_attach = texts["Produtivo"]
+        for has_attach in (False, True):
+            out[(lang, "Produtivo", has_attach)] = text.format(extra="" if has_attach else ask_attach)
+            out[(lang, "Improdutivo", has_attach)] = texts["Improdutivo"]
+    return out
+
+REPLY_TEMPLATES = _compile_templates()
+
+def reply_template(category: str, signals: List[str], lang: str = "pt") -> str:
+    has_attach = not ATTACH_SIGNALS.isdisjoint(signals)
+    if lang not in TEMPLATE_TEXTS:
+        lang = "pt"
+    if category != "Produtivo":
+        category = "Improdutivo"
+    return REPLY_TEMPLATES[(lang, category, has_attach)]
+
+# --- Política e cache de respostas da LLM ---
+def llm_reply_allowed(category: str) -> bool:
+    """LLM_REPLY_POLICY: "all" (padrão), "produtivo" (Improdutivo fica no template) ou "off"."""
+    if LLM_REPLY_POLICY == "off":
+        return False
+    return LLM_REPLY_POLICY != "produtivo" or category == "Produtivo"
+
+def reply_cache_key(category: str, lang: str, signals: List[str], snippet: str) -> str:
+    """Resposta gerada por (categoria, idioma, sinais, hash do snippet enviado ao modelo)."""
+    snippet_hash = hashlib.sha256(snippet[:900].encode("utf-8", errors="ignore")).hexdigest()
+    return content_key("reply", OPENAI_MODEL, category, lang, ",".join(signals), snippet_hash)
+
+def semantic_reply_key(category: str, lang: str, signals: List[str]) -> Optional[str]:
+    """
+    Chave sem o texto do e-mail: (categoria, idioma, sinais ordenados). E-mails
+    com o mesmo conjunto de sinais reaproveitam a resposta dentro de
+    REPLY_SEMANTIC_TTL_S. None quando a categoria fica fora (REPLY_SEMANTIC_CACHE, off por padrão),
+    caso em que vale só a chave exata de `reply_cache_key`.
+    """
+    if REPLY_SEMANTIC_CACHE == "off" or (REPLY_SEMANTIC_CACHE == "improdutivo" and category != "Improdutivo"):
+        return None
+    return content_key("reply-semantic", OPENAI_MODEL, category, lang, ",".join(sorted(set(signals))))
 
 # --- Geração com OpenAI (responde no idioma detectado) ---
+OPENAI_RETRIES, OPENAI_BACKOFF, OPENAI_TIMEOUT = 3, 2, 15
+
+def _reply_request(
+    category: str,
+    snippet: str,
+    signals: list[str],
+    lang: str,
+    temperature: float | None,
+) -> dict:
+    # ajuste leve de temperatura por classe (opcional)
+    if temperature is not None:
+        temp = float(temperature)
+    else:
+        temp = float(TEMP)
+        if category == "Improdutivo":
+            temp = max(temp, 0.55)  # um pouco mais “humano” em agradecimentos
+
+    sys_msg = _sys_prompt(lang)
+    user_msg = (
+        f"Category: {category}\n"
+        f"Signals: {', '.join(signals) if signals else 'none'}\n"
+        f"Email snippet (clean, up to 900 chars): {snippet[:900]}"
+    )
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": sys_msg},
+            {"role": "user", "content": user_msg},
+        ],
+        "temperature": temp,
+        "max_tokens": MAX_TOKENS,
+        "timeout": OPENAI_TIMEOUT,
+    }
+
+def _reply_text(resp) -> str | None:
+    return (resp.choices[0].message.content or "").strip() or None
+
+def _charge(resp) -> Tuple[int, int]:
+    """(prompt, completion) cobrados na chamada; alimenta o contador global uma vez."""
+    usage = getattr(resp, "usage", None)
+    prompt = int(getattr(usage, "prompt_tokens", 0) or 0)
+    completion = int(getattr(usage, "completion_tokens", 0) or 0)
+    LLM_TOKENS.inc(prompt, kind="prompt")
+    LLM_TOKENS.inc(completion, kind="completion")
+    return prompt, completion
+
 def ai_reply(
     category: str,
     snippet: str,
     signals: list[str],
     lang: str = "pt",
-    temperature: float | None = None
+    temperature: float | None = None,
+    budget: LatencyBudget | None = None,
 ) -> str | None:
     if not OPENAI_KEY:
         return None
 
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_KEY)
+        client = get_sync_openai()
+        request = _reply_request(category, snippet, signals, lang, temperature)
 
-        # ajuste leve de temperatura por classe (opcional)
-        if temperature is not None:
-            temp = float(temperature)
-        else:
-            temp = float(TEMP)
-            if category == "Improdutivo":
-                temp = max(temp, 0.55)  # um pouco mais “humano” em agradecimentos
-
-        sys_msg = _sys_prompt(lang)
-        user_msg = (
-            f"Category: {category}\n"
-            f"Signals: {', '.join(signals) if signals else 'none'}\n"
-            f"Email snippet (clean, up to 900 chars): {snippet[:900]}"
-        )
-
-        # retries simples com backoff exponencial
-        retries = 3
-        backoff = 2
-        for attempt in range(1, retries + 1):
-            try:
-                resp = client.chat.completions.create(
-                    model=OPENAI_MODEL,
-                    messages=[
-                        {"role": "system", "content": sys_msg},
-                        {"role": "user", "content": user_msg},
-                    ],
-                    temperature=temp,
-                    max_tokens=MAX_TOKENS,
-                    timeout=15,
-                )
-                content = (resp.choices[0].message.content or "").strip()
-                if content:
-                    return content
-            except Exception as e:
-                if attempt == retries:
-                    print(f"[OpenAI] Falha após {retries} tentativas: {e}")
-                    return None
-                wait = backoff ** attempt
-                print(f"[OpenAI] Tentativa {attempt} falhou, aguardando {wait}s...")
-                time.sleep(wait)
+        # retries com backoff exponencial, respeitando o breaker e o orçamento
+        def _call(timeout: float):
+            resp = client.chat.completions.create(**{**request, "timeout": timeout})
+            record_tokens(*_charge(resp))
+            return _reply_text(resp)
+
+        with stage("openai"):
+            text, _ = call_with_retries(
+                get_breaker("openai"), _call,
+                retries=OPENAI_RETRIES, backoff=OPENAI_BACKOFF, timeout=OPENAI_TIMEOUT,
+                budget=budget, label="OpenAI",
+            )
+        return text
+    except Exception:
+        return None
 
+async def ai_reply_async(
+    category: str,
+    snippet: str,
+    signals: list[str],
+    lang: str = "pt",
+    temperature: float | None = None,
+    client=None,
+    budget: LatencyBudget | None = None,
+) -> str | None:
+    """
+    Mesmo contrato de `ai_reply`, com AsyncOpenAI e asyncio.sleep entre tentativas.
+    `client` é o AsyncOpenAI com pool criado no lifespan; sem ele, usa um temporário.
+    Com o cliente do lifespan, o pedido passa pelo `ReplyBatcher` (lote de e-mails
+    por chamada). Os tokens atribuídos à requisição vão para `track_tokens()`.
+    """
+    if not OPENAI_KEY:
         return None
+
+    try:
+        request = _reply_request(category, snippet, signals, lang, temperature)
+        with stage("openai"):
+            if client is not None and REPLY_BATCH_MAX > 1:
+                text, usage, size = await BATCHER.submit(client, request, category, snippet, signals, lang, budget)
+            else:
+                size = 1
+                if client is not None:
+                    text, usage = await _ai_reply_with(client, request, budget)
+                else:
+                    from openai import AsyncOpenAI
+                    async with AsyncOpenAI(api_key=OPENAI_KEY, max_retries=0) as tmp:
+                        text, usage = await _ai_reply_with(tmp, request, budget)
+        record_tokens(*usage, batch_size=size)
+        return text
     except Exception:
         return None
+
+async def _ai_reply_with(client, request: dict, budget: LatencyBudget | None) -> Tuple[str | None, Tuple[int, int]]:
+    usage = [0, 0]
+
+    async def _call(timeout: float):
+        resp = await client.chat.completions.create(**{**request, "timeout": timeout})
+        prompt, completion = _charge(resp)
+        usage[0] += prompt
+        usage[1] += completion
+        return _reply_text(resp)
+
+    text, _ = await call_with_retries_async(
+        get_breaker("openai"), _call,
+        retries=OPENAI_RETRIES, backoff=OPENAI_BACKOFF, timeout=OPENAI_TIMEOUT,
+        budget=budget, label="OpenAI",
+    )
+    return text, (usage[0], usage[1])
+
+# --- Lote de respostas (vários e-mails numa chamada) ---
+# O system prompt é o mesmo do idioma; vai uma vez por lote em vez de uma vez por e-mail.
+BATCH_INSTRUCTIONS = (
+    "You will receive several emails as a JSON array of objects with id, category, signals and snippet. "
+    "Write one reply per email, following the rules above for its category and language. "
+    'Answer only with a JSON object {"replies": [{"id": "<id>", "reply": "<text>"}]} containing every id exactly once.'
+)
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa sem tokenizer (~4 caracteres por token), usada só para limitar o lote."""
+    return len(text) // 4 + 1
+
+def _split(total: int, weights: List[int]) -> List[int]:
+    """Divide `total` proporcionalmente aos pesos (inteiros que somam `total`)."""
+    weight_sum = sum(weights) or 1
+    shares = [total * w // weight_sum for w in weights]
+    shares[-1] += total - sum(shares)
+    return shares
+
+def parse_batch_replies(text: str | None, ids: List[str]) -> Dict[str, str]:
+    """{id: resposta} do JSON do lote; ids ausentes ou inválidos ficam de fora (template)."""
+    raw = (text or "").strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`").removeprefix("json").strip()
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return {}
+    items = data.get("replies") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return {}
+    wanted, out = set(ids), {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item_id, reply = str(item.get("id")), item.get("reply")
+        if item_id in wanted and isinstance(reply, str) and reply.strip():
+            out[item_id] = reply.strip()
+    return out
+
+class _PendingReply:
+    __slots__ = ("client", "request", "item", "tokens", "budget", "future")
+
+    def __init__(self, client, request: dict, item: dict, budget: LatencyBudget | None, future: asyncio.Future):
+        self.client = client
+        self.request = request
+        self.item = item
+        self.tokens = estimate_tokens(json.dumps(item, ensure_ascii=False)) + MAX_TOKENS
+        self.budget = budget
+        self.future = future
+
+class ReplyBatcher:
+    """
+    Junta pedidos de resposta que chegam dentro de `window_s` (mesmo idioma e
+    temperatura) numa só chamada à LLM, até `max_items` e-mails ou `max_tokens`
+    (prompt estimado + completions). Cada pedido recebe a sua resposta, os tokens
+    na proporção do que consumiu e o tamanho do lote. Lote de um só usa o prompt
+    individual de sempre. Pedidos com menos de `min_budget_s` de orçamento ao
+    fechar a janela também vão sozinhos: o timeout do lote sai só dos demais.
+    """
+
+    def __init__(self, max_items: int, max_tokens: int, window_s: float, min_budget_s: float = 0.0):
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.window_s = window_s
+        self.min_budget_s = min_budget_s
+        self._groups: Dict[Tuple[str, float], List[_PendingReply]] = {}
+        self._tokens: Dict[Tuple[str, float], int] = {}
+        self._running: set = set()
+
+    async def submit(
+        self, client, request: dict, category: str, snippet: str, signals: List[str], lang: str,
+        budget: LatencyBudget | None,
+    ) -> Tuple[str | None, Tuple[int, int], int]:
+        loop = asyncio.get_running_loop()
+        item = {"category": category, "signals": list(signals), "snippet": snippet[:900]}
+        pending = _PendingReply(client, request, item, budget, loop.create_future())
+        key = (lang, request["temperature"])
+        if key in self._groups and self._tokens[key] + pending.tokens > self.max_tokens:
+            self._flush(key, self._groups[key])
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = []
+            self._tokens[key] = 0
+            # contexto vazio: o lote não herda o registro de etapas/tokens de quem abriu
+            loop.call_later(self.window_s, self._flush, key, group, context=contextvars.Context())
+        group.append(pending)
+        self._tokens[key] += pending.tokens
+        if len(group) >= self.max_items:
+            self._flush(key, group)
+        return await pending.future
+
+    def _flush(self, key: Tuple[str, float], group: List[_PendingReply]) -> None:
+        if self._groups.get(key) is not group:
+            return  # já saiu (cheio ou por tokens) antes de a janela fechar
+        del self._groups[key], self._tokens[key]
+        task = contextvars.Context().run(asyncio.get_running_loop().create_task, self._run(group))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, group: List[_PendingReply]) -> None:
+        # pedido quase sem orçamento não encurta o timeout do lote: segue pelo caminho individual
+        solo = [p for p in group if p.budget is not None and p.budget.remaining() < self.min_budget_s]
+        if solo and len(solo) < len(group):
+            batch = [p for p in group if p not in solo]
+            await asyncio.gather(*(self._run_group([p]) for p in solo), self._run_group(batch))
+        else:
+            await self._run_group(group)
+
+    async def _run_group(self, group: List[_PendingReply]) -> None:
+        REPLY_BATCH_SIZE.observe(len(group))
+        try:
+            if len(group) == 1:
+                text, usage = await _ai_reply_with(group[0].client, group[0].request, group[0].budget)
+                results = [(text, usage, 1)]
+            else:
+                results = await self._call_batch(group)
+        except Exception:
+            results = [(None, (0, 0), len(group))] * len(group)
+        for pending, result in zip(group, results):
+            if not pending.future.done():  # quem pediu pode ter desistido (cancelado)
+                pending.future.set_result(result)
+
+    async def _call_batch(self, group: List[_PendingReply]) -> List[Tuple[str | None, Tuple[int, int], int]]:
+        first, size = group[0].request, len(group)
+        ids = [str(i) for i in range(size)]
+        request = {
+            **first,
+            "messages": [
+                {"role": "system", "content": f"{first['messages'][0]['content']}\n\n{BATCH_INSTRUCTIONS}"},
+                {"role": "user", "content": json.dumps(
+                    [{"id": i, **p.item} for i, p in zip(ids, group)], ensure_ascii=False,
+                )},
+            ],
+            "max_tokens": MAX_TOKENS * size,
+            "response_format": {"type": "json_object"},
+        }
+        # orçamento do lote: o do pedido mais apertado (todos acima de `min_budget_s`, ver `_run`)
+        remaining = min(p.budget.remaining() if p.budget is not None else float("inf") for p in group)
+        budget = LatencyBudget(None if remaining == float("inf") else remaining)
+        text, (prompt, completion) = await _ai_reply_with(group[0].client, request, budget)
+
+        replies = parse_batch_replies(text, ids) if text else {}
+        prompts = _split(prompt, [p.tokens for p in group])
+        completions = _split(completion, [len(replies.get(i, "")) + 1 for i in ids])
+        results = []
+        for i, pending, p_tokens, c_tokens in zip(ids, group, prompts, completions):
+            reply = replies.get(i)
+            if pending.budget is not None:
+                for reason in budget.fallbacks:
+                    if reason not in pending.budget.fallbacks:
+                        pending.budget.fallbacks.append(reason)
+                if text and reply is None:
+                    pending.budget.note("openai", "parse_error")
+            if text and reply is None:
+                FALLBACKS.inc(reason="openai:parse_error")
+            results.append((reply, (p_tokens, c_tokens), size))
+        return results
+
+BATCHER = ReplyBatcher(REPLY_BATCH_MAX, REPLY_BATCH_MAX_TOKENS, REPLY_BATCH_WINDOW_MS / 1000, REPLY_BATCH_MIN_BUDGET_S)
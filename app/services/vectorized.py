@@ -0,0 +1,217 @@
+# app/services/vectorized.py
+"""
+Caminho vetorizado (NumPy) do motor de regras para lotes: o matcher entrega a
+matriz esparsa de acertos (e-mails x termos) e o score ponderado, os limiares,
+a confiança e as condições dos overrides viram operações sobre o lote inteiro.
+Por e-mail sobra só a lista de IDs de sinais (`_override_ids`).
+
+O resultado é idêntico ao de `classify_prepared`: os pesos são somados coluna a
+coluna na ordem do vocabulário (a mesma ordem do laço escalar, sem soma por
+pares nem BLAS) e o arredondamento final usa o `round` do Python.
+
+Importado sob demanda por `classifier` (numpy fica fora do import da app).
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.services.classifier import (
+    ACTION_OVER_LOW_CONF, FOLLOWUP_DETECTED, GRATITUDE_NO_ACTION, GREETING_ONLY, ISSUE_DETECTED,
+    MARKETING_NEWSLETTER, NEUTRAL_SHORT, RESOLVED_OR_CANCELLED, SHORT_QUESTION_HINT, SIG_NF, SIGNALS,
+    URGENCY_BOOST, _SHORT_STATUS_QUESTIONS, ModelResult, PreparedEmail, RuleResult, RuleSet,
+    _normalize_ids, _override_ids, classify_prepared,
+)
+
+CATEGORIES = ("Produtivo", "Improdutivo")
+
+# linhas por bloco: limita a matriz densa (linhas x termos, 1 byte por célula)
+CHUNK_ROWS = 4096
+
+class _Layout:
+    """Colunas da matriz para um `RuleSet`: intervalos por categoria, pesos e IDs de sinais."""
+
+    def __init__(self, rules: RuleSet):
+        cols, _ = rules.matcher.columns()
+        self.ranges: Dict[str, Tuple[int, int]] = {}
+        start = 0
+        for category, entries in rules.matcher.entries.items():
+            self.ranges[category] = (start, start + len(entries))
+            start += len(entries)
+        self.width = len(cols)
+        pos = [(j, key) for j, (category, key) in enumerate(cols) if category == "pos"]
+        neg = [(j, key) for j, (category, key) in enumerate(cols) if category == "neg"]
+        self.pos = [(j, rules.pos_weights[key]) for j, key in pos]
+        self.neg = [(j, rules.neg_weights[key]) for j, key in neg]
+        # sinais = acertos de pos e depois de neg, cada um na ordem do vocabulário
+        self.signal_cols = np.array([j for j, _ in pos + neg], dtype=np.intp)
+        self.signal_ids = np.array([SIGNALS.id(key) for _, key in pos + neg], dtype=np.intp)
+
+_layouts: Dict[str, _Layout] = {}
+
+def _layout(rules: RuleSet) -> _Layout:
+    layout = _layouts.get(rules.version)
+    if layout is None:
+        if len(_layouts) >= 4:
+            _layouts.clear()  # versões antigas (recarga de regras)
+        layout = _layouts[rules.version] = _Layout(rules)
+    return layout
+
+def classify_batch(
+    emails: Sequence[PreparedEmail], model_results: Sequence[ModelResult], engine: str = "hf"
+) -> List[RuleResult]:
+    """
+    Mesmo resultado de `[classify_prepared(e, r, engine) ...]`. E-mails preparados
+    com versões diferentes das regras (recarga no meio do lote) são pontuados em
+    grupos separados, cada um com o seu layout; a ordem de saída é a de entrada.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, email in enumerate(emails):
+        groups.setdefault(email.rules.version, []).append(i)
+    if len(groups) == 1:
+        return _classify_group(emails, model_results, engine)
+    out: List[RuleResult] = [None] * len(emails)  # type: ignore[list-item]
+    for rows in groups.values():
+        scored = _classify_group([emails[i] for i in rows], [model_results[i] for i in rows], engine)
+        for i, result in zip(rows, scored):
+            out[i] = result
+    return out
+
+def _classify_group(
+    emails: Sequence[PreparedEmail], model_results: Sequence[ModelResult], engine: str
+) -> List[RuleResult]:
+    out: List[RuleResult] = []
+    for start in range(0, len(emails), CHUNK_ROWS):
+        stop = start + CHUNK_ROWS
+        out.extend(_classify_chunk(emails[start:stop], model_results[start:stop], engine))
+    return out
+
+def _classify_chunk(
+    emails: Sequence[PreparedEmail], model_results: Sequence[ModelResult], engine: str
+) -> List[RuleResult]:
+    rules = emails[0].rules  # um grupo de `classify_batch`: todos com a mesma versão
+    layout = _layout(rules)
+    n = len(emails)
+
+    hits = np.zeros((n, layout.width), dtype=bool)
+    rows, cols = rules.matcher.hit_coords([e.hits for e in emails])
+    hits[np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)] = True
+
+    def matches(category: str) -> np.ndarray:
+        start, stop = layout.ranges[category]
+        return hits[:, start:stop].any(axis=1)
+
+    # --- rule_classifier ---
+    score = np.zeros(n)
+    for j, weight in layout.pos:
+        np.add(score, weight, out=score, where=hits[:, j])
+    for j, weight in layout.neg:
+        np.subtract(score, weight, out=score, where=hits[:, j])
+    has_action_hint = matches("action_hints")
+    score = (score + np.where(has_action_hint, 0.6, 0.0)) - np.where(matches("functioning"), 0.8, 0.0)
+    gratitude_hint = matches("gratitude_hints") & ~has_action_hint
+    productive = ~(score < -0.6) & ~gratitude_hint
+    raw_conf = np.where(gratitude_hint, 0.80, 0.55 + np.minimum(np.abs(score) / 6.0, 0.35)).tolist()
+
+    # resultado do modelo (quando houver) no lugar das regras; rótulo fora das
+    # duas categorias fica com o caminho escalar
+    engines: List[str] = []
+    scalar: List[int] = []
+    confidence = np.empty(n)
+    for i, result in enumerate(model_results):
+        if result:
+            label, conf = result
+            if label not in CATEGORIES:
+                scalar.append(i)
+            productive[i] = label == "Produtivo"
+            confidence[i] = float(conf or 0.0)
+            engines.append(engine)
+        else:
+            confidence[i] = round(raw_conf[i], 2)
+            engines.append("rules")
+
+    # --- overrides (mesma ordem de `_overrides`) ---
+    norms = [e.norm for e in emails]
+    norm_len = np.array([len(t) for t in norms])
+    token_count = np.array([e.token_count for e in emails])
+    has_question = np.array(["?" in t for t in norms])
+    flags = np.zeros(n, dtype=np.int64)
+
+    def fire(mask: np.ndarray, bit: int) -> None:
+        flags[mask] |= bit
+
+    def floor(mask: np.ndarray, value: float) -> None:
+        confidence[mask] = np.maximum(confidence[mask], value)
+
+    has_issue = matches("issue")
+    has_followup = matches("followup")
+    has_action = has_issue | matches("request") | (matches("info") & has_question) | has_followup
+    fire(has_issue, ISSUE_DETECTED)
+    fire(has_followup, FOLLOWUP_DETECTED)
+
+    # (1) gratidão sem pedido
+    has_gratitude = matches("gratitude")
+    m = has_gratitude & ~has_action
+    productive[m] = False; floor(m, 0.80); fire(m, GRATITUDE_NO_ACTION)
+
+    # (1.1) saudação/well-wishes curto
+    m = ((matches("greeting") | matches("well_wishes")) & ~has_action & ~has_question & ~has_issue
+         & (token_count <= 6) & (norm_len <= 40))
+    productive[m] = False; floor(m, 0.80); fire(m, GREETING_ONLY)
+
+    productive[has_followup] = True; floor(has_followup, 0.80)
+
+    # (2) marketing sem pedido
+    has_marketing = matches("marketing")
+    m = has_marketing & ~has_action
+    floor(m & productive, 0.75); productive[m] = False; fire(m, MARKETING_NEWSLETTER)
+
+    # (3) resolvido/cancelado
+    has_resolved = matches("resolved")
+    productive[has_resolved] = False; floor(has_resolved, 0.85); fire(has_resolved, RESOLVED_OR_CANCELLED)
+
+    # (4) ação com Improdutivo de baixa confiança
+    m = has_action & ~productive & (confidence <= 0.80)
+    productive[m] = True; floor(m, 0.75); fire(m, ACTION_OVER_LOW_CONF)
+
+    # (5) urgência
+    m = matches("urgency") & productive
+    floor(m, 0.78); fire(m, URGENCY_BOOST)
+
+    # (6) pergunta curta sobre status/prazo
+    has_status_term = matches("status")
+    looks_like_question = (
+        has_question
+        | np.array([t.strip() in _SHORT_STATUS_QUESTIONS for t in norms])
+        | has_status_term
+        | matches("status_please")
+        | matches("question")
+    )
+    m = ((norm_len <= 40) | (token_count <= 6)) & has_status_term & looks_like_question
+    productive[m] = True; floor(m, 0.70); fire(m, SHORT_QUESTION_HINT)
+
+    # (7) muito curta & neutra
+    m = ((token_count <= 2) & (norm_len <= 12)
+         & ~(has_action | has_status_term | has_gratitude | has_marketing | has_resolved))
+    productive[m] = False; floor(m, 0.65); fire(m, NEUTRAL_SHORT)
+
+    # --- sinais (por e-mail: só listas de IDs) ---
+    signal_rows, signal_pos = np.nonzero(hits[:, layout.signal_cols])
+    signal_ids = layout.signal_ids[signal_pos].tolist()
+    bounds = np.searchsorted(signal_rows, np.arange(n + 1)).tolist()
+    nf_ok = matches("nf").tolist()
+
+    out: List[RuleResult] = []
+    for i, (prod, conf, flag) in enumerate(zip(productive.tolist(), confidence.tolist(), flags.tolist())):
+        ids: List[int] = []
+        for sid in signal_ids[bounds[i]:bounds[i + 1]]:
+            if sid not in ids:
+                ids.append(sid)
+                if len(ids) == 8:
+                    break
+        if SIG_NF in ids and not nf_ok[i]:
+            ids.remove(SIG_NF)
+        ids = _normalize_ids(_override_ids(ids, flag, norms[i]), drop_after_thanks=True)
+        out.append(RuleResult(CATEGORIES[0] if prod else CATEGORIES[1], round(conf, 2), tuple(ids), flag, engines[i]))
+    for i in scalar:
+        out[i] = classify_prepared(emails[i], model_results[i], engine)
+    return out
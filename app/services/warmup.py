@@ -0,0 +1,96 @@
+# app/services/warmup.py
+"""
+Aquecimento em segundo plano depois do startup.
+
+O import da app não carrega nada pesado: `openai`, pdfminer, perfis de idioma e
+modelo local ficam para o primeiro uso. O `lifespan` dispara `warm_up()` numa
+task e o worker já aceita conexões (`/healthz` responde); `/readyz` só vira 200
+quando todas as etapas terminaram, para o balanceador/autoscaler não mandar
+tráfego para um worker frio.
+
+Uma etapa que falha (ex.: pacote `openai` ausente) não impede a prontidão: o
+pipeline tem fallback para ela, e o erro aparece em `/readyz`.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core.concurrency import run_cpu, warm_process_pool
+from app.core.settings import WARMUP_TIMEOUT_S
+import logging
+logger = logging.getLogger(__name__)
+
+# um e-mail por idioma: passa por normalização (tabelas do unidecode), matcher e n-gramas
+WARMUP_SAMPLES = [
+    "Olá, bom dia! Poderiam verificar o status do chamado? Não recebi retorno.",
+    "Hello, the system is not working since yesterday, please check ASAP.",
+    "Hola, ¿podrían verificar el estado del pedido? Muchas gracias.",
+]
+
+class Readiness:
+    """Estado do aquecimento: etapas concluídas (ms), erros e se o worker está pronto."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.started = time.monotonic()
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_s": round(time.monotonic() - self.started, 3),
+            "steps_ms": dict(self.steps),
+            "errors": dict(self.errors),
+        }
+
+READINESS = Readiness()
+
+def _warm_language() -> None:
+    from app.services.classifier import detect_language, ngram_model
+    ngram_model()
+    for text in WARMUP_SAMPLES:
+        detect_language(text)
+
+def _warm_rules() -> None:
+    from app.services.classifier import classify_email, prepare_content
+    for text in WARMUP_SAMPLES:
+        classify_email(prepare_content(text), use_hf=False)
+
+def _warm_backend() -> None:
+    from app.services.classifier import get_backend
+    backend = get_backend()
+    logger.info("classifier_backend", extra={"backend": backend.name, "model": backend.model_id})
+
+def _warm_openai(clients) -> None:
+    if clients is not None:
+        clients.openai  # importa `openai` e cria o AsyncOpenAI com pool
+
+async def _warm_pdf_pool() -> None:
+    from app.services.ingest import warm_pdf_worker
+    await warm_process_pool(warm_pdf_worker, timeout=WARMUP_TIMEOUT_S)
+
+async def _step(state: Readiness, name: str, fn: Callable[[], Awaitable[None]]) -> None:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(fn(), WARMUP_TIMEOUT_S)
+    except Exception as e:  # etapa opcional: o pipeline cai no caminho lento/fallback
+        state.errors[name] = f"{type(e).__name__}: {e}"
+        logger.warning("warmup_step_failed", extra={"step": name, "error": state.errors[name]})
+    except asyncio.CancelledError:
+        state.errors[name] = "cancelado"
+        raise
+    state.steps[name] = round((time.perf_counter() - start) * 1000, 1)
+
+async def warm_up(clients=None, state: Readiness = READINESS) -> Readiness:
+    """Roda as etapas em paralelo (threads do pool de CPU + pool de processos) e marca pronto."""
+    await asyncio.gather(
+        _step(state, "backend", lambda: run_cpu(_warm_backend)),
+        _step(state, "language", lambda: run_cpu(_warm_language)),
+        _step(state, "rules", lambda: run_cpu(_warm_rules)),
+        _step(state, "openai", lambda: run_cpu(_warm_openai, clients)),
+        _step(state, "pdf_pool", _warm_pdf_pool),
+    )
+    state.ready = True
+    logger.info("warmup_done", extra={"steps_ms": state.steps, "errors": state.errors})
+    return state
@@ -0,0 +1,5 @@
+# benchmarks/__init__.py
+"""
+Benchmarks reproduzíveis do pipeline de classificação (ver README, seção
+"Benchmarks"). Rodar da raiz do projeto: `python -m benchmarks.run`.
+"""
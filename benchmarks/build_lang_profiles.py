@@ -0,0 +1,42 @@
+# benchmarks/build_lang_profiles.py
+"""
+Gera `app/services/lang_profiles.json` (perfis de n-gramas de caracteres PT/EN/ES
+usados por `detect_language`) a partir dos perfis do pacote langdetect
+(Apache-2.0, estatísticas da Wikipedia). Só precisa rodar de novo para trocar a
+fonte ou o corte; a aplicação lê apenas o JSON gerado.
+
+    pip install langdetect
+    python benchmarks/build_lang_profiles.py
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+LANGS = ("pt", "en", "es")
+MIN_FREQ = 20  # descarta n-gramas raros (ruído e nomes próprios)
+OUT = Path(__file__).resolve().parents[1] / "app" / "services" / "lang_profiles.json"
+
+def main() -> int:
+    try:
+        import langdetect
+    except ImportError:
+        print("instale langdetect para regenerar os perfis: pip install langdetect", file=sys.stderr)
+        return 1
+    src = Path(os.path.dirname(langdetect.__file__)) / "profiles"
+    profiles = {}
+    for lang in LANGS:
+        data = json.loads((src / lang).read_text(encoding="utf-8"))
+        freq: dict = {}
+        for gram, count in data["freq"].items():
+            gram = gram.lower()  # o detector trabalha em minúsculas
+            if gram.strip() and count >= MIN_FREQ:
+                freq[gram] = freq.get(gram, 0) + count
+        profiles[lang] = {"n_words": data["n_words"], "freq": dict(sorted(freq.items()))}
+    payload = {"source": "langdetect profiles (Apache-2.0)", "langs": list(LANGS), "profiles": profiles}
+    OUT.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    print(f"{OUT}: {sum(len(p['freq']) for p in profiles.values())} n-gramas, {OUT.stat().st_size // 1024} KB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
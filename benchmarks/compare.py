@@ -0,0 +1,61 @@
+# benchmarks/compare.py
+"""
+Compara dois resultados de `benchmarks.run` (antes x depois):
+
+    python -m benchmarks.compare antes.json depois.json
+    python -m benchmarks.compare antes.json depois.json --fail-over 10   # sai com 1 se algo piorar >10%
+
+Métricas de tempo (µs, ms) são "menor é melhor"; vazão (rps) é "maior é melhor".
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+def flatten(result: dict) -> Dict[str, Tuple[float, bool]]:
+    """{nome: (valor, maior_é_melhor)} das métricas comparáveis."""
+    out: Dict[str, Tuple[float, bool]] = {}
+    for name, r in (result.get("micro") or {}).items():
+        out[f"micro {name} µs"] = (r["us_per_call"], False)
+    load = result.get("load") or {}
+    if load:
+        out["load rps"] = (load["rps"], True)
+        for q, ms in load["latency_ms"].items():
+            out[f"load latency {q} ms"] = (ms, False)
+        for stage, ms in (load.get("stage_mean_ms") or {}).items():
+            out[f"load stage {stage} ms"] = (ms, False)
+    return out
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Diferença entre dois resultados de benchmark.")
+    ap.add_argument("before", type=Path)
+    ap.add_argument("after", type=Path)
+    ap.add_argument("--fail-over", type=float, default=None, help="pior que N%% em qualquer métrica -> código 1")
+    args = ap.parse_args()
+
+    before = json.loads(args.before.read_text(encoding="utf-8"))
+    after = json.loads(args.after.read_text(encoding="utf-8"))
+    print(f"antes:  {before['env'].get('commit')} {before['env'].get('subject', '')}")
+    print(f"depois: {after['env'].get('commit')} {after['env'].get('subject', '')}")
+
+    a, b = flatten(before), flatten(after)
+    worst = 0.0
+    for name in sorted(a.keys() & b.keys()):
+        (old, higher_better), (new, _) = a[name], b[name]
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        regression = -change if higher_better else change
+        worst = max(worst, regression)
+        mark = "  pior" if regression > 5 else ("  melhor" if regression < -5 else "")
+        print(f"{name:<44} {old:>14.3f} -> {new:>14.3f}  {change:+7.1f}%{mark}")
+    for name in sorted(a.keys() ^ b.keys()):
+        print(f"{name:<44} (só em {'antes' if name in a else 'depois'})")
+    if args.fail_over is not None and worst > args.fail_over:
+        print(f"regressão de {worst:.1f}% (limite {args.fail_over:g}%)")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# benchmarks/corpus.py
+"""
+Corpus sintético PT/EN/ES, determinístico pela semente:
+
+- greeting: saudações/agradecimentos curtos ("Bom dia!", "Thanks a lot")
+- status:   perguntas de status/prazo/erro de uma a três frases
+- thread:   threads longas com histórico citado ("> ...", "Em ... escreveu:")
+- pdf:      PDF pesquisável de ~2 MB (limite padrão de upload)
+
+    python -m benchmarks.corpus -o corpus.jsonl --per-kind 200
+    python -m benchmarks.corpus --pdf anexo.pdf --pdf-mb 2
+"""
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator, List
+
+LANGS = ("pt", "en", "es")
+TEXT_KINDS = ("greeting", "status", "thread")
+
+GREETINGS = {
+    "pt": ["Bom dia!", "Boa tarde, tudo bem?", "Olá equipe", "Muito obrigado!", "Obrigada pelo retorno.",
+           "Feliz natal a todos!", "Parabéns pelo lançamento!", "Oi, tudo certo por aqui."],
+    "en": ["Good morning!", "Hi team", "Thanks a lot!", "Thank you for the quick reply.",
+           "Happy new year!", "Congrats on the launch!", "Hello, all good here."],
+    "es": ["¡Buenos días!", "Hola equipo", "¡Muchas gracias!", "Gracias por la respuesta.",
+           "¡Feliz navidad!", "Felicidades por el lanzamiento.", "Hola, todo bien por aquí."],
+}
+REQUESTS = {
+    "pt": ["Qual o status do chamado {n}?", "Poderiam verificar o erro no sistema de faturamento?",
+           "Segue em anexo a nota fiscal {n}.", "Qual o prazo para a atualização do contrato {n}?",
+           "O boleto {n} ainda não foi processado.", "Ainda sem retorno sobre o protocolo {n}, é urgente.",
+           "Podem emitir a segunda via da fatura de {month}?", "O acesso ao portal está com erro desde ontem."],
+    "en": ["What is the status of ticket {n}?", "Could you check the error in the billing system?",
+           "Please find attached invoice {n}.", "What is the deadline for the contract {n} update?",
+           "Payment {n} has not been processed yet.", "Still no reply about case {n}, this is urgent.",
+           "Can you issue a copy of the {month} invoice?", "The portal has been failing since yesterday."],
+    "es": ["¿Cuál es el estado del ticket {n}?", "¿Podrían verificar el error en el sistema de facturación?",
+           "Adjunto la factura {n}.", "¿Cuál es el plazo para actualizar el contrato {n}?",
+           "El pago {n} todavía no se ha procesado.", "Sigo sin respuesta sobre el caso {n}, es urgente.",
+           "¿Pueden emitir una copia de la factura de {month}?", "El portal falla desde ayer."],
+}
+CLOSINGS = {"pt": "Atenciosamente,\n{name}", "en": "Kind regards,\n{name}", "es": "Saludos,\n{name}"}
+REPLY_HEADERS = {
+    "pt": "Em {day} de {month} de 2024, {name} <{mail}> escreveu:",
+    "en": "On {month} {day}, 2024, {name} <{mail}> wrote:",
+    "es": "El {day} de {month} de 2024, {name} <{mail}> escribió:",
+}
+MONTHS = ["janeiro", "march", "abril", "june", "agosto", "octubre"]
+NAMES = ["Ana Souza", "John Smith", "María García", "Carlos Lima", "Emily Brown", "Lucía Torres"]
+
+def _fill(rng: random.Random, template: str) -> str:
+    name = rng.choice(NAMES)
+    return template.format(
+        n=rng.randint(1000, 99999), month=rng.choice(MONTHS), day=rng.randint(1, 28),
+        name=name, mail=name.split()[0].lower() + "@example.com",
+    )
+
+def greeting(rng: random.Random, lang: str) -> str:
+    return rng.choice(GREETINGS[lang])
+
+def status(rng: random.Random, lang: str) -> str:
+    parts = [rng.choice(GREETINGS[lang])] if rng.random() < 0.5 else []
+    parts += [_fill(rng, rng.choice(REQUESTS[lang])) for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.5:
+        parts.append(_fill(rng, CLOSINGS[lang]))
+    return "\n".join(parts)
+
+def thread(rng: random.Random, lang: str, replies: int | None = None) -> str:
+    """Mensagem nova + histórico citado (cada resposta anterior com mais um nível de '>')."""
+    replies = rng.randint(5, 40) if replies is None else replies
+    out = [status(rng, lang)]
+    for depth in range(1, replies + 1):
+        out.append("")
+        out.append(">" * (depth - 1) + (" " if depth > 1 else "") + _fill(rng, REPLY_HEADERS[lang]))
+        for line in status(rng, rng.choice(LANGS)).splitlines():
+            out.append(">" * depth + " " + line)
+    return "\n".join(out)
+
+def generate(seed: int = 0, per_kind: int = 100) -> List[Dict[str, str]]:
+    """`per_kind` e-mails de cada tipo de texto, idiomas alternados."""
+    rng = random.Random(seed)
+    makers = {"greeting": greeting, "status": status, "thread": thread}
+    items = []
+    for kind in TEXT_KINDS:
+        for i in range(per_kind):
+            lang = LANGS[i % len(LANGS)]
+            items.append({"id": f"{kind}-{i}", "kind": kind, "lang": lang, "text": makers[kind](rng, lang)})
+    return items
+
+def _pdf_pages(rng: random.Random, target_bytes: int, lines_per_page: int) -> Iterator[bytes]:
+    size = 0
+    while size < target_bytes:
+        lines = []
+        while len(lines) < lines_per_page:
+            lines.extend(status(rng, rng.choice(LANGS)).splitlines())
+        # Helvetica padrão só cobre latin-1: acentos viram '?' no PDF, o que basta aqui
+        text = [ln.encode("latin-1", "replace").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+                for ln in lines[:lines_per_page]]
+        content = b"BT /F1 10 Tf 40 800 Td 12 TL " + b" ".join(b"(" + ln + b") '" for ln in text) + b" ET"
+        size += len(content) + 200
+        yield content
+
+def _build_pdf(contents: List[bytes]) -> bytes:
+    n = len(contents)
+    # objetos: 1 fonte, 2..n+1 conteúdos, n+2..2n+1 páginas, 2n+2 Pages, 2n+3 Catalog
+    pages_id, catalog_id = 2 * n + 2, 2 * n + 3
+    objs = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    objs += [b"<< /Length %d >>\nstream\n%s\nendstream" % (len(c), c) for c in contents]
+    objs += [
+        b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+        b"/Resources << /Font << /F1 1 0 R >> >> >>" % (pages_id, 2 + i)
+        for i in range(n)
+    ]
+    kids = b" ".join(b"%d 0 R" % (n + 2 + i) for i in range(n))
+    objs.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, n))
+    objs.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, catalog_id, xref)
+    return bytes(out)
+
+def make_pdf(seed: int = 0, target_mb: float = 2.0, lines_per_page: int = 60) -> bytes:
+    """PDF mínimo (sem compressão) com texto de e-mails, com até `target_mb` MB."""
+    rng = random.Random(seed)
+    target = int(target_mb * 1024 * 1024)
+    contents = list(_pdf_pages(rng, target, lines_per_page))
+    pdf = _build_pdf(contents)
+    while len(pdf) > target and len(contents) > 1:
+        # estimativa de overhead por página é aproximada: tira páginas até caber
+        excess = len(pdf) - target
+        del contents[-max(1, excess // (len(contents[-1]) + 200)):]
+        pdf = _build_pdf(contents)
+    return pdf
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Gera o corpus sintético dos benchmarks.")
+    ap.add_argument("-o", "--output", help="JSONL de saída (padrão: stdout)")
+    ap.add_argument("--per-kind", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--pdf", help="grava também um PDF de ~--pdf-mb MB neste caminho")
+    ap.add_argument("--pdf-mb", type=float, default=2.0)
+    args = ap.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for item in generate(args.seed, args.per_kind):
+            out.write(json.dumps(item, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.pdf:
+        with open(args.pdf, "wb") as fp:
+            fp.write(make_pdf(args.seed, args.pdf_mb))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# benchmarks/golden.py
+"""
+Corpus "golden" e runner diferencial do motor de regras.
+
+A referência é `benchmarks.reference_classifier` (cópia congelada do motor
+original). O pipeline atual roda com `classify_email(texto, use_hf=False)`.
+
+    python -m benchmarks.golden check            # pipeline atual x benchmarks/data/golden.jsonl
+    python -m benchmarks.golden diff -n 50000    # atual x referência lado a lado, entradas geradas
+    python -m benchmarks.golden build            # regenera o golden.jsonl a partir da referência
+
+Compara categoria, confiança, sinais e meta (`used_hf`, `overrides`); sai com
+código 1 se houver qualquer divergência. O `diff` também mede a vazão das duas
+versões sobre as mesmas entradas.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from benchmarks import reference_classifier as reference
+from benchmarks.corpus import LANGS, greeting, status, thread
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "data" / "golden.jsonl"
+FIELDS = ("category", "confidence", "signals", "meta")
+
+# casos escritos à mão: ordem dos overrides, quirks e bordas de normalização
+EDGE_CASES = [
+    "", " ", "?", "\n\n", "1234", "ok", "x", "oi", "ola", "olá", "hola", "hello", "thanks", "gracias",
+    "Obrigado!", "Muito obrigado!", "muito  obrigado", "Obrigado, muito obrigado, agradeço.",
+    "Obrigado! Segue o anexo e o boleto.", "obrigado anexo arquivo status prazo",
+    "e o status?", "E o status do chamado?", "status por favor", "Status por favor", "qual o prazo", "e o prazo?",
+    "E quanto ao prazo", "sobre o chamado", "eta?", "ETA", "eo", "e quanto",
+    "Bom dia", "Bom dia!", "bom dia, tudo bem?", "Boa tarde, espero que estejam bem.", "tenha um bom dia",
+    "Feliz natal e feliz ano novo!", "Parabéns pela promoção!", "Newsletter de lançamento", "Promoção imperdível, confira!",
+    "Problema resolvido, obrigado.", "Pode cancelar, já foi resolvido.", "cancelado", "Já está funcionando, obrigado!",
+    "Não está funcionando", "não está funcionando desde ontem", "sistema com erro", "erro 500 no portal",
+    "urgente!!", "URGENTE: sistema fora do ar", "ASAP please", "follow-up", "Follow up sobre o chamado",
+    "não responderam", "sem retorno", "último e-mail sem resposta", "ainda aguardo retorno",
+    "NF-e", "nf.", "nf", "nota   fiscal", "Segue NF 123", "nfe em anexo",
+    "<b>html</b> com erro", "<p>Obrigado</p>", "Atenciosamente,\nJoão", "Kind regards,\nJohn\nerro no sistema",
+    "Texto\n--\nassinatura com erro urgente", "-- \nassinatura", "Café ☕", "straße", "ÆON",
+    "Hello, the system is not working since yesterday, please check ASAP.",
+    "Could you send the invoice? Thanks!", "¿Podrían verificar el estado del pedido?", "Muchas gracias por todo",
+    "Poderiam verificar o status do chamado 123? Não recebi retorno.",
+    "Muito obrigado pela ajuda, tudo funcionando perfeitamente.",
+]
+
+def vocabulary() -> List[str]:
+    """Termos de todos os vocabulários da referência (chaves de peso e padrões literais)."""
+    words: List[str] = []
+    for name in dir(reference):
+        value = getattr(reference, name)
+        if isinstance(value, dict) and name.endswith("SIGNALS"):
+            words += list(value)
+        if isinstance(value, list) and name.endswith("_RX"):
+            for rx in value:
+                words.append(
+                    rx.pattern.replace("\\b", "").replace("\\\\", "").replace("\\s+", " ").replace("\\s", " ")
+                )
+    return words
+
+def generate(seed: int = 0) -> Iterator[str]:
+    """Entradas infinitas e determinísticas: colagens de termos, casos de borda e e-mails do corpus."""
+    rng = random.Random(seed)
+    words = vocabulary() + EDGE_CASES
+    separators = [" ", " ", ", ", ". ", "\n", "? ", "  ", "! "]
+    while True:
+        roll = rng.random()
+        if roll < 0.75:
+            n = rng.choice([1, 1, 2, 2, 3, 4, 6, 10, 25, 60])
+            text = rng.choice(separators).join(rng.choice(words) for _ in range(n))
+            yield text.upper() if rng.random() < 0.05 else text
+        elif roll < 0.85:
+            yield greeting(rng, rng.choice(LANGS))
+        elif roll < 0.97:
+            yield status(rng, rng.choice(LANGS))
+        else:
+            yield thread(rng, rng.choice(LANGS), replies=rng.randint(1, 8))
+
+def _as_record(result: tuple) -> Dict[str, object]:
+    category, confidence, signals, info = result
+    return {
+        "category": category,
+        "confidence": confidence,
+        "signals": list(signals),
+        "meta": {"used_hf": info.get("used_hf", False), "overrides": info.get("overrides")},
+    }
+
+def current_classifier() -> Callable[[str], Dict[str, object]]:
+    from app.services.classifier import classify_email
+    return lambda text: _as_record(classify_email(text, use_hf=False))
+
+def reference_classifier(text: str) -> Dict[str, object]:
+    return _as_record(reference.classify_email(text))
+
+def divergences(expected: Dict[str, object], got: Dict[str, object]) -> List[str]:
+    return [f for f in FIELDS if json.dumps(expected[f], sort_keys=True) != json.dumps(got[f], sort_keys=True)]
+
+class Report:
+    def __init__(self, max_examples: int = 10) -> None:
+        self.total = 0
+        self.by_field: Dict[str, int] = {f: 0 for f in FIELDS}
+        self.diverged = 0
+        self.examples: List[Tuple[str, Dict[str, object], Dict[str, object]]] = []
+        self.max_examples = max_examples
+
+    def add(self, text: str, expected: Dict[str, object], got: Dict[str, object]) -> None:
+        self.total += 1
+        fields = divergences(expected, got)
+        if not fields:
+            return
+        self.diverged += 1
+        for f in fields:
+            self.by_field[f] += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append((text, expected, got))
+
+    def print(self) -> None:
+        print(f"{self.total} entradas, {self.diverged} divergentes {self.by_field}")
+        for text, expected, got in self.examples:
+            print(f"- {text[:160]!r}")
+            for f in divergences(expected, got):
+                print(f"    {f}: esperado {expected[f]!r}")
+                print(f"    {' ' * len(f)}  obtido   {got[f]!r}")
+
+def _throughput(fn: Callable[[str], object], texts: List[str]) -> float:
+    start = time.perf_counter()
+    for t in texts:
+        fn(t)
+    return len(texts) / (time.perf_counter() - start)
+
+def cmd_build(args) -> int:
+    gen = generate(args.seed)
+    texts = list(dict.fromkeys(EDGE_CASES + [next(gen) for _ in range(args.n)]))
+    GOLDEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as fp:
+        for text in texts:
+            case = {"text": text, "expected": reference_classifier(text)}
+            fp.write(json.dumps(case, ensure_ascii=False, separators=(",", ":")) + "\n")
+    print(f"{GOLDEN_PATH}: {len(texts)} casos")
+    return 0
+
+def cmd_check(args) -> int:
+    classify = current_classifier()
+    report = Report(args.examples)
+    with open(args.golden, encoding="utf-8") as fp:
+        for line in fp:
+            case = json.loads(line)
+            report.add(case["text"], case["expected"], classify(case["text"]))
+    report.print()
+    return 1 if report.diverged else 0
+
+def cmd_diff(args) -> int:
+    classify = current_classifier()
+    gen = generate(args.seed)
+    texts = [next(gen) for _ in range(args.n)]
+    report = Report(args.examples)
+    for text in texts:
+        report.add(text, reference_classifier(text), classify(text))
+    report.print()
+    ref_rate = _throughput(reference_classifier, texts)
+    cur_rate = _throughput(classify, texts)
+    print(f"vazão: referência {ref_rate:,.0f} e-mails/s | atual {cur_rate:,.0f} e-mails/s ({cur_rate / ref_rate:.2f}x)")
+    return 1 if report.diverged else 0
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Corpus golden e runner diferencial do motor de regras.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="regenera o golden.jsonl a partir da referência congelada")
+    b.add_argument("-n", type=int, default=1500, help="entradas geradas (além dos casos de borda)")
+    b.add_argument("--seed", type=int, default=0)
+    c = sub.add_parser("check", help="pipeline atual x golden.jsonl")
+    c.add_argument("--golden", type=Path, default=GOLDEN_PATH)
+    d = sub.add_parser("diff", help="pipeline atual x referência sobre entradas geradas")
+    d.add_argument("-n", type=int, default=20000)
+    d.add_argument("--seed", type=int, default=1)
+    for p in (c, d):
+        p.add_argument("--examples", type=int, default=10, help="divergências exibidas")
+    args = ap.parse_args()
+    return {"build": cmd_build, "check": cmd_check, "diff": cmd_diff}[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+# benchmarks/import_budget.py
+"""
+Orçamento de tempo de import (cold start de worker).
+
+Importa `app.main` num interpretador novo com `python -X importtime` e falha se:
+- o import total passar de `--budget-ms` (padrão `IMPORT_BUDGET_MS`);
+- algum módulo pesado, que deveria ser carregado sob demanda ou no aquecimento
+  em segundo plano (`app.services.warmup`), for importado junto com a app.
+
+Uso: `python -m benchmarks.import_budget [--budget-ms 1500] [--top 15]` (lista os
+módulos mais lentos); o mesmo orçamento roda no pytest (tests/test_import_budget.py).
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+# carregados só no primeiro uso / no aquecimento
+LAZY_MODULES = ("openai", "pdfminer", "langdetect", "requests", "yaml", "numpy")
+
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def measure(module: str = "app.main") -> List[Tuple[str, int, int, int]]:
+    """[(módulo, self µs, acumulado µs, profundidade)] na ordem do `-X importtime`."""
+    root = Path(__file__).resolve().parents[1]
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"import de {module} falhou:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return rows
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Falha se o import da app estourar o orçamento de tempo.")
+    ap.add_argument("--module", default="app.main")
+    ap.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    ap.add_argument("--top", type=int, default=15, help="módulos mais lentos exibidos")
+    args = ap.parse_args()
+
+    rows = measure(args.module)
+    cumulative: Dict[str, int] = {name: cum for name, _, cum, _ in rows}
+    total_ms = cumulative.get(args.module, 0) / 1000
+    for name, _, cum, depth in sorted(rows, key=lambda r: -r[2])[: args.top]:
+        print(f"{cum / 1000:>9.1f} ms  {'  ' * depth}{name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import de {args.module}: {total_ms:.0f} ms > orçamento de {args.budget_ms:.0f} ms")
+    eager = sorted({name for name in cumulative if name.split(".")[0] in LAZY_MODULES})
+    if eager:
+        failures.append(f"módulos pesados importados no import da app: {eager}")
+    for f in failures:
+        print(f)
+    if failures:
+        return 1
+    print(f"ok: import de {args.module} em {total_ms:.0f} ms (orçamento {args.budget_ms:.0f} ms)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# benchmarks/lang_compare.py
+"""
+Compara o detector de idioma embutido (`ngram_language`) com o langdetect:
+acurácia e µs/chamada sobre um JSONL rotulado (`{"lang": "pt"|"en"|"es", "text": ...}`).
+Mede também textos curtos (só as 3 primeiras palavras de cada amostra) e o
+`detect_language` completo (heurísticas + fallback).
+
+    python benchmarks/lang_compare.py                       # amostras em benchmarks/data
+    python benchmarks/lang_compare.py rotulados.jsonl --repeat 20
+
+O langdetect é opcional (pip install langdetect); sem ele só o embutido roda.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.classifier import detect_language, ngram_language  # noqa: E402
+
+DEFAULT_SAMPLES = Path(__file__).resolve().parent / "data" / "lang_samples.jsonl"
+
+def load_samples(path: Path) -> list[tuple[str, str]]:
+    rows = []
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            if line.strip():
+                rec = json.loads(line)
+                rows.append((rec["lang"], rec["text"]))
+    return rows
+
+def builtin(text: str) -> Optional[str]:
+    found = ngram_language(text)
+    return found[0] if found else None
+
+def langdetect_engine() -> Optional[Callable[[str], Optional[str]]]:
+    try:
+        from langdetect import DetectorFactory, detect_langs
+    except ImportError:
+        return None
+    DetectorFactory.seed = 0
+
+    def run(text: str) -> Optional[str]:
+        try:
+            return max(detect_langs(text), key=lambda x: x.prob).lang
+        except Exception:
+            return None
+    return run
+
+def measure(fn: Callable[[str], Optional[str]], samples: list[tuple[str, str]], repeat: int) -> tuple[float, float]:
+    hits = sum(fn(text) == lang for lang, text in samples)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in samples:
+            fn(text)
+    elapsed = time.perf_counter() - start
+    return hits / len(samples), elapsed / (repeat * len(samples)) * 1e6
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Acurácia/velocidade: detector embutido x langdetect.")
+    ap.add_argument("samples", nargs="?", type=Path, default=DEFAULT_SAMPLES)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    full = load_samples(args.samples)
+    short = [(lang, " ".join(text.split()[:3])) for lang, text in full]
+    engines = [("builtin", builtin)]
+    ld = langdetect_engine()
+    if ld is None:
+        print("langdetect não instalado: comparando só o detector embutido", file=sys.stderr)
+    else:
+        engines.append(("langdetect", ld))
+    engines.append(("detect_language", detect_language))
+
+    print(f"{len(full)} amostras ({args.samples.name}), repeat={args.repeat}")
+    print(f"{'engine':<16} {'set':<6} {'acurácia':>9} {'µs/chamada':>11}")
+    speed = {}
+    for name, fn in engines:
+        for label, samples in (("full", full), ("short", short)):
+            acc, us = measure(fn, samples, args.repeat)
+            speed[(name, label)] = us
+            print(f"{name:<16} {label:<6} {acc:>9.1%} {us:>11.1f}")
+    if ld is not None:
+        ratio = speed[("langdetect", "full")] / speed[("builtin", "full")]
+        print(f"builtin é {ratio:.1f}x mais rápido que langdetect (textos completos)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
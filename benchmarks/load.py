@@ -0,0 +1,173 @@
+# benchmarks/load.py
+"""
+Teste de carga ponta a ponta de `/api/analyze`: sobe os stubs de HF/OpenAI
+(`benchmarks.stubs`), um uvicorn da app apontando para eles e dispara
+requisições concorrentes com o corpus sintético.
+
+Reporta vazão, percentis de latência, status HTTP e o tempo médio por etapa
+lido do `/metrics` do servidor ao final.
+
+    python -m benchmarks.load --requests 500 --concurrency 32 --hf-latency-ms 80
+"""
+import argparse
+import asyncio
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.corpus import generate, make_pdf
+from benchmarks.stubs import start_stub
+
+ROOT = Path(__file__).resolve().parents[1]
+STAGE_RE = re.compile(r'^email_classifier_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def _stage_means(metrics_text: str) -> Dict[str, float]:
+    sums: Dict[str, float] = {}
+    counts: Dict[str, float] = {}
+    for kind, name, value in STAGE_RE.findall(metrics_text):
+        (sums if kind == "sum" else counts)[name] = float(value)
+    return {name: round(sums[name] / counts[name] * 1000, 3) for name in sums if counts.get(name)}
+
+def start_server(env: Dict[str, str], port: int, workers: int = 1) -> subprocess.Popen:
+    if workers > 1:  # modo multi-processo de produção (estado compartilhado entre workers)
+        cmd = [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning", "--workers", str(workers)]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env={**os.environ, **env}, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn saiu com código {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("uvicorn não respondeu /healthz em 30s")
+
+async def _drive(base: str, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    for p in payloads:
+        queue.put_nowait(p)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            p = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                r = await client.post(f"{base}/api/analyze", **p)
+                key = str(r.status_code)
+            except httpx.HTTPError as e:
+                key = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return {
+        "requests": len(payloads),
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "rps": round(len(payloads) / wall, 1),
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 0.50), 2),
+            "p90": round(_percentile(latencies, 0.90), 2),
+            "p99": round(_percentile(latencies, 0.99), 2),
+            "max": round(max(latencies, default=0.0), 2),
+        },
+        "status": statuses,
+    }
+
+def run(
+    requests: int = 300,
+    concurrency: int = 16,
+    hf_latency_ms: float = 50.0,
+    openai_latency_ms: float = 150.0,
+    pdf_every: int = 0,
+    seed: int = 0,
+    workers: int = 1,
+    env: Dict[str, str] | None = None,
+) -> Dict[str, Any]:
+    """`pdf_every=N`: uma a cada N requisições envia o PDF de ~2 MB (0 = só texto)."""
+    hf, hf_url = start_stub("hf", hf_latency_ms)
+    oa, oa_url = start_stub("openai", openai_latency_ms)
+    port = _free_port()
+    server_env = {
+        "HF_API_URL": hf_url, "HF_API_TOKEN": "bench", "CLASSIFIER_BACKEND": "hf",
+        "OPENAI_BASE_URL": oa_url, "OPENAI_API_KEY": "bench",
+        # sem cache: o corpus se repete e o objetivo é medir o pipeline
+        "CACHE_ENABLED": "0", "CACHE_SQLITE_PATH": "",
+        **(env or {}),
+    }
+    corpus = generate(seed, max(1, requests // 3 + 1))
+    pdf = make_pdf(seed) if pdf_every else b""
+    payloads: List[Dict[str, Any]] = []
+    for i in range(requests):
+        if pdf_every and i % pdf_every == pdf_every - 1:
+            payloads.append({"files": {"email_file": ("anexo.pdf", pdf, "application/pdf")}})
+        else:
+            payloads.append({"data": {"email_text": corpus[i % len(corpus)]["text"]}})
+
+    proc = start_server(server_env, port, workers)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        result = asyncio.run(_drive(base, payloads, concurrency))
+        result["stage_mean_ms"] = _stage_means(httpx.get(f"{base}/metrics", timeout=10).text)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        hf.shutdown()
+        oa.shutdown()
+    result["config"] = {
+        "hf_latency_ms": hf_latency_ms, "openai_latency_ms": openai_latency_ms,
+        "pdf_every": pdf_every, "workers": workers,
+    }
+    return result
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Teste de carga de /api/analyze com stubs de HF/OpenAI.")
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--hf-latency-ms", type=float, default=50.0)
+    ap.add_argument("--openai-latency-ms", type=float, default=150.0)
+    ap.add_argument("--pdf-every", type=int, default=0, help="1 PDF de ~2 MB a cada N requisições")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    r = run(args.requests, args.concurrency, args.hf_latency_ms, args.openai_latency_ms,
+            args.pdf_every, args.seed, args.workers)
+    lat = r["latency_ms"]
+    print(f"{r['requests']} requisições, concorrência {r['concurrency']}: {r['rps']} req/s "
+          f"| p50 {lat['p50']} ms p90 {lat['p90']} ms p99 {lat['p99']} ms max {lat['max']} ms | status {r['status']}")
+    for name, ms in sorted(r["stage_mean_ms"].items()):
+        print(f"  {name:<14} {ms:>10.3f} ms (média)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks das etapas do pipeline sobre o corpus sintético, por tipo de
+e-mail (greeting/status/thread; `read_txt_pdf` também com o PDF de ~2 MB).
+`rules_batch`/`rules_batch_numpy`: motor de regras no lote inteiro (µs por e-mail).
+
+Cada caso roda rodadas completas sobre as entradas até `min_time` segundos (no
+mínimo `min_rounds`) e reporta a mediana de µs por chamada entre as rodadas.
+
+    python -m benchmarks.micro --per-kind 50
+"""
+import argparse
+import io
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+from benchmarks.corpus import TEXT_KINDS, generate, make_pdf
+
+def bench(fn: Callable[[Any], Any], inputs: Sequence[Any], min_time: float = 0.3, min_rounds: int = 3) -> Dict[str, float]:
+    """µs por chamada: mediana e mínimo entre rodadas (cada rodada passa por todas as entradas)."""
+    fn(inputs[0])  # aquecimento (caches, imports tardios)
+    per_call: List[float] = []
+    spent = 0.0
+    while len(per_call) < min_rounds or spent < min_time:
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        per_call.append(elapsed / len(inputs) * 1e6)
+    return {
+        "us_per_call": round(statistics.median(per_call), 3),
+        "us_min": round(min(per_call), 3),
+        "rounds": len(per_call),
+        "inputs": len(inputs),
+    }
+
+class _Upload:
+    """O mínimo de `UploadFile` que `read_txt_pdf` usa (nome + arquivo)."""
+
+    def __init__(self, filename: str, blob: bytes):
+        self.filename = filename
+        self.file = io.BytesIO(blob)
+
+def _read_upload(item) -> str:
+    from app.services.classifier import read_txt_pdf
+    filename, blob = item
+    return read_txt_pdf(_Upload(filename, blob))
+
+def bench_batch(fn: Callable[[Any], Any], batch: Sequence[Any], min_time: float = 0.3) -> Dict[str, float]:
+    """Como `bench`, com o lote inteiro por chamada; µs reportados por item do lote."""
+    r = bench(fn, [batch], min_time)
+    n = len(batch)
+    return {**r, "us_per_call": round(r["us_per_call"] / n, 3), "us_min": round(r["us_min"] / n, 3), "inputs": n}
+
+def _batch_cases(texts: List[str]) -> Dict[str, tuple]:
+    """Regras em lote sobre e-mails já varridos: laço escalar x vetorizado (NumPy, se instalado)."""
+    from app.services.classifier import classify_prepared, prepare_content
+
+    emails = [prepare_content(t, incremental=False) for t in texts]
+    for email in emails:
+        email.hits  # varredura memoizada: mede só score/overrides
+    none = [None] * len(emails)
+    cases: Dict[str, tuple] = {
+        "rules_batch": (lambda b: [classify_prepared(e, None, "rules") for e in b], emails),
+    }
+    try:
+        from app.services.vectorized import classify_batch
+    except ImportError:
+        return cases
+    cases["rules_batch_numpy"] = (lambda b: classify_batch(b, none, "rules"), emails)
+    return cases
+
+def run(per_kind: int = 50, seed: int = 0, min_time: float = 0.3, pdf_mb: float = 2.0) -> Dict[str, Dict[str, Any]]:
+    from app.services.classifier import (
+        apply_overrides, clean_text, detect_language, detect_signals, normalize, rule_classifier,
+    )
+
+    corpus = generate(seed, per_kind)
+    results: Dict[str, Dict[str, Any]] = {}
+    for kind in TEXT_KINDS:
+        texts = [item["text"] for item in corpus if item["kind"] == kind]
+        cleaned = [clean_text(t) for t in texts]
+        normed = [normalize(t) for t in cleaned]
+        decided = [(n, *rule_classifier(n)) for n in normed]
+        cases: Dict[str, tuple] = {
+            "normalize": (normalize, cleaned),
+            "clean_text": (clean_text, texts),
+            "detect_signals": (detect_signals, normed),
+            "rule_classifier": (rule_classifier, normed),
+            "apply_overrides": (lambda d: apply_overrides(d[0], d[1], d[2], d[3]), decided),
+            "detect_language": (detect_language, [c[:1000] for c in cleaned]),
+            "read_txt_pdf": (_read_upload, [("email.txt", t.encode("utf-8")) for t in texts]),
+        }
+        for name, (fn, inputs) in cases.items():
+            results[f"{name}[{kind}]"] = bench(fn, inputs, min_time)
+        for name, (fn, batch) in _batch_cases(texts).items():
+            results[f"{name}[{kind}]"] = bench_batch(fn, batch, min_time)
+
+    pdf = make_pdf(seed, pdf_mb)
+    results["read_txt_pdf[pdf]"] = {**bench(_read_upload, [("anexo.pdf", pdf)], min_time), "bytes": len(pdf)}
+    return results
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmarks das etapas do pipeline.")
+    ap.add_argument("--per-kind", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--min-time", type=float, default=0.3, help="segundos mínimos por caso")
+    args = ap.parse_args()
+    results = run(args.per_kind, args.seed, args.min_time)
+    for name, r in results.items():
+        print(f"{name:<32} {r['us_per_call']:>12.1f} µs/chamada  ({r['rounds']} rodadas x {r['inputs']})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# benchmarks/run.py
+"""
+Roda a suíte (micro-benchmarks + carga ponta a ponta) e grava um JSON com os
+resultados e o commit medido, para comparar antes/depois com `benchmarks.compare`:
+
+    git checkout <antes> && python -m benchmarks.run -o antes.json
+    git checkout <depois> && python -m benchmarks.run -o depois.json
+    python -m benchmarks.compare antes.json depois.json
+
+Sem `-o`, grava em benchmarks/results/<commit>.json (fora do git).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from benchmarks import load, micro
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def environment() -> Dict[str, Any]:
+    commit = _git("rev-parse", "--short", "HEAD")
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    return {
+        "commit": commit + ("-dirty" if dirty and commit else ""),
+        "subject": _git("log", "-1", "--format=%s"),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Suíte de benchmarks do pipeline (resultado em JSON).")
+    ap.add_argument("-o", "--output", type=Path, help="arquivo de saída (padrão: benchmarks/results/<commit>.json)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--per-kind", type=int, default=50, help="e-mails por tipo nos micro-benchmarks")
+    ap.add_argument("--min-time", type=float, default=0.3, help="segundos mínimos por micro-benchmark")
+    ap.add_argument("--requests", type=int, default=300, help="requisições do teste de carga")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--hf-latency-ms", type=float, default=50.0)
+    ap.add_argument("--openai-latency-ms", type=float, default=150.0)
+    ap.add_argument("--pdf-every", type=int, default=50, help="1 PDF de ~2 MB a cada N requisições (0 = nenhum)")
+    ap.add_argument("--skip-micro", action="store_true")
+    ap.add_argument("--skip-load", action="store_true")
+    args = ap.parse_args()
+
+    result: Dict[str, Any] = {"env": environment(), "seed": args.seed}
+    if not args.skip_micro:
+        print("micro-benchmarks...", file=sys.stderr)
+        result["micro"] = micro.run(args.per_kind, args.seed, args.min_time)
+    if not args.skip_load:
+        print("teste de carga...", file=sys.stderr)
+        result["load"] = load.run(
+            args.requests, args.concurrency, args.hf_latency_ms, args.openai_latency_ms,
+            args.pdf_every, args.seed,
+        )
+
+    output = args.output or RESULTS_DIR / f"{result['env']['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/stubs.py
+"""
+Servidores locais que imitam o Hugging Face (zero-shot) e a OpenAI (chat
+completions) com latência configurável, para medir o pipeline sem rede.
+
+    HF_API_URL=http://127.0.0.1:<porta-hf>  (o modelo vai no path, ignorado)
+    OPENAI_BASE_URL=http://127.0.0.1:<porta-openai>/v1
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+ZERO_SHOT = {"labels": ["Produtivo", "Improdutivo"], "scores": [0.91, 0.09]}
+
+REPLY = "Olá! Recebemos sua mensagem e retornaremos em até 1 dia útil."
+
+def _completion(text: str, items: int = 1) -> dict:
+    # lote: system prompt uma vez, ~60 tokens de entrada e ~40 de saída por e-mail
+    prompt, completion = 60 + 60 * items, 40 * items
+    return {
+        "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+        "usage": {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion},
+    }
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como os upstreams reais
+    disable_nagle_algorithm = True  # cabeçalho e corpo saem em writes separados: sem TCP_NODELAY, ~40 ms de ACK atrasado
+    latency_s = 0.0
+    kind = "hf"
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self.kind == "hf":
+            inputs = body.get("inputs")
+            data = [ZERO_SHOT] * len(inputs) if isinstance(inputs, list) else ZERO_SHOT
+        elif body.get("response_format", {}).get("type") == "json_object":
+            # lote do gerador de respostas: um item por id recebido
+            items = json.loads(body["messages"][-1]["content"])
+            replies = [{"id": item["id"], "reply": r} for item in items if (r := self.batch_reply(item)) is not None]
+            data = _completion(json.dumps({"replies": replies}, ensure_ascii=False), len(items))
+        else:
+            data = _completion(REPLY)
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def batch_reply(self, item: dict) -> str | None:
+        """Resposta de um item do lote; None deixa o id fora do JSON (testes sobrescrevem)."""
+        return REPLY
+
+    def log_message(self, *args) -> None:
+        pass
+
+def start_stub(kind: str, latency_ms: float = 0.0, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Sobe o stub ("hf" ou "openai") numa thread; retorna (servidor, URL base para o .env)."""
+    handler = type(f"{kind.title()}Stub", (_StubHandler,), {"kind": kind, "latency_s": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, base if kind == "hf" else base + "/v1"
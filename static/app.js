@@ -26,6 +26,7 @@ const MAX_SIZE = 2 * 1024 * 1024; // 2MB
 
 
 let droppedFile = null;
+let replySource = null; // EventSource/polling do job de resposta em andamento
 
 
 // ===== helpers =====
@@ -143,6 +144,8 @@ async function analyze() {
       if (!hasText) { showToast('Cole um texto ou envie um arquivo.'); return; }
       fd.append('email_text', txt);
     }
+    // classificação volta na hora; a resposta do LLM chega depois pelo job
+    fd.append('reply_mode', 'async');
 
     const res = await fetch('/api/analyze', { method: 'POST', body: fd });
     let data;
@@ -220,16 +223,80 @@ function renderResult(data) {
   // json bruto
   if (rawJson) rawJson.textContent = JSON.stringify(data, null, 2);
 
+  renderMeta(data);
+  followReplyJob(data);
+}
+
+function renderMeta(data) {
   const t = data.meta?.elapsed_ms ?? '—';
   const size = data.meta?.output_size ?? '—';
+  const pending = !!data.meta?.reply_job;
   meta.textContent =
     `Usou HF: ${data.meta?.used_hf ? 'sim' : 'não'} | ` +
-    `Usou LLM: ${data.meta?.used_openai ? 'sim' : 'não'} | ` +
+    `Usou LLM: ${pending ? 'gerando resposta…' : (data.meta?.used_openai ? 'sim' : 'não')} | ` +
     `Fallbacks: ${(data.meta?.fallbacks || []).join(', ')} | ` +
     `Tempo: ${t} ms | ` +
     `Tamanho: ${size} chars | ` +
     `Idioma: ${data.meta?.language || '—'}`;
+}
 
+// ===== resposta assíncrona (job) =====
+function stopReplyJob() {
+  if (replySource) replySource.close();
+  replySource = null;
+}
+
+function applyReplyJob(data, job) {
+  if (job.status === 'pending' || job.status === 'running') return false;
+  const final = { ...data, meta: { ...data.meta, reply_job: null } };
+  if (job.status === 'done' && job.result) {
+    final.reply = job.result.reply;
+    final.meta.used_openai = job.result.used_openai;
+    final.meta.fallbacks = [...(data.meta?.fallbacks || []), ...(job.result.fallbacks || [])];
+    final.meta.output_size = (job.result.reply || '').length;
+    final.meta.tokens = job.result.tokens;
+    reply.value = job.result.reply || reply.value;
+  } else {
+    // falhou/expirou: o template já exibido fica como resposta
+    final.meta.fallbacks = [...(data.meta?.fallbacks || []), 'templates'];
+  }
+  if (rawJson) rawJson.textContent = JSON.stringify({ ...final, reply_job: job }, null, 2);
+  renderMeta(final);
+  return true;
+}
+
+function followReplyJob(data) {
+  stopReplyJob();
+  const job = data.meta?.reply_job;
+  if (!job) return;
+
+  // SSE quando disponível; senão (ou se a conexão cair), polling
+  const poll = () => {
+    let stopped = false;
+    replySource = { close: () => { stopped = true; } };
+    const tick = async () => {
+      if (stopped) return;
+      try {
+        const res = await fetch(job.poll);
+        if (res.status === 404) { applyReplyJob(data, { status: 'expired' }); return; }
+        if (res.ok && applyReplyJob(data, await res.json())) return;
+      } catch { /* rede instável: tenta de novo */ }
+      setTimeout(tick, 1000);
+    };
+    tick();
+  };
+
+  if (!window.EventSource) { poll(); return; }
+  const es = new EventSource(job.events);
+  replySource = es;
+  es.addEventListener('status', (ev) => {
+    if (applyReplyJob(data, JSON.parse(ev.data))) stopReplyJob();
+  });
+  es.onerror = () => {
+    if (replySource !== es) return;
+    es.close();
+    poll();
+  };
 }
 
 // ===== ações =====
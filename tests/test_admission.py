@@ -0,0 +1,150 @@
+# tests/test_admission.py
+"""
+Controle de admissão (`app.core.admission`) pelo middleware da app: vagas por
+classe com fila limitada e prazo (503 + Retry-After) e limite por cliente (429 +
+Retry-After), inclusive com o bucket comum (SQLite) ocupado. O handler de /api/analyze é trocado por um que fica preso até o
+teste liberar, numa app mínima com o mesmo middleware de `app.main`.
+"""
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import admission
+from app.core.admission import (
+    ADMISSION_REJECTED, ADMISSION_SHARED_FALLBACKS, AdmissionGate, LocalBuckets, Rejected, check_rate,
+)
+from app.core.shared import SharedState
+from app.main import admission as admission_middleware
+
+TEXT = {"email_text": "Qual o status do chamado 123?"}
+
+@pytest.fixture
+def blocked():
+    """App com o middleware de admissão e um /api/analyze que espera `release`."""
+    entered, release = threading.Semaphore(0), threading.Event()
+    app = FastAPI()
+    app.middleware("http")(admission_middleware)
+
+    @app.post("/api/analyze")
+    def analyze():  # síncrono: roda numa thread, o event loop segue livre
+        entered.release()
+        release.wait(10)
+        return {"ok": True}
+
+    with TestClient(app) as client, ThreadPoolExecutor(4) as pool:
+        yield client, pool, entered, release
+        release.set()
+
+def _gates(monkeypatch, limit: int, queue_max: int, wait_s: float) -> None:
+    monkeypatch.setitem(admission.GATES, "text", AdmissionGate("text", limit, queue_max))
+    monkeypatch.setattr(admission, "TOTAL", AdmissionGate("total", 0, 0))
+    monkeypatch.setattr(admission, "ADMISSION_WAIT_S", wait_s)
+
+def test_queue_full_rejects_immediately(monkeypatch, blocked):
+    client, pool, entered, release = blocked
+    _gates(monkeypatch, limit=1, queue_max=0, wait_s=5.0)
+    before = ADMISSION_REJECTED.value(gate="text", reason="queue_full")
+
+    first = pool.submit(client.post, "/api/analyze", data=TEXT)
+    assert entered.acquire(timeout=10)
+    start = time.monotonic()
+    resp = client.post("/api/analyze", data=TEXT)
+    assert time.monotonic() - start < 2.0  # recusa na hora, sem esperar o prazo
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == str(math.ceil(admission.ADMISSION_RETRY_AFTER_S))
+    assert ADMISSION_REJECTED.value(gate="text", reason="queue_full") == before + 1
+
+    release.set()
+    assert first.result(10).status_code == 200
+    assert admission.GATES["text"].active == 0
+
+def test_queue_deadline_rejects_waiter(monkeypatch, blocked):
+    client, pool, entered, release = blocked
+    _gates(monkeypatch, limit=1, queue_max=4, wait_s=0.3)
+    before = ADMISSION_REJECTED.value(gate="text", reason="timeout")
+
+    first = pool.submit(client.post, "/api/analyze", data=TEXT)
+    assert entered.acquire(timeout=10)
+    start = time.monotonic()
+    resp = client.post("/api/analyze", data=TEXT)
+    assert time.monotonic() - start >= 0.3
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert ADMISSION_REJECTED.value(gate="text", reason="timeout") == before + 1
+    assert admission.GATES["text"].queued == 0  # quem desistiu sai da fila
+
+    release.set()
+    assert first.result(10).status_code == 200
+
+def test_waiter_gets_slot_when_released(monkeypatch, blocked):
+    client, pool, entered, release = blocked
+    _gates(monkeypatch, limit=1, queue_max=4, wait_s=5.0)
+
+    first = pool.submit(client.post, "/api/analyze", data=TEXT)
+    assert entered.acquire(timeout=10)
+    second = pool.submit(client.post, "/api/analyze", data=TEXT)
+    deadline = time.monotonic() + 5
+    while admission.GATES["text"].queued == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert admission.GATES["text"].queued == 1
+
+    release.set()
+    assert first.result(10).status_code == 200
+    assert second.result(10).status_code == 200
+    assert admission.GATES["text"].as_dict() == {"limit": 1, "inflight": 0, "queued": 0}
+
+def test_rate_limit_returns_429_with_retry_after(monkeypatch, blocked):
+    client, _, _, release = blocked
+    release.set()
+    monkeypatch.setattr(admission, "RATE_LIMIT_RPS", 0.25)
+    monkeypatch.setattr(admission, "RATE_LIMIT_BURST", 2.0)
+    monkeypatch.setattr(admission, "_local_buckets", LocalBuckets())
+
+    headers = {"X-API-Key": "cliente-a"}
+    assert [client.post("/api/analyze", data=TEXT, headers=headers).status_code for _ in range(2)] == [200, 200]
+    resp = client.post("/api/analyze", data=TEXT, headers=headers)
+    assert resp.status_code == 429
+    assert 1 <= int(resp.headers["Retry-After"]) <= 4  # 1 token a 0.25/s
+    # o bucket é por cliente
+    assert client.post("/api/analyze", data=TEXT, headers={"X-API-Key": "cliente-b"}).status_code == 200
+
+def test_gate_deadline_without_waiting_slot():
+    async def run():
+        gate = AdmissionGate("text", 1, 1)
+        await gate.acquire(1.0)
+        with pytest.raises(Rejected) as exc:
+            await gate.acquire(0.05)
+        assert (exc.value.status, exc.value.reason) == (503, "timeout")
+        gate.release()
+        assert gate.as_dict() == {"limit": 1, "inflight": 0, "queued": 0}
+
+    asyncio.run(run())
+
+def test_shared_bucket_contention_falls_back_to_local(monkeypatch, tmp_path):
+    store = SharedState(str(tmp_path / "shared.db"))
+    monkeypatch.setattr(admission, "get_shared", lambda: store)
+    monkeypatch.setattr(admission, "RATE_LIMIT_RPS", 0.25)
+    monkeypatch.setattr(admission, "RATE_LIMIT_BURST", 1.0)
+    monkeypatch.setattr(admission, "RATE_LIMIT_SHARED_TIMEOUT_S", 0.05)
+    monkeypatch.setattr(admission, "_local_buckets", LocalBuckets())
+    before = ADMISSION_SHARED_FALLBACKS.value()
+
+    async def run():
+        start = time.monotonic()
+        await check_rate("cliente-a", "text")
+        with pytest.raises(Rejected) as exc:
+            await check_rate("cliente-a", "text")  # bucket local também limita
+        return time.monotonic() - start, exc.value
+
+    with store._lock:  # outro worker segurando o SQLite
+        elapsed, rejected = asyncio.run(run())
+    store.close()
+    assert rejected.status == 429
+    assert elapsed < 1.0
+    assert ADMISSION_SHARED_FALLBACKS.value() == before + 2
@@ -0,0 +1,106 @@
+# tests/test_clients.py
+"""
+Clientes com pool (`app.core.clients`) contra os stubs locais:
+- reuso de conexões: 1000 chamadas por cliente abrem no máximo o tamanho do pool;
+- regressão: a primeira chamada síncrona à OpenAI num processo sem cliente HTTP
+  síncrono criado (nenhuma chamada HF antes) travava em `get_sync_openai`.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core import clients
+from app.core.settings import HTTP_MAX_KEEPALIVE
+from benchmarks.stubs import REPLY, ZERO_SHOT, start_stub
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CALLS = 1000
+CONCURRENCY = 8  # chamadas simultâneas no caminho assíncrono (abaixo do pool)
+
+def _counting_stub(kind: str):
+    """Stub que conta as conexões TCP aceitas."""
+    server, base_url = start_stub(kind)
+    accepted = []
+    get_request = server.get_request
+
+    def counting_get_request():
+        conn = get_request()
+        accepted.append(conn[1])
+        return conn
+
+    server.get_request = counting_get_request
+    return server, base_url, accepted
+
+@pytest.fixture
+def stubs(monkeypatch):
+    hf, hf_url, hf_conns = _counting_stub("hf")
+    openai, openai_url, openai_conns = _counting_stub("openai")
+    monkeypatch.setattr(clients, "OPENAI_KEY", "sk-test")
+    monkeypatch.setattr(clients, "OPENAI_BASE_URL", openai_url)
+    clients.close_sync_clients()
+    yield hf_url, hf_conns, openai_conns
+    clients.close_sync_clients()
+    hf.shutdown()
+    openai.shutdown()
+
+def _chat(client):
+    return client.chat.completions.create(
+        model="stub", messages=[{"role": "user", "content": "status do chamado?"}], max_tokens=8,
+    )
+
+def test_lifespan_clients_reuse_connections(stubs):
+    hf_url, hf_conns, openai_conns = stubs
+
+    async def run():
+        pool = clients.Clients()
+        try:
+            async def worker(calls: int):
+                for _ in range(calls):
+                    resp = await pool.http.post(f"{hf_url}/model", json={"inputs": "oi"})
+                    assert resp.json() == ZERO_SHOT
+                    resp = await _chat(pool.openai)
+                    assert resp.choices[0].message.content == REPLY
+            await asyncio.gather(*(worker(CALLS // CONCURRENCY) for _ in range(CONCURRENCY)))
+        finally:
+            await pool.aclose()
+
+    asyncio.run(run())
+    assert 1 <= len(hf_conns) <= min(CONCURRENCY, HTTP_MAX_KEEPALIVE)
+    assert 1 <= len(openai_conns) <= min(CONCURRENCY, HTTP_MAX_KEEPALIVE)
+
+def test_sync_clients_reuse_connections(stubs):
+    hf_url, hf_conns, openai_conns = stubs
+    openai = clients.get_sync_openai()  # primeiro, sem cliente HTTP síncrono criado
+    http = clients.get_sync_http()
+    assert openai._client is http  # o OpenAI síncrono usa o mesmo pool
+    for _ in range(CALLS):
+        assert http.post(f"{hf_url}/model", json={"inputs": "oi"}).json() == ZERO_SHOT
+        assert _chat(openai).choices[0].message.content == REPLY
+    # chamadas em sequência: uma conexão por upstream, reaproveitada
+    assert len(hf_conns) == 1
+    assert len(openai_conns) == 1
+
+FIRST_SYNC_CALL = """
+import app.core.clients as clients
+assert clients._sync_http is None
+from app.services.replier import ai_reply
+print(ai_reply("Produtivo", "Qual o status do chamado 123?", ["status"]))
+"""
+
+def test_first_sync_openai_call_returns():
+    server, base_url = start_stub("openai")
+    try:
+        env = {**os.environ, "OPENAI_API_KEY": "sk-test", "OPENAI_BASE_URL": base_url}
+        proc = subprocess.run(
+            [sys.executable, "-c", FIRST_SYNC_CALL],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=60,
+        )
+    finally:
+        server.shutdown()
+    assert proc.returncode == 0, proc.stderr
+    assert REPLY in proc.stdout
@@ -0,0 +1,17 @@
+# tests/test_import_budget.py
+"""
+Cold start: `app.main` importado num interpretador novo (`-X importtime`) cabe
+em `IMPORT_BUDGET_MS` e não puxa módulos pesados que ficam para o primeiro uso
+ou para o aquecimento em segundo plano.
+"""
+from benchmarks.import_budget import IMPORT_BUDGET_MS, LAZY_MODULES, measure
+
+def test_app_import_budget():
+    rows = measure("app.main")
+    cumulative = {name: cum for name, _, cum, _ in rows}
+
+    eager = sorted({name for name in cumulative if name.split(".")[0] in LAZY_MODULES})
+    assert eager == [], f"módulos pesados importados no import da app: {eager}"
+    total_ms = cumulative["app.main"] / 1000
+    slowest = sorted(rows, key=lambda r: -r[2])[:10]
+    assert total_ms <= IMPORT_BUDGET_MS, f"import de app.main: {total_ms:.0f} ms; mais lentos: {slowest}"
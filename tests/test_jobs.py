@@ -0,0 +1,124 @@
+# tests/test_jobs.py
+"""
+Fila de jobs (`app.core.jobs.JobQueue`): profundidade máxima (backpressure),
+validade dos resultados (TTL), job expirado antes de rodar e espelho no estado
+compartilhado entre filas de workers diferentes.
+"""
+import asyncio
+
+from app.core.jobs import DONE, EXPIRED, FAILED, JOBS, JobQueue
+from app.core.shared import SharedState
+
+def test_max_depth_rejects_until_a_slot_frees():
+    async def run():
+        queue = JobQueue("t-depth", workers=1, max_depth=1, ttl_s=60)
+        queue.start()
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+            return "primeiro"
+
+        before = JOBS.value(queue="t-depth", outcome="rejected")
+        first = await queue.submit(blocked)
+        assert first is not None
+        assert await queue.submit(blocked) is None  # cheia: quem chamou segue sem o job
+        assert JOBS.value(queue="t-depth", outcome="rejected") == before + 1
+        assert queue.depth == 1
+
+        release.set()
+        state = await queue.wait(first.id, timeout=5)
+        assert (state["status"], state["result"]) == (DONE, "primeiro")
+        assert queue.depth == 0
+
+        async def second():
+            return "segundo"
+
+        job = await queue.submit(second)
+        assert job is not None
+        assert (await queue.wait(job.id, timeout=5))["result"] == "segundo"
+        await queue.stop()
+
+    asyncio.run(run())
+
+def test_failed_job_reports_error():
+    async def run():
+        queue = JobQueue("t-fail", workers=1, max_depth=4, ttl_s=60)
+        queue.start()
+
+        async def boom():
+            raise ValueError("sem resposta")
+
+        job = await queue.submit(boom)
+        state = await queue.wait(job.id, timeout=5)
+        assert (state["status"], state["error"]) == (FAILED, "ValueError: sem resposta")
+        assert queue.depth == 0
+        await queue.stop()
+
+    asyncio.run(run())
+
+def test_ttl_expires_queued_job_and_result():
+    async def run():
+        queue = JobQueue("t-ttl", workers=1, max_depth=4, ttl_s=0.2)
+        queue.start()
+        release = asyncio.Event()
+        ran = []
+
+        async def blocked():
+            await release.wait()
+            return "ok"
+
+        async def never():
+            ran.append(True)
+            return "não deveria rodar"
+
+        first = await queue.submit(blocked)
+        late = await queue.submit(never)
+        await asyncio.sleep(0.3)  # `late` expira ainda na fila
+        release.set()
+        await queue._queue.join()
+
+        assert late.status == EXPIRED and not ran
+        assert first.status == DONE
+        # fora da validade, o resultado some (e é podado no próximo submit)
+        assert await queue.get(first.id) is None
+        assert await queue.get(late.id) is None
+
+        async def fresh():
+            return "novo"
+
+        await queue.submit(fresh)
+        assert first.id not in queue._jobs and late.id not in queue._jobs
+        assert queue.depth <= 1
+        await queue.stop()
+
+    asyncio.run(run())
+
+def test_job_visible_from_another_worker_queue(tmp_path):
+    path = str(tmp_path / "shared.db")
+    store_a, store_b = SharedState(path), SharedState(path)
+
+    async def run():
+        queue_a = JobQueue("t-shared", workers=1, max_depth=4, ttl_s=60, store=store_a)
+        queue_b = JobQueue("t-shared", workers=1, max_depth=4, ttl_s=60, store=store_b)
+        queue_a.start()
+        queue_b.start()
+
+        async def reply():
+            return {"reply": "Olá!"}
+
+        job = await queue_a.submit(reply)
+        # o id devolvido já vale no outro worker
+        assert (await queue_b.get(job.id)) is not None
+        await queue_a.wait(job.id, timeout=5)
+        await queue_a._flush()
+        state = await queue_b.get(job.id)
+        assert (state["status"], state["result"]) == (DONE, {"reply": "Olá!"})
+        await queue_a.stop()
+        await queue_b.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        store_a.close()
+        store_b.close()
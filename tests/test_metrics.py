@@ -0,0 +1,35 @@
+# tests/test_metrics.py
+"""Tipos de métrica (`app.core.metrics`): contrato da base e agregação entre workers."""
+import pytest
+
+from app.core.metrics import Counter, Histogram, _Metric
+
+def test_incomplete_metric_type_fails_on_creation():
+    class OnlySnapshot(_Metric):
+        kind = "counter"
+
+        def snapshot(self):
+            return []
+
+    with pytest.raises(TypeError):
+        OnlySnapshot("t_incomplete", "sem _samples/merge")
+
+def test_counter_merge_sums_workers():
+    a = Counter("t_merge_total", "teste", ("kind",))
+    b = Counter("t_merge_total", "teste", ("kind",))
+    a.inc(2, kind="x")
+    b.inc(3, kind="x")
+    b.inc(kind="y")
+    merged = a.merge([a.snapshot(), b.snapshot()])
+    lines = a.render(merged)
+    assert 't_merge_total{kind="x"} 5' in lines
+    assert 't_merge_total{kind="y"} 1' in lines
+
+def test_histogram_renders_buckets():
+    h = Histogram("t_seconds", "teste", buckets=(0.1, 1.0))
+    h.observe(0.05)
+    h.observe(0.5)
+    lines = h.render()
+    assert 't_seconds_bucket{le="0.1"} 1' in lines
+    assert 't_seconds_bucket{le="+Inf"} 2' in lines
+    assert "t_seconds_count 2" in lines
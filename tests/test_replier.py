@@ -0,0 +1,171 @@
+# tests/test_replier.py
+"""
+Lote de respostas da LLM (`ReplyBatcher`): parse do JSON do lote, divisão dos
+tokens, fallback por item e pedidos com pouco orçamento fora do lote. As
+chamadas vão ao stub local da OpenAI (`benchmarks.stubs`), que responde lotes
+em JSON mode.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from openai import AsyncOpenAI
+
+from app.core.resilience import LatencyBudget
+from app.services.replier import ReplyBatcher, _reply_request, _split, parse_batch_replies, reply_template
+from benchmarks.stubs import REPLY, start_stub
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def _stub(batch_reply=None):
+    """Stub da OpenAI que registra cada chamada e responde os itens do lote com `batch_reply`."""
+    server, base_url = start_stub("openai")
+    calls = []
+    base = server.RequestHandlerClass
+
+    def batch(self, item):
+        return REPLY if batch_reply is None else batch_reply(item)
+
+    def do_POST(self):
+        calls.append(self.path)
+        base.do_POST(self)
+
+    server.RequestHandlerClass = type("RecordingStub", (base,), {"batch_reply": batch, "do_POST": do_POST})
+    return server, base_url, calls
+
+# ============================================================================
+# parse_batch_replies / _split
+# ============================================================================
+
+def test_parse_batch_replies_keeps_valid_items_only():
+    text = json.dumps({"replies": [
+        {"id": "0", "reply": "  primeira  "},
+        {"id": "1", "reply": ""},
+        {"id": "2"},
+        {"id": "9", "reply": "id que não foi pedido"},
+        "lixo",
+        {"id": 3, "reply": "id numérico"},
+    ]})
+    assert parse_batch_replies(text, ["0", "1", "2", "3"]) == {"0": "primeira", "3": "id numérico"}
+
+def test_parse_batch_replies_accepts_fence_and_bare_list():
+    fenced = '```json\n{"replies": [{"id": "0", "reply": "ok"}]}\n```'
+    assert parse_batch_replies(fenced, ["0"]) == {"0": "ok"}
+    assert parse_batch_replies('[{"id": "1", "reply": "ok"}]', ["0", "1"]) == {"1": "ok"}
+
+@pytest.mark.parametrize("text", [None, "", "não é json", '{"replies": "x"}', "42"])
+def test_parse_batch_replies_invalid_payload(text):
+    assert parse_batch_replies(text, ["0", "1"]) == {}
+
+@pytest.mark.parametrize("total, weights", [
+    (0, [1, 2, 3]),
+    (7, [1]),
+    (100, [1, 1, 1]),
+    (101, [3, 5, 7, 11]),
+    (999, [250, 1, 1, 900]),
+    (13, [0, 0, 0]),
+])
+def test_split_shares_add_up_to_total(total, weights):
+    shares = _split(total, weights)
+    assert len(shares) == len(weights)
+    assert sum(shares) == total
+    assert all(share >= 0 for share in shares)
+
+def test_split_is_proportional():
+    assert _split(120, [1, 2, 3]) == [20, 40, 60]
+
+# ============================================================================
+# ReplyBatcher contra o stub
+# ============================================================================
+
+EMAILS = [
+    ("Qual o status do chamado 123?", ["status", "chamado"]),
+    ("Podem verificar o erro no sistema?", ["erro", "sistema"]),
+    ("Preciso da segunda via do boleto de março.", ["boleto"]),
+]
+
+async def _submit_all(base_url: str, budgets, min_budget_s: float = 0.0):
+    batcher = ReplyBatcher(max_items=8, max_tokens=100_000, window_s=0.05, min_budget_s=min_budget_s)
+    async with AsyncOpenAI(api_key="sk-test", base_url=base_url, max_retries=0) as client:
+        return await asyncio.gather(*(
+            batcher.submit(client, _reply_request("Produtivo", snippet, signals, "pt", None),
+                           "Produtivo", snippet, signals, "pt", budget)
+            for (snippet, signals), budget in zip(EMAILS, budgets)
+        ))
+
+def test_batch_missing_item_falls_back_alone():
+    server, base_url, calls = _stub(lambda item: None if "boleto" in item["snippet"] else REPLY)
+    budgets = [LatencyBudget(None) for _ in EMAILS]
+    try:
+        results = asyncio.run(_submit_all(base_url, budgets))
+    finally:
+        server.shutdown()
+
+    assert len(calls) == 1  # uma chamada para os três
+    assert [text for text, _, _ in results] == [REPLY, REPLY, None]
+    assert [size for _, _, size in results] == [3, 3, 3]
+    assert budgets[2].fallbacks == ["openai:parse_error"]
+    assert budgets[0].fallbacks == budgets[1].fallbacks == []
+    # os tokens do lote (stub: 60 + 60 por e-mail de prompt, 40 por e-mail de completion) são repartidos
+    assert sum(usage[0] for _, usage, _ in results) == 60 + 60 * 3
+    assert sum(usage[1] for _, usage, _ in results) == 40 * 3
+
+def test_low_budget_request_skips_the_batch():
+    server, base_url, calls = _stub()
+    budgets = [LatencyBudget(None), LatencyBudget(0.5), LatencyBudget(None)]
+    try:
+        results = asyncio.run(_submit_all(base_url, budgets, min_budget_s=2.0))
+    finally:
+        server.shutdown()
+
+    assert len(calls) == 2  # lote com os dois folgados + o apertado sozinho
+    assert [text for text, _, _ in results] == [REPLY, REPLY, REPLY]
+    assert [size for _, _, size in results] == [2, 1, 2]
+    assert all(budget.fallbacks == [] for budget in budgets)
+
+# ============================================================================
+# Fim a fim: item sem resposta no lote vira template, os outros não
+# ============================================================================
+
+ANALYZE_CONCURRENT = """
+import json, sys
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from app.main import app
+
+texts = json.loads(sys.argv[1])
+with TestClient(app) as client:
+    def post(text):
+        return client.post("/api/analyze", data={"email_text": text, "reply_mode": "sync"}).json()
+    with ThreadPoolExecutor(len(texts)) as pool:
+        print("RESULT " + json.dumps(list(pool.map(post, texts))))
+"""
+
+def test_batch_item_without_reply_uses_template():
+    server, base_url, _ = _stub(lambda item: None if "boleto" in item["snippet"] else REPLY)
+    env = {
+        **os.environ, "OPENAI_API_KEY": "sk-test", "OPENAI_BASE_URL": base_url,
+        "CLASSIFIER_BACKEND": "rules", "CACHE_ENABLED": "0",
+        "REPLY_BATCH_MAX": "8", "REPLY_BATCH_WINDOW_MS": "500",
+    }
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-c", ANALYZE_CONCURRENT, json.dumps([text for text, _ in EMAILS])],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+        )
+    finally:
+        server.shutdown()
+    assert proc.returncode == 0, proc.stderr
+    line = next(l for l in proc.stdout.splitlines() if l.startswith("RESULT "))
+    first, second, missing = json.loads(line.removeprefix("RESULT "))
+
+    for body in (first, second):
+        assert body["reply"] == REPLY
+        assert "templates" not in body["meta"]["fallbacks"]
+    meta = missing["meta"]
+    assert missing["reply"] == reply_template(missing["category"], meta["signals"], lang=meta["language"])
+    assert {"openai:parse_error", "templates"} <= set(meta["fallbacks"])
@@ -0,0 +1,55 @@
+# tests/test_request_path.py
+"""
+Nenhuma compilação de regex no caminho da requisição: tudo é compilado no
+import / na carga das regras (`RuleSet`).
+
+O contador intercepta `re._compile`, por onde passa toda chamada a
+`re.compile`/`re.search`/`re.sub`... com padrão em string (inclusive acertos do
+cache interno do `re`). Métodos de padrões já compilados (`RX.search`,
+`RX.sub`) não passam por ali e não contam.
+"""
+import re
+from pathlib import Path
+
+import pytest
+
+from app.services.classifier import classify_email, classify_many, detect_language, prepare_content
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SAMPLES = [p.read_text(errors="ignore") for p in sorted((ROOT / "examples").glob("*.txt")) if p.stat().st_size < 1_000_000]
+SAMPLES += [
+    "Olá, bom dia! Poderiam verificar o status do chamado 123? Não recebi retorno.",
+    "Muito obrigado pela ajuda, tudo funcionando perfeitamente.",
+    "Hello, the system is not working since yesterday, please check ASAP.",
+    "Status por favor", "e o prazo?", "Newsletter de lançamento",
+    "Problema resolvido, obrigado.\n\nEm seg., 2 de out. de 2024, Suporte <s@x.com> escreveu:\n> erro no sistema",
+]
+
+@pytest.fixture
+def regex_compiles(monkeypatch):
+    patterns = []
+    original = re._compile
+
+    def counting(pattern, flags):
+        if isinstance(pattern, (str, bytes)):
+            patterns.append(str(pattern))
+        return original(pattern, flags)
+
+    # aquece regras e imports sob demanda (numpy do motor vetorizado) antes de contar
+    classify_email(prepare_content(SAMPLES[0]))
+    classify_many(SAMPLES * 10, use_hf=False)
+    monkeypatch.setattr(re, "_compile", counting)
+    return patterns
+
+def test_no_regex_compile_on_request_path(regex_compiles):
+    for text in SAMPLES:
+        email = prepare_content(text)
+        classify_email(email)
+        detect_language(email)
+    assert regex_compiles == [], f"regex compilados no caminho da requisição: {sorted(set(regex_compiles))}"
+
+def test_no_regex_compile_on_batch_path(regex_compiles):
+    # lote acima de RULES_VECTOR_MIN_BATCH: passa pelo motor vetorizado quando há numpy
+    classify_many(SAMPLES * 10, use_hf=False)
+    assert regex_compiles == [], f"regex compilados no caminho em lote: {sorted(set(regex_compiles))}"